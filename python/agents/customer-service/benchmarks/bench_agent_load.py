@@ -0,0 +1,385 @@
+"""Load test for `root_agent`: many concurrent sessions, stub model, real Postgres.
+
+Replays the conversations in `eval/eval_data/*.test.json` and
+`benchmarks/data/*.test.json` from concurrent sessions through the ADK runner.
+The model is a deterministic stub that answers each user message with the
+recorded tool calls (`expected_tool_use`) and then the recorded reference
+text, so the run measures the tools, callbacks and database, not the LLM.
+Recorded tool calls to tools this agent does not have are skipped (the eval
+files still describe the original sample's tools).
+
+The database is disposable: a new database is created on the server given by
+the usual `GOOGLE_DB_*` settings (it needs `pg_trgm`), loaded with
+`schema.sql`, seeded with a synthetic catalog of `--skus` products through
+`catalog_import`, and dropped at the end (unless `--keep-db`).
+
+    python -m benchmarks.bench_agent_load --sessions 200 --concurrency 20 --skus 5000
+
+Reports p50/p95/p99 turn and tool latency, SQL statements per turn and
+throughput. With `--trace-dir` the agent's spans are enabled (see
+`customer_service.tracing`): the report adds per-span totals (search tier
+chosen, rows, cache hits) and one folded-stack file per session is written
+to the directory, ready for flamegraph.pl or speedscope.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import glob
+import json
+import logging
+import os
+import random
+import statistics
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+DEFAULT_CONVERSATIONS = [
+    os.path.join(ROOT, "eval", "eval_data", "*.test.json"),
+    os.path.join(HERE, "data", "*.test.json"),
+]
+
+# SQL statements run by the current turn (see `_count_queries`).
+_turn_queries: contextvars.ContextVar[Optional[List[int]]] = contextvars.ContextVar(
+    "turn_queries", default=None
+)
+
+
+def load_conversations(patterns: List[str]) -> List[Tuple[str, List[dict]]]:
+    conversations = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, encoding="utf-8") as f:
+                turns = json.load(f)
+            if isinstance(turns, list) and turns and "query" in turns[0]:
+                conversations.append((os.path.basename(path), turns))
+    return conversations
+
+
+def synthetic_catalog(skus: int, seed: int = 7) -> List[List[str]]:
+    """Rows in `catalog_import.CATALOG_COLUMNS` order; codes start at 100000."""
+    rng = random.Random(seed)
+    amd = [("AMD", f"Ryzen {serie} {model}", socket)
+           for serie in (3, 5, 7, 9) for model in (5600, 7600, 8500) for socket in ("AM4", "AM5")]
+    intel = [("Intel", f"Core i{serie}-{model}", socket)
+             for serie in (3, 5, 7, 9) for model in (12400, 13600, 14700) for socket in ("S1700", "S1200")]
+    templates = [
+        ("Microprocesadores", lambda: "Micro {} {} {}".format(*rng.choice(amd + intel))),
+        ("Mothers", lambda: "Mother {} {} {}".format(
+            rng.choice(["ASUS", "MSI", "Gigabyte", "ASRock"]),
+            rng.choice(["A520M-K", "B550M PRO", "B650 AORUS", "H610M-E", "B760-P DDR4"]),
+            rng.choice(["AM4", "AM5", "S1700", "LGA1700", "S1200"]),
+        )),
+        ("Memorias", lambda: "Memoria {} DDR{} {}GB {}MHz".format(
+            rng.choice(["Kingston Fury", "Corsair Vengeance", "ADATA XPG"]),
+            rng.choice([4, 5]), rng.choice([8, 16, 32]), rng.choice([3200, 3600, 5200, 6000]),
+        )),
+        ("Placas de Video", lambda: "Placa de Video {} RTX {} {}G".format(
+            rng.choice(["MSI", "ASUS", "Gigabyte", "Zotac"]),
+            rng.choice([3050, 4060, 4070, 5070]), rng.choice([8, 12, 16]),
+        )),
+        ("Discos SSD", lambda: "Disco SSD {} {}GB NVMe".format(
+            rng.choice(["Kingston NV2", "WD Blue SN580", "Samsung 980"]), rng.choice([500, 1000, 2000]),
+        )),
+        ("Fuentes", lambda: "Fuente {} {}W 80 Plus".format(
+            rng.choice(["Corsair", "Thermaltake", "Gigabyte"]), rng.choice([550, 650, 750, 850]),
+        )),
+    ]
+    rows = []
+    for i in range(skus):
+        categoria, name = templates[i % len(templates)]
+        producto = name()
+        fabricante = producto.split()[1] if categoria != "Placas de Video" else producto.split()[3]
+        price = round(rng.uniform(20, 900), 2)
+        rows.append([
+            str(100000 + i),
+            categoria,
+            producto,
+            fabricante,
+            f"PN-{100000 + i}",
+            "U$D",
+            f"{price / 1.21:.2f}".replace(".", ","),
+            "21,00",
+            "0",
+            f"{price:.2f}".replace(".", ","),
+            rng.choice(["0", "nan", "", "1", "3", "8", "25", "120"]),
+        ])
+    return rows
+
+
+def _percentiles(values: List[float]) -> str:
+    if not values:
+        return "n/a"
+    if len(values) == 1:
+        ms = values[0] * 1000
+        return f"p50={ms:7.2f}ms  p95={ms:7.2f}ms  p99={ms:7.2f}ms"
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return "  ".join(
+        f"{name}={cuts[index] * 1000:7.2f}ms" for name, index in (("p50", 49), ("p95", 94), ("p99", 98))
+    )
+
+
+def _count_queries():
+    """Counts `execute` calls on the cursors used by data_manager and async_data_manager."""
+    import psycopg
+    from psycopg2.extras import DictCursor
+
+    def counting(execute):
+        def wrapper(self, *args, **kwargs):
+            counter = _turn_queries.get()
+            if counter is not None:
+                counter[0] += 1
+            return execute(self, *args, **kwargs)
+        return wrapper
+
+    DictCursor.execute = counting(DictCursor.execute)
+    psycopg.Cursor.execute = counting(psycopg.Cursor.execute)
+    psycopg.AsyncCursor.execute = counting(psycopg.AsyncCursor.execute)
+
+
+def _replay_model(conversations, tool_names):
+    """Stub model: per conversation prefix, the recorded tool calls and answer."""
+    from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+    from google.genai import types
+
+    scripts: Dict[Tuple[str, ...], Tuple[List[dict], str]] = {}
+    skipped = Counter()
+    for _, turns in conversations:
+        queries = []
+        for turn in turns:
+            queries.append(turn["query"].strip())
+            calls = []
+            for call in turn.get("expected_tool_use", []):
+                if call["tool_name"] in tool_names:
+                    calls.append(call)
+                else:
+                    skipped[call["tool_name"]] += 1
+            scripts[tuple(queries)] = (calls, turn.get("reference", ""))
+
+    class ReplayLlm(BaseLlm):
+        latency_secs: float = 0.0
+
+        async def generate_content_async(
+            self, llm_request: LlmRequest, stream: bool = False
+        ) -> AsyncGenerator[LlmResponse, None]:
+            if self.latency_secs:
+                await asyncio.sleep(self.latency_secs)
+            queries, tool_results = [], False
+            for content in llm_request.contents:
+                parts = content.parts or []
+                tool_results = any(part.function_response for part in parts)
+                if content.role == "user" and not tool_results:
+                    text = "".join(part.text or "" for part in parts).strip()
+                    if text:
+                        queries.append(text)
+            calls, reference = scripts.get(tuple(queries), ([], "(sin guion)"))
+            if calls and not tool_results:
+                parts = [
+                    types.Part(function_call=types.FunctionCall(
+                        name=call["tool_name"], args=call.get("tool_input", {})
+                    ))
+                    for call in calls
+                ]
+            else:
+                parts = [types.Part(text=reference or " ")]
+            yield LlmResponse(content=types.Content(role="model", parts=parts))
+
+    return ReplayLlm, skipped
+
+
+def _setup_database(configs, admin_db: str, skus: int):
+    import psycopg2
+
+    from customer_service.catalog_import import import_catalog
+    from customer_service.db_migrations import bootstrap_database, maintain_indexes
+    from customer_service.db_pool import create_connection
+
+    admin = psycopg2.connect(
+        dbname=admin_db, user=configs.DB_USER, password=configs.DB_PASSWORD,
+        host=configs.DB_HOST, port=configs.DB_PORT,
+    )
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f'CREATE DATABASE "{configs.DB_NAME}";')
+    admin.close()
+
+    with open(os.path.join(ROOT, "schema.sql"), encoding="utf-8") as f:
+        schema = "\n".join(line for line in f if not line.startswith("\\"))
+    conn = create_connection(configs)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(schema)
+        conn.commit()
+        bootstrap_database(conn)
+        start = time.perf_counter()
+        report = import_catalog(conn, synthetic_catalog(skus), prune=False)
+        maintain_indexes(conn)
+        print(f"seeded {report.inserted} SKUs in {time.perf_counter() - start:.2f}s")
+    finally:
+        conn.close()
+
+
+def _drop_database(configs, admin_db: str):
+    import psycopg2
+
+    admin = psycopg2.connect(
+        dbname=admin_db, user=configs.DB_USER, password=configs.DB_PASSWORD,
+        host=configs.DB_HOST, port=configs.DB_PORT,
+    )
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute(f'DROP DATABASE IF EXISTS "{configs.DB_NAME}" WITH (FORCE);')
+    admin.close()
+
+
+async def run_load(agent, conversations, sessions: int, concurrency: int):
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+
+    tool_latencies: Dict[str, List[float]] = defaultdict(list)
+    started: Dict[str, float] = {}
+
+    def start_tool_timer(tool, args, tool_context):
+        started[tool_context.function_call_id] = time.perf_counter()
+
+    def stop_tool_timer(tool, args, tool_context, tool_response):
+        start = started.pop(tool_context.function_call_id, None)
+        if start is not None:
+            tool_latencies[tool.name].append(time.perf_counter() - start)
+
+    def listed(callback):
+        return callback if isinstance(callback, list) else [callback] if callback else []
+
+    agent = agent.clone(update={
+        "before_tool_callback": [start_tool_timer, *listed(agent.before_tool_callback)],
+        "after_tool_callback": [stop_tool_timer, *listed(agent.after_tool_callback)],
+    })
+    runner = InMemoryRunner(agent=agent, app_name="bench_agent_load")
+    turn_latencies: List[float] = []
+    queries_per_turn: List[int] = []
+    failures = Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def session(index: int):
+        _, turns = conversations[index % len(conversations)]
+        user_id = f"bench-{index}"
+        async with semaphore:
+            created = await runner.session_service.create_session(
+                app_name=runner.app_name, user_id=user_id
+            )
+            for turn in turns:
+                counter = [0]
+                token = _turn_queries.set(counter)
+                start = time.perf_counter()
+                try:
+                    async for _ in runner.run_async(
+                        user_id=user_id,
+                        session_id=created.id,
+                        new_message=types.Content(role="user", parts=[types.Part(text=turn["query"])]),
+                    ):
+                        pass
+                except Exception as e:
+                    failures[type(e).__name__] += 1
+                    continue
+                finally:
+                    _turn_queries.reset(token)
+                turn_latencies.append(time.perf_counter() - start)
+                queries_per_turn.append(counter[0])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session(index) for index in range(sessions)))
+    elapsed = time.perf_counter() - start
+    return elapsed, turn_latencies, queries_per_turn, tool_latencies, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100, help="Conversations to replay.")
+    parser.add_argument("--concurrency", type=int, default=20, help="Sessions running at once.")
+    parser.add_argument("--skus", type=int, default=5000, help="Synthetic catalog size.")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="Simulated model latency.")
+    parser.add_argument("--conversations", nargs="*", default=DEFAULT_CONVERSATIONS)
+    parser.add_argument("--sync-tools", action="store_true", help="Use the psycopg2 tools.")
+    parser.add_argument("--no-product-cache", action="store_true")
+    parser.add_argument("--admin-db", default="postgres", help="Database used to create/drop the test one.")
+    parser.add_argument("--keep-db", action="store_true")
+    parser.add_argument("--trace-dir", help="Enable tracing and write folded stacks here.")
+    args = parser.parse_args()
+
+    # The agent reads its settings at import time: configure before importing it.
+    os.environ["GOOGLE_DB_NAME"] = f"customer_service_bench_{uuid.uuid4().hex[:8]}"
+    os.environ["GOOGLE_DB_ASYNC_TOOLS"] = "false" if args.sync_tools else "true"
+    os.environ["GOOGLE_PRODUCT_CACHE_ENABLED"] = "false" if args.no_product_cache else "true"
+    os.environ["GOOGLE_CONVERSATION_LOG_ENABLED"] = "false"
+    os.environ["GOOGLE_LLM_RPM_PER_MODEL"] = os.environ["GOOGLE_LLM_RPM_PER_PROJECT"] = "100000000"
+    if args.trace_dir:
+        os.environ["GOOGLE_TRACE_ENABLED"] = "true"
+        os.environ["GOOGLE_TRACE_DIR"] = args.trace_dir
+
+    from customer_service.agent import root_agent
+    from customer_service.async_data_manager import close_async_pool, get_async_pool_metrics
+    from customer_service.config import Config
+    from customer_service.data_manager import get_db_pool_metrics
+    from customer_service.db_pool import close_pool
+    from customer_service.tracing import get_trace_stats
+
+    logging.getLogger().setLevel(logging.WARNING)
+    configs = Config()
+    conversations = load_conversations(args.conversations)
+    if not conversations:
+        parser.error(f"no conversations found in {args.conversations}")
+    tool_names = {getattr(tool, "__name__", getattr(tool, "name", None)) for tool in root_agent.tools}
+    ReplayLlm, skipped = _replay_model(conversations, tool_names)
+    agent = root_agent.clone(update={
+        "model": ReplayLlm(model="replay-stub", latency_secs=args.model_latency_ms / 1000)
+    })
+
+    _count_queries()
+    _setup_database(configs, args.admin_db, args.skus)
+    try:
+        async def run():
+            try:
+                result = await run_load(agent, conversations, args.sessions, args.concurrency)
+                return result, get_db_pool_metrics() if args.sync_tools else get_async_pool_metrics()
+            finally:
+                await close_async_pool()
+
+        (elapsed, turn_latencies, queries, tool_latencies, failures), pool_metrics = asyncio.run(run())
+    finally:
+        close_pool()
+        if args.keep_db:
+            print(f"kept database {configs.DB_NAME}")
+        else:
+            _drop_database(configs, args.admin_db)
+
+    print(f"conversations: {', '.join(name for name, _ in conversations)}")
+    if skipped:
+        print(f"skipped recorded calls to unknown tools: {dict(skipped)}")
+    print(
+        f"sessions={args.sessions} concurrency={args.concurrency} skus={args.skus} "
+        f"tools={'sync' if args.sync_tools else 'async'}"
+    )
+    turns = len(turn_latencies)
+    print(f"turns      {turns} in {elapsed:.2f}s -> {turns / elapsed:.1f} turns/s  failed={dict(failures)}")
+    print(f"turn       {_percentiles(turn_latencies)}")
+    all_tools = [latency for latencies in tool_latencies.values() for latency in latencies]
+    print(f"tools      {_percentiles(all_tools)}  calls={len(all_tools)} ({len(all_tools) / elapsed:.1f}/s)")
+    for name, latencies in sorted(tool_latencies.items()):
+        print(f"  {name:<22} n={len(latencies):<6} {_percentiles(latencies)}")
+    if queries:
+        print(
+            f"SQL/turn   mean={statistics.fmean(queries):.2f}  "
+            f"p95={sorted(queries)[int(len(queries) * 0.95)]}  max={max(queries)}  total={sum(queries)}"
+        )
+    print(f"pool       {pool_metrics}")
+    for name, entry in sorted(get_trace_stats().items()):
+        counts = {key: value for key, value in entry.items() if not key.endswith("_ms") and key != "count"}
+        print(f"  span {name:<22} n={entry['count']:<6} avg={entry['avg_ms']:7.2f}ms  {counts}")
+
+
+if __name__ == "__main__":
+    main()
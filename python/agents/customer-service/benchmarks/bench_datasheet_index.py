@@ -0,0 +1,108 @@
+"""Recall and latency benchmark for the local datasheet index.
+
+Builds an index over synthetic datasheets (filler text with a few spec lines
+per part) and asks "TDP del <part number>" style questions whose answer is
+known. Reports recall@k and latency for BM25 with and without the
+part-number filter, for the hybrid ranking (with a hashing embedder standing
+in for a real embedding model), and the simulated round trip of the remote
+datastore for reference. The "memoria" and "frecuencia" questions share no
+word with their English spec line, so BM25 only finds them through the part
+number; that is the gap a real embedding model is meant to close.
+
+    python -m benchmarks.bench_datasheet_index
+"""
+
+import argparse
+import hashlib
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from customer_service.datasheet_index import DatasheetIndex, build_index
+
+SPECS = {
+    "TDP": ("TDP", "W", (35, 45, 65, 95, 105, 125, 170)),
+    "socket": ("socket", "", ("AM4", "AM5", "LGA1200", "LGA1700", "LGA1851")),
+    "memoria": ("max memory", "GB", (32, 64, 128, 192)),
+    "frecuencia": ("boost clock", "GHz", (4.2, 4.4, 4.6, 5.1, 5.4, 5.7)),
+}
+
+
+def hashing_embedder(texts, dim=256):
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            matrix[row, int(hashlib.md5(word.encode()).hexdigest()[:8], 16) % dim] += 1
+    return matrix
+
+
+def synthetic_datasheets(parts: int, words: int, seed: int = 3):
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(5000)]
+    datasheets, answers = {}, {}
+    for i in range(parts):
+        part_number = f"BT{i:05d}-{rng.choice('ABCDX')}"
+        filler = rng.choices(vocabulary, k=words)
+        for key, (label, unit, values) in SPECS.items():
+            value = rng.choice(values)
+            sentence = f"{label} {value} {unit}".strip()
+            filler.insert(rng.randrange(len(filler)), sentence)
+            answers[(part_number, key)] = sentence
+        datasheets[part_number] = " ".join(filler)
+    return datasheets, answers
+
+
+def run(index, questions, answers, k, filter_part_numbers, hybrid):
+    latencies, found = [], 0
+    for part_number, key in questions:
+        query = f"{key} del {part_number}"
+        start = time.perf_counter()
+        embedding = hashing_embedder([query])[0] if hybrid else None
+        hits = index.search(
+            query, k=k, query_embedding=embedding, filter_part_numbers=filter_part_numbers
+        )
+        latencies.append(time.perf_counter() - start)
+        answer = answers[(part_number, key)]
+        found += any(hit.part_number == part_number and answer in hit.text for hit in hits)
+    latencies.sort()
+    return found / len(questions), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--parts", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=800)
+    parser.add_argument("--questions", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--remote-latency-ms", type=float, default=150)
+    args = parser.parse_args()
+
+    datasheets, answers = synthetic_datasheets(args.parts, args.words)
+    rng = random.Random(11)
+    questions = [
+        (rng.choice(list(datasheets)), rng.choice(list(SPECS))) for _ in range(args.questions)
+    ]
+
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        stats = build_index(datasheets.items(), folder, embedder=hashing_embedder)
+        print(f"built {stats} in {time.perf_counter() - start:.1f}s")
+        index = DatasheetIndex(folder)
+
+        for filter_part_numbers in (True, False):
+            for hybrid in (False, True):
+                name = f"{'hybrid' if hybrid else 'bm25'}, {'part filter' if filter_part_numbers else 'no filter'}"
+                recall, latencies = run(
+                    index, questions, answers, args.k, filter_part_numbers, hybrid
+                )
+                p50 = statistics.median(latencies) * 1000
+                p95 = latencies[int(len(latencies) * 0.95)] * 1000
+                print(f"{name:<22} recall@{args.k}={recall:.3f}  p50={p50:7.2f}ms  p95={p95:7.2f}ms")
+    print(f"{'remote (simulated)':<22} round trip ~{args.remote_latency_ms:.0f}ms per query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark for the datasheet retrieval layer.
+
+Replays a skewed stream of spec questions (a few popular parts asked by many
+customers, with different casing and punctuation) from concurrent sessions
+against `FakeSearchBackend`, which simulates the search round trip. Compares
+the uncached path (one search per question) with `DatasheetRetriever`.
+
+    python -m benchmarks.bench_datasheet_rag
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from customer_service.datasheet_rag import DatasheetRetriever, FakeSearchBackend
+from customer_service.shared_libraries.cache import LRUTTLCache
+
+
+def _corpus(parts: int):
+    return {
+        f"doc-{i}": f"Ryzen {i} datasheet: TDP {35 + i % 90} W, socket AM{4 + i % 2}, {i % 16 + 2} cores"
+        for i in range(parts)
+    }
+
+
+def _questions(count: int, parts: int, seed: int = 7):
+    rng = random.Random(seed)
+    templates = ["TDP del Ryzen {}", "¿tdp del ryzen {}?", "TDP  del RYZEN {} ", "socket del Ryzen {}"]
+    # Zipf-like popularity: most questions are about a handful of parts.
+    weights = [1 / (rank + 1) for rank in range(parts)]
+    chosen = rng.choices(range(parts), weights=weights, k=count)
+    return [rng.choice(templates).format(part) for part in chosen]
+
+
+async def _replay(search, questions, sessions: int) -> float:
+    queue = list(questions)
+    start = time.perf_counter()
+
+    async def session():
+        while queue:
+            await search(queue.pop())
+
+    await asyncio.gather(*(session() for _ in range(sessions)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument("--parts", type=int, default=500)
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=120)
+    args = parser.parse_args()
+
+    documents = _corpus(args.parts)
+    questions = _questions(args.questions, args.parts)
+
+    backend = FakeSearchBackend(documents, latency_secs=args.latency_ms / 1000)
+
+    async def uncached(query):
+        return await asyncio.to_thread(backend.search, query, 5)
+
+    elapsed = asyncio.run(_replay(uncached, questions, args.sessions))
+    print(f"uncached   {elapsed:6.2f}s  backend calls={backend.calls}")
+
+    backend = FakeSearchBackend(documents, latency_secs=args.latency_ms / 1000)
+    retriever = DatasheetRetriever(backend, LRUTTLCache(max_size=2000, ttl=3600))
+    elapsed = asyncio.run(_replay(retriever.search_async, questions, args.sessions))
+    print(f"retriever  {elapsed:6.2f}s  {retriever.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Throughput benchmark for the datasheet upload stage.
+
+Uploads synthetic PDFs to an in-memory blob store that simulates per-request
+network latency, with 1 worker (the old sequential loop) and with a pool.
+
+    python -m benchmarks.bench_datasheet_upload
+"""
+
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from customer_service.datasheet_inventory import LOCAL, ManifestEntry
+from customer_service.datasheet_uploader import upload_datasheets
+
+
+class SimulatedBlobStore:
+    def __init__(self, latency_secs: float, bandwidth_mb_s: float):
+        self.latency_secs = latency_secs
+        self.bandwidth = bandwidth_mb_s * 1e6
+        self.uploaded = 0
+        self._lock = threading.Lock()
+
+    def upload(self, local_path, destination):
+        size = Path(local_path).stat().st_size
+        time.sleep(self.latency_secs + size / self.bandwidth)
+        with self._lock:
+            self.uploaded += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=512)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--bandwidth-mb-s", type=float, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        payload = b"%PDF" + b"\0" * (args.size_kb * 1024 - 4)
+        entries = []
+        for i in range(args.files):
+            name = f"PN-{i}.pdf"
+            (Path(folder) / name).write_bytes(payload)
+            entries.append(ManifestEntry(f"PN-{i}", name, f"{i:064d}", len(payload), 0.0, LOCAL, None))
+
+        for workers in (1, 4, 8, 16):
+            store = SimulatedBlobStore(args.latency_ms / 1000, args.bandwidth_mb_s)
+            summary = upload_datasheets(
+                entries, store, folder, on_batch=lambda batch: None, workers=workers
+            )
+            files_per_sec = summary.uploaded / summary.elapsed_secs
+            print(f"workers={workers:<3} {files_per_sec:7.1f} files/s  {summary}")
+
+
+if __name__ == "__main__":
+    main()
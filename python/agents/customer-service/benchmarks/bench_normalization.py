@@ -0,0 +1,81 @@
+"""Micro-benchmark de la normalización de búsquedas.
+
+Compara la implementación anterior (cadena de if/elif y seis `re.search` por
+nombre de producto) con `customer_service.normalization`.
+
+    python -m benchmarks.bench_normalization
+"""
+
+import re
+import timeit
+
+from customer_service import normalization
+
+PRODUCT_NAMES = [
+    "Proces. Intel Core I3-10100 Cometlake S1200",
+    "Proces. AMD Ryzen 5 5600G AM4 c/Video",
+    "Mother Asus Prime H610M-E D4 LGA1700",
+    "Mother MSI A520M-A PRO AM4",
+    "Proces. AMD Ryzen Threadripper 3960X sTRX4",
+    "Fuente Gigabyte 650W 80 Plus Bronze",
+    "Mouse Logitech G203 Lightsync Negro",
+]
+TERMS = ["r3", "r5", "i7", "i9", "a520m", "rtx 4060", "ddr4"]
+
+
+def legacy_extract_socket(product_name):
+    patterns = [
+        r'S(\d{3,4})',
+        r'AM(\d)',
+        r'LGA(\d{3,4})',
+        r'(\d{3,4})',
+        r'TR(\d)',
+        r'sTRX(\d)'
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, product_name, re.IGNORECASE)
+        if match:
+            return match.group(0).upper()
+    return None
+
+
+def legacy_expand_series(producto):
+    processed_producto = producto.lower()
+    if processed_producto == 'r3':
+        return ['ryzen 3', 'r3']
+    elif processed_producto == 'r5':
+        return ['ryzen 5', 'r5']
+    elif processed_producto == 'r7':
+        return ['ryzen 7', 'r7']
+    elif processed_producto == 'r9':
+        return ['ryzen 9', 'r9']
+    elif processed_producto == 'i3':
+        return ['core i3', 'i3']
+    elif processed_producto == 'i5':
+        return ['core i5', 'i5']
+    elif processed_producto == 'i7':
+        return ['core i7', 'i7']
+    elif processed_producto == 'i9':
+        return ['core i9', 'i9']
+    return [producto]
+
+
+def _per_call_ns(func, inputs, number):
+    total = timeit.timeit(lambda: [func(value) for value in inputs], number=number)
+    return total / (number * len(inputs)) * 1e9
+
+
+def main(number: int = 20000):
+    cases = [
+        ("socket (anterior)", legacy_extract_socket, PRODUCT_NAMES),
+        ("socket (precompilado, sin memo)", normalization.extract_socket.__wrapped__, PRODUCT_NAMES),
+        ("socket (memorizado)", normalization.extract_socket, PRODUCT_NAMES),
+        ("series (if/elif)", legacy_expand_series, TERMS),
+        ("series (tabla, memorizado)", normalization.expand_series, TERMS),
+    ]
+    for label, func, inputs in cases:
+        print(f"{label:<34} {_per_call_ns(func, inputs, number):>9.0f} ns/llamada")
+
+
+if __name__ == "__main__":
+    main()
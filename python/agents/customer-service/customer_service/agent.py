@@ -4,17 +4,13 @@ from .config import Config # Importa la clase Config desde el módulo de configu
 from .prompts import GLOBAL_INSTRUCTION, INSTRUCTION # Importa las instrucciones globales y específicas del agente.
 from .shared_libraries.callbacks import ( # Importa funciones de callback (funciones que se ejecutan en ciertos momentos).
     rate_limit_callback, # Callback para manejar límites de tasa (previene exceso de llamadas a la API).
+    log_conversation_callback, # Callback que guarda cada respuesta en el historial de conversaciones.
     before_agent,      # Callback que se ejecuta antes de que el agente procese una solicitud.
     before_tool,       # Callback que se ejecuta antes de que una herramienta sea invocada.
     after_tool         # Callback que se ejecuta después de que una herramienta ha terminado su ejecución.
 )
-from .tools.tools import (
-    search_products,
-    add_item_to_quote,
-    view_quote,
-    remove_item_from_quote,
-    clear_quote
-)
+from .tools import async_tools, tools
+from .tracing import enable_tracing
 
 # Filtra las advertencias de usuario relacionadas con el módulo 'pydantic'.
 # Esto es común en entornos de desarrollo para suprimir mensajes que no afectan la funcionalidad.
@@ -23,6 +19,15 @@ warnings.filterwarnings("ignore", category=UserWarning, module=".*pydantic.*")
 # Instancia la clase Config para cargar la configuración del agente desde el archivo de configuración.
 configs = Config()
 
+# Las herramientas asíncronas consultan la base sin bloquear el event loop del runner,
+# así un mismo worker atiende varias conversaciones a la vez. Con DB_ASYNC_TOOLS=false
+# se usan las versiones sincrónicas (psycopg2).
+_tools = async_tools if configs.DB_ASYNC_TOOLS else tools
+
+# Instrumentación de herramientas, consultas SQL y checkouts del pool (apagada por defecto).
+if configs.TRACE_ENABLED:
+    enable_tracing(configs.TRACE_DIR or None)
+
 # Define e inicializa la instancia principal del Agente (BotTech Assistant).
 root_agent = Agent(
     # Modelo de IA que utilizará el agente (ej. 'gemini-pro'). Definido en la configuración.
@@ -42,11 +47,13 @@ root_agent = Agent(
     # Lista de herramientas que este agente tiene permiso para usar.
     # En esta fase, solo incluye 'search_products_csv' para el asesoramiento.
     tools=[
-        search_products,
-        add_item_to_quote,
-        view_quote,
-        remove_item_from_quote,
-        clear_quote
+        _tools.search_products,
+        _tools.search_products_with_specs,
+        _tools.add_item_to_quote,
+        _tools.add_items_to_quote,
+        _tools.view_quote,
+        _tools.remove_item_from_quote,
+        _tools.clear_quote
     ],
     
     # Configuración de los callbacks: funciones que se ejecutarán automáticamente
@@ -56,4 +63,5 @@ root_agent = Agent(
     before_agent_callback=before_agent,    # Se ejecuta antes de que el agente procese la entrada del usuario.
     before_model_callback=rate_limit_callback, # Se ejecuta antes de hacer una llamada al modelo de IA,
                                                 # útil para controlar la tasa de uso de la API.
+    after_model_callback=log_conversation_callback, # Encola la respuesta para el historial (sin esperar a la base).
 )
\ No newline at end of file
@@ -0,0 +1,292 @@
+"""Variante asíncrona de `data_manager` (psycopg 3 + psycopg_pool).
+
+El runner de ADK corre sobre asyncio: las herramientas asíncronas usan estas
+funciones para consultar la base sin bloquear el event loop, así un mismo
+worker atiende muchas conversaciones a la vez. Las consultas, los niveles de
+búsqueda y el cache de productos son los mismos que en la versión sincrónica.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from .config import Config
+from .data_manager import (
+    PRODUCT_SELECT,
+    _SearchTier,
+    _build_search_tiers,
+    _build_tiers_with_fallback,
+    _combined_tiers_query,
+    _convert_decimals_to_floats,
+    _tier_query,
+)
+from .db_migrations import TRGM_SIMILARITY_LIMIT, bootstrap_statements
+from .product_cache import get_product_cache
+from .tracing import annotate, span
+
+logger = logging.getLogger(__name__)
+
+configs = Config()
+
+# Un pool por event loop: las conexiones asíncronas quedan ligadas al loop en
+# el que se abrieron. Se guarda la tarea de apertura para que las corrutinas
+# que llegan mientras el pool se abre esperen a la misma tarea.
+_async_pools: "Dict[asyncio.AbstractEventLoop, asyncio.Task]" = {}
+_bootstrap_done = False
+
+
+def _conninfo() -> str:
+    return make_conninfo(
+        dbname=configs.DB_NAME,
+        user=configs.DB_USER,
+        password=configs.DB_PASSWORD,
+        host=configs.DB_HOST,
+        port=configs.DB_PORT,
+    )
+
+
+async def _configure_connection(conn):
+    """Igual que `db_migrations.configure_connection`, para conexiones async.
+
+    psycopg 3 envía el parámetro como `float8` y `set_limit` recibe `real`, que
+    no tiene conversión implícita: hace falta el cast explícito.
+    """
+    await conn.execute("SELECT set_limit(%s::real);", (TRGM_SIMILARITY_LIMIT,))
+    await conn.commit()
+
+
+async def _bootstrap(pool: AsyncConnectionPool):
+    global _bootstrap_done
+    if _bootstrap_done:
+        return
+    async with pool.connection() as conn:
+        await conn.set_autocommit(True)
+        try:
+            for statement in bootstrap_statements():
+                await conn.execute(statement)
+        finally:
+            await conn.set_autocommit(False)
+    _bootstrap_done = True
+
+
+async def _open_pool() -> AsyncConnectionPool:
+    pool = AsyncConnectionPool(
+        _conninfo(),
+        min_size=configs.DB_POOL_MIN_SIZE,
+        max_size=configs.DB_POOL_MAX_SIZE,
+        max_idle=configs.DB_POOL_IDLE_TIMEOUT_SECS,
+        timeout=configs.DB_POOL_CHECKOUT_TIMEOUT_SECS,
+        check=AsyncConnectionPool.check_connection,
+        configure=_configure_connection,
+        open=False,
+    )
+    await pool.open()
+    await _bootstrap(pool)
+    return pool
+
+
+async def get_async_pool() -> AsyncConnectionPool:
+    """Devuelve el pool async del event loop actual, abriéndolo en el primer uso."""
+    loop = asyncio.get_running_loop()
+    task = _async_pools.get(loop)
+    if task is None or (task.done() and task.exception() is not None):
+        for other in [other for other in _async_pools if other.is_closed()]:
+            del _async_pools[other]
+        task = _async_pools[loop] = loop.create_task(_open_pool())
+    return await asyncio.shield(task)
+
+
+async def close_async_pool():
+    """Cierra el pool async del event loop actual."""
+    task = _async_pools.pop(asyncio.get_running_loop(), None)
+    if task is not None and not task.cancelled():
+        await (await task).close()
+
+
+@asynccontextmanager
+async def _connection():
+    """Como `pool.connection()`, pero midiendo la espera por la conexión (span `db.checkout`)."""
+    pool = await get_async_pool()
+    with span("db.checkout"):
+        conn = await pool.getconn()
+    try:
+        async with conn:
+            yield conn
+    finally:
+        await pool.putconn(conn)
+
+
+def get_async_pool_metrics() -> Dict[str, Any]:
+    """Métricas de psycopg_pool (esperas, conexiones, errores) del loop actual."""
+    try:
+        task = _async_pools.get(asyncio.get_running_loop())
+    except RuntimeError:
+        return {}
+    if task is None or not task.done() or task.exception() is not None:
+        return {}
+    return task.result().get_stats()
+
+
+async def get_product_by_code_async(code: str) -> Optional[Dict[str, Any]]:
+    """Versión async de `get_product_by_code_from_db`."""
+    cache = get_product_cache()
+    cached = cache.get(code)
+    annotate(cache_hit=cached is not None)
+    if cached is not None:
+        return cached
+
+    generation = cache.generation()
+    product = None
+    try:
+        with span("sql.product_by_code") as current:
+            async with _connection() as conn:
+                async with conn.cursor(row_factory=dict_row) as cur:
+                    await cur.execute(
+                        f'SELECT {PRODUCT_SELECT} FROM productos p WHERE "Codigo" = %s;', (code,)
+                    )
+                    product = await cur.fetchone()
+            current.set(rows=int(product is not None))
+    except Exception as e:
+        logger.error("Error al buscar el producto: %s", e)
+
+    if not product:
+        return None
+    product = _convert_decimals_to_floats(product)
+    cache.put(product, generation)
+    return product
+
+
+async def get_products_by_codes_async(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Versión async de `get_products_by_codes_from_db`."""
+    cache = get_product_cache()
+    found: Dict[str, Dict[str, Any]] = {}
+    missing = []
+    for code in dict.fromkeys(codes):
+        cached = cache.get(code)
+        if cached is not None:
+            found[code] = cached
+        else:
+            missing.append(code)
+    annotate(cache_hits=len(found), cache_misses=len(missing))
+    if not missing:
+        return found
+
+    generation = cache.generation()
+    try:
+        with span("sql.products_by_codes", codes=len(missing)) as current:
+            async with _connection() as conn:
+                async with conn.cursor(row_factory=dict_row) as cur:
+                    await cur.execute(
+                        f'SELECT {PRODUCT_SELECT} FROM productos p WHERE "Codigo" = ANY(%s);',
+                        (missing,),
+                    )
+                    rows = await cur.fetchall()
+            current.set(rows=len(rows))
+    except Exception as e:
+        logger.error("Error al buscar los productos: %s", e)
+        return found
+
+    products = [_convert_decimals_to_floats(row) for row in rows]
+    cache.put_many(products, generation)
+    found.update((product["Codigo"], product) for product in products)
+    return found
+
+
+async def _run_search_tiers_async(
+    tiers: List[_SearchTier],
+) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+    """Versión async de `data_manager._run_search_tiers`."""
+    if not tiers:
+        return None, []
+
+    cache = get_product_cache()
+    generation = cache.generation()
+    try:
+        with span("sql.search", mode=configs.DB_SEARCH_MODE) as current:
+            async with _connection() as conn:
+                async with conn.cursor(row_factory=dict_row) as cur:
+                    if configs.DB_SEARCH_MODE == "sequential":
+                        for index, tier in enumerate(tiers):
+                            with span("sql.tier", tier=tier.name) as tier_span:
+                                await cur.execute(*_tier_query(tier))
+                                products = [_convert_decimals_to_floats(row) for row in await cur.fetchall()]
+                                tier_span.set(rows=len(products))
+                            if products:
+                                current.set(tier=tier.name, rows=len(products))
+                                cache.put_many(products, generation)
+                                return index, products
+                        current.set(tier=None, rows=0)
+                        return None, []
+
+                    await cur.execute(*_combined_tiers_query(tiers))
+                    rows = await cur.fetchall()
+            current.set(tier=tiers[rows[0]["search_tier"]].name if rows else None, rows=len(rows))
+    except Exception as e:
+        logger.error("Error al buscar productos en la base de datos: %s", e)
+        return None, []
+
+    if not rows:
+        return None, []
+    products = []
+    for product in rows:
+        tier_index = product.pop("search_tier")
+        product.pop("search_rank")
+        products.append(_convert_decimals_to_floats(product))
+    cache.put_many(products, generation)
+    return tier_index, products
+
+
+async def search_products_async(
+    categoria: Optional[str] = None,
+    fabricante: Optional[str] = None,
+    producto: Optional[str] = None,
+    precio_max_usd: Optional[float] = None,
+    precio_min_usd: Optional[float] = None,
+    codigo: Optional[str] = None,
+    nro_de_parte: Optional[str] = None,
+    socket_type: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Versión async de `search_products_from_db`."""
+    _, products = await _run_search_tiers_async(_build_search_tiers(
+        categoria=categoria,
+        fabricante=fabricante,
+        producto=producto,
+        precio_max_usd=precio_max_usd,
+        precio_min_usd=precio_min_usd,
+        codigo=codigo,
+        nro_de_parte=nro_de_parte,
+        socket_type=socket_type,
+    ))
+    return products
+
+
+async def search_products_with_fallback_async(
+    categoria: Optional[str] = None,
+    fabricante: Optional[str] = None,
+    producto: Optional[str] = None,
+    precio_max_usd: Optional[float] = None,
+    precio_min_usd: Optional[float] = None,
+    codigo: Optional[str] = None,
+    nro_de_parte: Optional[str] = None,
+    socket_type: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Versión async de `search_products_with_fallback_from_db`."""
+    tiers, primary_tiers = _build_tiers_with_fallback(
+        categoria=categoria,
+        fabricante=fabricante,
+        producto=producto,
+        precio_max_usd=precio_max_usd,
+        precio_min_usd=precio_min_usd,
+        codigo=codigo,
+        nro_de_parte=nro_de_parte,
+        socket_type=socket_type,
+    )
+    tier_index, products = await _run_search_tiers_async(tiers)
+    is_fallback = tier_index is not None and tier_index >= primary_tiers
+    annotate(fallback=is_fallback)
+    return products, is_fallback
@@ -0,0 +1,337 @@
+"""Importación incremental de la lista de precios del distribuidor.
+
+Reemplaza el circuito `limpiar_csv.py` (pandas) + `import_products.sql` (DROP y
+recarga completa). El CSV se lee en streaming y se envía fila por fila, con su
+posición en el archivo, con `COPY` a una tabla de staging; en memoria nunca hay
+más que el bloque que COPY está leyendo. La deduplicación por "Codigo" se hace
+en la base con la misma regla de antes (gana la primera fila con stock; si
+ninguna tiene stock, la primera que apareció). Desde ahí, en una única
+transacción:
+
+* se insertan los códigos nuevos,
+* se actualizan sólo las filas cuyo contenido cambió (`IS DISTINCT FROM`),
+* se borran los códigos que ya no están en la lista.
+
+Los agentes siguen leyendo el catálogo anterior hasta el COMMIT y ven el nuevo
+completo después (no hay ventana sin tabla), y el trigger de `productos` avisa
+por NOTIFY para que vacíen su cache.
+
+Uso:
+
+    python -m customer_service.catalog_import Lista_de_Precios.csv
+    python -m customer_service.catalog_import Lista_de_Precios.csv --clean-only limpio.csv
+"""
+
+import csv
+import io
+import logging
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .db_migrations import REFRESH_SEARCH_VIEW_SQL, maintain_indexes
+
+logger = logging.getLogger(__name__)
+
+# Columnas de `productos` en el orden en que vienen en la lista de precios.
+CATALOG_COLUMNS: Tuple[str, ...] = (
+    "Codigo",
+    "Categoria",
+    "Producto",
+    "Fabricante",
+    "Nro. de Parte",
+    "Moneda",
+    "Precio sin IVA",
+    "%IVA",
+    "Imp. Int.",
+    "Precio Final U$D",
+    "Stock",
+)
+
+# Columnas numéricas: el distribuidor usa coma decimal.
+_DECIMAL_COLUMNS = {"Precio sin IVA", "%IVA", "Imp. Int.", "Precio Final U$D"}
+
+# Valores de "Stock" que cuentan como "sin stock" (misma regla que limpiar_csv.py).
+_SIN_STOCK = {"0", "", "nan"}
+
+# Filas tal como vienen en el archivo y, a partir de ellas, una por código.
+_RAW_STAGING_TABLE = "productos_staging_filas"
+_STAGING_TABLE = "productos_staging"
+
+
+class ImportReport(NamedTuple):
+    """Resumen de una importación."""
+    rows_read: int
+    duplicates: int
+    inserted: int
+    updated: int
+    unchanged: int
+    deleted: int
+    elapsed_secs: float
+
+    def __str__(self) -> str:
+        return (
+            f"{self.rows_read} filas leídas ({self.duplicates} códigos duplicados), "
+            f"{self.inserted} insertadas, {self.updated} actualizadas, "
+            f"{self.unchanged} sin cambios, {self.deleted} eliminadas "
+            f"en {self.elapsed_secs:.2f}s"
+        )
+
+
+def _has_stock(value: Optional[str]) -> bool:
+    return (value or "").strip() not in _SIN_STOCK
+
+
+def read_catalog_rows(
+    lines: Iterable[str], delimiter: str = ";"
+) -> Iterator[List[str]]:
+    """Lee el CSV fila por fila y devuelve las columnas de `CATALOG_COLUMNS`.
+
+    La cabecera sólo se valida (se ignoran los espacios en los nombres); las
+    columnas se toman por posición, como hacía el `\\copy` anterior.
+    """
+    reader = csv.reader(lines, delimiter=delimiter)
+    header = [name.strip() for name in next(reader, [])]
+    if len(header) < len(CATALOG_COLUMNS) or header[0] != "Codigo":
+        raise ValueError(f"Cabecera inesperada en la lista de precios: {header}")
+    width = len(CATALOG_COLUMNS)
+    for row in reader:
+        if not row or not row[0].strip():
+            continue
+        row = row[:width] + [""] * (width - len(row))
+        row[0] = row[0].strip()
+        yield row
+
+
+def dedupe_by_code(rows: Iterable[List[str]]) -> Tuple[List[List[str]], int]:
+    """Deduplica por "Codigo" en memoria (para `--clean-only`, sin base).
+
+    Por cada código se queda con la primera fila que tenga stock o, si ninguna
+    tiene, con la primera que apareció. El resultado conserva el orden del
+    archivo (la posición de la fila elegida). `import_catalog` aplica la misma
+    regla en SQL (`_dedupe_sql`).
+
+    Returns:
+        Tuple[List[List[str]], int]: Filas únicas y cantidad de filas descartadas.
+    """
+    stock_index = CATALOG_COLUMNS.index("Stock")
+    chosen: Dict[str, Tuple[int, List[str]]] = {}
+    duplicates = 0
+    for position, row in enumerate(rows):
+        current = chosen.get(row[0])
+        if current is None:
+            chosen[row[0]] = (position, row)
+            continue
+        duplicates += 1
+        if not _has_stock(current[1][stock_index]) and _has_stock(row[stock_index]):
+            chosen[row[0]] = (position, row)
+    unique = [row for _, row in sorted(chosen.values(), key=lambda item: item[0])]
+    return unique, duplicates
+
+
+class _CsvStream(io.TextIOBase):
+    """Archivo de sólo lectura que serializa filas a CSV a medida que COPY lee."""
+
+    def __init__(self, rows: Iterable[Sequence[str]]):
+        self._rows = iter(rows)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self._pending = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> str:
+        if size is None or size < 0:
+            size = sys.maxsize
+        while len(self._pending) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._writer.writerow(row)
+            self._pending += self._buffer.getvalue()
+            self._buffer.seek(0)
+            self._buffer.truncate()
+        chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
+
+    readline = read
+
+
+def _quoted(column: str) -> str:
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _staging_column(column: str) -> str:
+    """Expresión que convierte la columna de staging (texto) al tipo final."""
+    staged = f"NULLIF(TRIM(s.{_quoted(column)}), '')"
+    if column in _DECIMAL_COLUMNS:
+        return f"CAST(REPLACE({staged}, ',', '.') AS DECIMAL(10, 2))"
+    if column == "Producto":
+        return f"COALESCE({staged}, '')"
+    return staged
+
+
+def _dedupe_sql() -> str:
+    """Crea la tabla de staging con una fila por código a partir de las filas crudas."""
+    columns = ", ".join(f"r.{_quoted(column)}" for column in ("posicion",) + CATALOG_COLUMNS)
+    sin_stock = ", ".join(f"'{value}'" for value in sorted(_SIN_STOCK))
+    return f"""
+        CREATE TEMP TABLE {_STAGING_TABLE} ON COMMIT DROP AS
+        SELECT DISTINCT ON (r."Codigo") {columns}
+        FROM {_RAW_STAGING_TABLE} r
+        ORDER BY r."Codigo", COALESCE(TRIM(r."Stock"), '') NOT IN ({sin_stock}) DESC, r.posicion;
+    """
+
+
+def _numbered(first: List[str], rows: Iterator[List[str]]) -> Iterator[List[str]]:
+    """Antepone a cada fila su posición en el archivo."""
+    yield ["0"] + first
+    for position, row in enumerate(rows, start=1):
+        yield [str(position)] + row
+
+
+def _upsert_sql() -> str:
+    columns = ", ".join(_quoted(column) for column in CATALOG_COLUMNS)
+    values = ", ".join(_staging_column(column) for column in CATALOG_COLUMNS)
+    updated = [column for column in CATALOG_COLUMNS if column != "Codigo"]
+    assignments = ", ".join(f"{_quoted(c)} = EXCLUDED.{_quoted(c)}" for c in updated)
+    current = ", ".join(f"productos.{_quoted(c)}" for c in updated)
+    incoming = ", ".join(f"EXCLUDED.{_quoted(c)}" for c in updated)
+    return f"""
+        WITH upsert AS (
+            INSERT INTO productos ({columns})
+            SELECT {values} FROM {_STAGING_TABLE} s ORDER BY s.posicion
+            ON CONFLICT ("Codigo") DO UPDATE SET {assignments}
+            WHERE ({current}) IS DISTINCT FROM ({incoming})
+            RETURNING (xmax = 0) AS insertado
+        )
+        SELECT count(*) FILTER (WHERE insertado), count(*) FILTER (WHERE NOT insertado)
+        FROM upsert;
+    """
+
+
+def import_catalog(conn, rows: Iterable[List[str]], prune: bool = True) -> ImportReport:
+    """Sincroniza `productos` con las filas de la lista de precios y refresca la vista de búsqueda.
+
+    Args:
+        conn: Conexión psycopg2; la importación se confirma en una transacción.
+        rows: Filas de `read_catalog_rows`.
+        prune: Si es True, borra los productos que no vienen en la lista.
+
+    Returns:
+        ImportReport: Cantidades de filas leídas, insertadas, actualizadas, etc.
+    """
+    start = time.monotonic()
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        # Una lista vacía (o mal exportada) no debe vaciar el catálogo.
+        raise ValueError("La lista de precios no tiene productos; no se importa nada.")
+
+    staging_columns = ", ".join(f"{_quoted(column)} TEXT" for column in CATALOG_COLUMNS)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"CREATE TEMP TABLE {_RAW_STAGING_TABLE} "
+                f"(posicion INTEGER, {staging_columns}) ON COMMIT DROP;"
+            )
+            cur.copy_expert(
+                f"COPY {_RAW_STAGING_TABLE} "
+                f"(posicion, {', '.join(_quoted(column) for column in CATALOG_COLUMNS)}) "
+                "FROM STDIN WITH (FORMAT csv)",
+                _CsvStream(_numbered(first, rows)),
+            )
+            cur.execute(f"SELECT count(*) FROM {_RAW_STAGING_TABLE};")
+            rows_read = cur.fetchone()[0]
+            cur.execute(_dedupe_sql())
+            unique = cur.rowcount
+            cur.execute(_upsert_sql())
+            inserted, updated = cur.fetchone()
+            deleted = 0
+            if prune:
+                cur.execute(
+                    f"DELETE FROM productos p WHERE NOT EXISTS "
+                    f"(SELECT 1 FROM {_STAGING_TABLE} s WHERE s.\"Codigo\" = p.\"Codigo\");"
+                )
+                deleted = cur.rowcount
+            # En la misma transacción: las búsquedas ven el catálogo nuevo
+            # junto con su vista, nunca uno nuevo con la vista vieja.
+            cur.execute(REFRESH_SEARCH_VIEW_SQL)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return ImportReport(
+        rows_read=rows_read,
+        duplicates=rows_read - unique,
+        inserted=inserted,
+        updated=updated,
+        unchanged=unique - inserted - updated,
+        deleted=deleted,
+        elapsed_secs=time.monotonic() - start,
+    )
+
+
+def write_clean_csv(
+    path: str, output_path: str, encoding: str = "latin-1", delimiter: str = ";"
+) -> int:
+    """Escribe la lista deduplicada en UTF-8 sin tocar la base (lo que hacía limpiar_csv.py).
+
+    Returns:
+        int: Cantidad de filas únicas escritas.
+    """
+    with open(path, newline="", encoding=encoding) as csv_file:
+        unique, _ = dedupe_by_code(read_catalog_rows(csv_file, delimiter))
+    with open(output_path, "w", newline="", encoding="utf-8") as output:
+        writer = csv.writer(output, delimiter=delimiter)
+        writer.writerow(CATALOG_COLUMNS)
+        writer.writerows(unique)
+    return len(unique)
+
+
+def import_catalog_file(
+    conn, path: str, encoding: str = "latin-1", delimiter: str = ";", prune: bool = True
+) -> ImportReport:
+    """Importa el CSV del distribuidor y actualiza las estadísticas/índices."""
+    with open(path, newline="", encoding=encoding) as csv_file:
+        report = import_catalog(conn, read_catalog_rows(csv_file, delimiter), prune=prune)
+    maintain_indexes(conn)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .config import Config
+    from .db_migrations import bootstrap_database
+    from .db_pool import create_connection
+
+    parser = argparse.ArgumentParser(description="Importa la lista de precios a la tabla productos.")
+    parser.add_argument("csv_path", help="CSV del distribuidor (separado por ';').")
+    parser.add_argument("--encoding", default="latin-1")
+    parser.add_argument(
+        "--no-prune", action="store_true",
+        help="No borrar los productos que no están en la lista.",
+    )
+    parser.add_argument(
+        "--clean-only", metavar="SALIDA",
+        help="Sólo escribir el CSV deduplicado en SALIDA, sin conectarse a la base.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.clean_only:
+        written = write_clean_csv(args.csv_path, args.clean_only, encoding=args.encoding)
+        print(f"Limpieza completada. Se guardaron {written} filas únicas en {args.clean_only}")
+        sys.exit(0)
+    connection = create_connection(Config())
+    try:
+        bootstrap_database(connection)
+        result = import_catalog_file(
+            connection, args.csv_path, encoding=args.encoding, prune=not args.no_prune
+        )
+    finally:
+        connection.close()
+    print(f"Importación completada: {result}")
@@ -53,3 +53,44 @@ class Config(BaseSettings):
     DB_PASSWORD: str = Field(default="")
     DB_HOST: str = Field(default="")
     DB_PORT: str = Field(default="")
+    DB_POOL_MIN_SIZE: int = Field(default=1)
+    DB_POOL_MAX_SIZE: int = Field(default=10)
+    DB_POOL_IDLE_TIMEOUT_SECS: float = Field(default=300.0)
+    DB_POOL_CHECKOUT_TIMEOUT_SECS: float = Field(default=10.0)
+    DB_POOL_HEALTH_CHECK_SECS: float = Field(default=30.0)
+    # "combined": todos los niveles de búsqueda en una sola sentencia.
+    # "sequential": un viaje a la base por nivel.
+    DB_SEARCH_MODE: str = Field(default="combined")
+    DB_ASYNC_TOOLS: bool = Field(default=True)
+    PRODUCT_CACHE_ENABLED: bool = Field(default=True)
+    PRODUCT_CACHE_MAX_SIZE: int = Field(default=5000)
+    PRODUCT_CACHE_TTL_SECS: float = Field(default=600.0)
+    DATASHEET_DIR: str = Field(default="customer_service/data/datasheets/")
+    DATASHEET_SEARCH_CONCURRENCY: int = Field(default=2)
+    DATASHEET_SEARCHES_PER_HOUR: int = Field(default=90)
+    DATASHEET_DOWNLOAD_CONCURRENCY: int = Field(default=8)
+    DATASHEET_PER_HOST_CONCURRENCY: int = Field(default=2)
+    DATASHEET_UPLOAD_WORKERS: int = Field(default=8)
+    DATASHEET_RAG_DATA_STORE_ID: str = Field(default="bottech_datasheets_rag")
+    DATASHEET_RAG_PAGE_SIZE: int = Field(default=5)
+    DATASHEET_RAG_CACHE_MAX_SIZE: int = Field(default=2000)
+    DATASHEET_RAG_CACHE_TTL_SECS: float = Field(default=3600.0)
+    # "remote" (Vertex AI Search) o "local" (índice en DATASHEET_INDEX_DIR).
+    DATASHEET_RAG_BACKEND: str = Field(default="remote")
+    DATASHEET_INDEX_DIR: str = Field(default="customer_service/data/datasheet_index/")
+    DATASHEET_INDEX_HYBRID: bool = Field(default=False)
+    DATASHEET_INDEX_EMBEDDING_MODEL: str = Field(default="text-embedding-005")
+    DATASHEET_SPECS_MAX_PRODUCTS: int = Field(default=5)
+    DATASHEET_SPECS_PER_PRODUCT: int = Field(default=2)
+    # Historial de conversaciones (ver conversation_log).
+    CONVERSATION_LOG_ENABLED: bool = Field(default=True)
+    CONVERSATION_LOG_BATCH_SIZE: int = Field(default=100)
+    CONVERSATION_LOG_FLUSH_INTERVAL_SECS: float = Field(default=2.0)
+    CONVERSATION_LOG_MAX_PENDING: int = Field(default=10000)
+    # Spans de herramientas, SQL y checkouts (ver tracing). Con TRACE_DIR se
+    # escribe además un archivo "folded stacks" por conversación.
+    TRACE_ENABLED: bool = Field(default=False)
+    TRACE_DIR: str = Field(default="")
+    LLM_RPM_PER_MODEL: int = Field(default=60)
+    LLM_RPM_PER_PROJECT: int = Field(default=300)
+    LLM_RATE_LIMIT_MAX_WAIT_SECS: float = Field(default=60.0)
@@ -0,0 +1,242 @@
+"""Registro diferido (write-behind) de `historial_conversaciones`.
+
+Cada respuesta del agente se anota en memoria con `record`, que no toca la
+base: un hilo de fondo junta los turnos y los escribe en lotes con `COPY`
+cuando se acumulan `batch_size` turnos o pasan `flush_interval_secs`, así la
+respuesta al usuario nunca espera un INSERT. La cola está acotada
+(`max_pending`): si la base no responde y se llena, los turnos nuevos se
+descartan (y se cuentan en `stats()`) en lugar de crecer sin límite. Al
+cerrar el proceso se escribe lo que quede pendiente.
+"""
+
+import atexit
+import csv
+import io
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional
+
+import psycopg2
+
+from .config import Config
+from .db_pool import get_pool
+
+logger = logging.getLogger(__name__)
+
+_COPY_SQL = (
+    "COPY historial_conversaciones "
+    "(usuario_id, mensaje_usuario, respuesta_ia, fecha_mensaje) "
+    "FROM STDIN WITH (FORMAT csv)"
+)
+_INSERT_SQL = (
+    "INSERT INTO historial_conversaciones "
+    "(usuario_id, mensaje_usuario, respuesta_ia, fecha_mensaje) VALUES (%s, %s, %s, %s)"
+)
+
+
+class Turn(NamedTuple):
+    """Un mensaje del usuario y la respuesta del agente."""
+    usuario_id: int
+    mensaje_usuario: str
+    respuesta_ia: str
+    fecha_mensaje: datetime
+
+
+def _insert_each(conn, rows: List[tuple]) -> int:
+    """Inserta fila por fila (con un savepoint cada una) y devuelve cuántas se descartaron."""
+    skipped = 0
+    with conn.cursor() as cur:
+        for row in rows:
+            cur.execute("SAVEPOINT turno;")
+            try:
+                cur.execute(_INSERT_SQL, row)
+            except (psycopg2.IntegrityError, psycopg2.DataError):
+                cur.execute("ROLLBACK TO SAVEPOINT turno;")
+                skipped += 1
+    return skipped
+
+
+def copy_turns(turns: List[Turn]):
+    """Escribe los turnos en `historial_conversaciones` con un único COPY.
+
+    Si el COPY falla por un dato inválido (por ejemplo, un `usuario_id` que no
+    está en `usuarios`), reintentarlo no serviría: el lote se guarda de a una
+    fila y sólo se descartan las inválidas.
+    """
+    # Postgres no admite el carácter NUL en columnas de texto.
+    rows = [
+        (
+            turn.usuario_id,
+            turn.mensaje_usuario.replace("\x00", ""),
+            turn.respuesta_ia.replace("\x00", ""),
+            turn.fecha_mensaje.isoformat(),
+        )
+        for turn in turns
+    ]
+    buffer = io.StringIO()
+    # Todo entre comillas: COPY lee un campo vacío sin comillas como NULL, y un
+    # turno sin texto (sólo una imagen) tiene `mensaje_usuario` vacío.
+    csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+    buffer.seek(0)
+    with get_pool().connection() as conn:
+        try:
+            try:
+                with conn.cursor() as cur:
+                    cur.copy_expert(_COPY_SQL, buffer)
+            except (psycopg2.IntegrityError, psycopg2.DataError) as e:
+                conn.rollback()
+                skipped = _insert_each(conn, rows)
+                logger.warning(
+                    "Se descartaron %d de %d turnos del historial inválidos: %s",
+                    skipped, len(rows), e,
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+class ConversationLogger:
+    """Cola acotada de turnos con un hilo que la escribe en lotes.
+
+    Args:
+        write: Recibe cada lote, en orden; si lanza una excepción el lote
+            vuelve a la cola y se reintenta en la próxima ronda.
+        batch_size: Turnos por escritura; llegar a esta cantidad despierta al hilo.
+        flush_interval_secs: Espera máxima de un turno antes de escribirse.
+        max_pending: Turnos en memoria como máximo.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[List[Turn]], None] = copy_turns,
+        batch_size: int = 100,
+        flush_interval_secs: float = 2.0,
+        max_pending: int = 10000,
+    ):
+        self._write = write
+        self.batch_size = batch_size
+        self.flush_interval_secs = flush_interval_secs
+        self.max_pending = max_pending
+        self._pending: Deque[Turn] = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closing = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failures = 0
+
+    def record(self, usuario_id: int, mensaje_usuario: str, respuesta_ia: str) -> bool:
+        """Encola un turno sin bloquear.
+
+        Returns:
+            bool: False si se descartó porque la cola está llena o el logger cerrado.
+        """
+        turn = Turn(usuario_id, mensaje_usuario, respuesta_ia, datetime.now(timezone.utc))
+        with self._lock:
+            if self._closing.is_set() or len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending.append(turn)
+            self.recorded += 1
+            pending = len(self._pending)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="conversation-log-writer", daemon=True
+                )
+                self._thread.start()
+        if pending >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def _run(self):
+        while not self._closing.is_set():
+            self._wake.wait(self.flush_interval_secs)
+            self._wake.clear()
+            if not self._flush():
+                # Con la base caída, no reintentar con cada turno que llega.
+                self._closing.wait(self.flush_interval_secs)
+        self._flush(final=True)
+
+    def _flush(self, final: bool = False) -> bool:
+        """Escribe la cola en lotes; ante un error deja el lote para la próxima ronda."""
+        while True:
+            with self._lock:
+                batch = [
+                    self._pending.popleft()
+                    for _ in range(min(self.batch_size, len(self._pending)))
+                ]
+            if not batch:
+                return True
+            try:
+                self._write(batch)
+            except Exception as e:
+                self.failures += 1
+                with self._lock:
+                    if final:
+                        self.dropped += len(batch) + len(self._pending)
+                        self._pending.clear()
+                    else:
+                        self._pending.extendleft(reversed(batch))
+                        # Devolver el lote puede exceder el límite: se sacrifican los más nuevos.
+                        while len(self._pending) > self.max_pending:
+                            self._pending.pop()
+                            self.dropped += 1
+                logger.error("No se pudo guardar el historial de conversaciones: %s", e)
+                return False
+            self.batches += 1
+            self.written += len(batch)
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Deja de aceptar turnos y escribe los pendientes (espera hasta `timeout`)."""
+        with self._lock:
+            self._closing.set()
+            thread = self._thread
+        self._wake.set()
+        if thread is not None:
+            thread.join(timeout)
+        else:
+            self._flush(final=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending": pending,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "failures": self.failures,
+        }
+
+
+_conversation_logger: Optional[ConversationLogger] = None
+_logger_lock = threading.Lock()
+
+
+def get_conversation_logger() -> ConversationLogger:
+    """Devuelve el logger del proceso; se vacía automáticamente al salir."""
+    global _conversation_logger
+    if _conversation_logger is None:
+        with _logger_lock:
+            if _conversation_logger is None:
+                configs = Config()
+                conversation_logger = ConversationLogger(
+                    batch_size=configs.CONVERSATION_LOG_BATCH_SIZE,
+                    flush_interval_secs=configs.CONVERSATION_LOG_FLUSH_INTERVAL_SECS,
+                    max_pending=configs.CONVERSATION_LOG_MAX_PENDING,
+                )
+                atexit.register(conversation_logger.close)
+                _conversation_logger = conversation_logger
+    return _conversation_logger
+
+
+def get_conversation_log_stats() -> Dict[str, Any]:
+    """Métricas del registro de conversaciones (vacías si todavía no se usó)."""
+    return _conversation_logger.stats() if _conversation_logger is not None else {}
@@ -1,34 +1,24 @@
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
 import os
-import psycopg2
 from psycopg2.extras import DictCursor
 from .config import Config # Importa la clase Config desde el módulo de configuración local.
+from .db_migrations import PRODUCT_COLUMNS, SEARCH_VIEW, STOCK_UNIDADES
+from .db_pool import get_pool, get_pool_metrics
+from .normalization import SERIES_ALIASES, expand_manufacturer, extract_socket, normalize_socket
+from .product_cache import get_product_cache
+from .tracing import annotate, span
 from decimal import Decimal
-import re
+
+logger = logging.getLogger(__name__)
 
 configs = Config() # Instancia la clase Config para cargar la configuración del agente.
 
 # --- Database Connection ---
 
-def get_db_connection():
-    """Establece y devuelve una conexión a la base de datos PostgreSQL."""
-    try:
-        conn = psycopg2.connect(
-            dbname=configs.DB_NAME,
-            user=configs.DB_USER,
-            password=configs.DB_PASSWORD,
-            host=configs.DB_HOST,
-            port=configs.DB_PORT
-        )
-        # Asegurarse de que la extensión pg_trgm esté habilitada
-        with conn.cursor() as cur:
-            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
-        conn.commit()
-        return conn
-    except psycopg2.OperationalError as e:
-        print(f"Error al conectar con la base de datos: {e}")
-        return None
+def get_db_pool_metrics() -> Dict[str, Any]:
+    """Devuelve las métricas del pool de conexiones (esperas, checkouts, fallos)."""
+    return get_pool_metrics()
 
 def _convert_decimals_to_floats(data: Dict[str, Any]) -> Dict[str, Any]:
     """Convierte todos los objetos Decimal en un diccionario a float."""
@@ -37,45 +27,293 @@ def _convert_decimals_to_floats(data: Dict[str, Any]) -> Dict[str, Any]:
             data[key] = float(value)
     return data
 
+def _select_list(stock: str) -> str:
+    """Columnas de un producto para un SELECT con parámetros (el "%" de "%IVA" va escapado)."""
+    columns = ['p."' + column + '"' for column in PRODUCT_COLUMNS if column != "Stock"]
+    columns.append(f'{stock} AS "Stock"')
+    return ", ".join(columns).replace("%", "%%")
+
+# En `productos` el stock es texto; en la vista de búsqueda ya es entero.
+PRODUCT_SELECT = _select_list(STOCK_UNIDADES)
+_SEARCH_SELECT = _select_list('p."Stock"')
+
 def _extract_socket_from_product_name(product_name: str) -> Optional[str]:
-    """
-    Extrae el tipo de socket de una cadena de nombre de producto.
-    Ejemplos: "S1200", "AM4", "AM5", "LGA1700", "1700", "1200", "1151", "1150", "2066", "TR4", "sTRX4"
-    """
-    # Patrones de sockets comunes
-    patterns = [
-        r'S(\d{3,4})',  # S1200, S1700
-        r'AM(\d)',     # AM4, AM5
-        r'LGA(\d{3,4})', # LGA1700, LGA1200
-        r'(\d{3,4})',   # 1700, 1200 (números de 3 o 4 dígitos)
-        r'TR(\d)',     # TR4
-        r'sTRX(\d)'    # sTRX4
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, product_name, re.IGNORECASE)
-        if match:
-            return match.group(0).upper() # Devuelve la coincidencia completa en mayúsculas
-    return None
+    """Extrae el tipo de socket de un nombre de producto (ver `normalization.extract_socket`)."""
+    return extract_socket(product_name)
 
 def get_product_by_code_from_db(code: str) -> Optional[Dict[str, Any]]:
-    """Busca un producto por su código en la base de datos."""
-    conn = get_db_connection()
-    if conn is None:
-        return None
-    
+    """Busca un producto por su código, primero en el cache y luego en la base de datos."""
+    cache = get_product_cache()
+    cached = cache.get(code)
+    annotate(cache_hit=cached is not None)
+    if cached is not None:
+        return cached
+
+    generation = cache.generation()
     product = None
     try:
-        with conn.cursor(cursor_factory=DictCursor) as cur:
-            cur.execute('SELECT * FROM productos WHERE "Codigo" = %s;', (code,))
-            product = cur.fetchone()
+        with span("sql.product_by_code") as current, get_pool().connection() as conn:
+            with conn.cursor(cursor_factory=DictCursor) as cur:
+                cur.execute(f'SELECT {PRODUCT_SELECT} FROM productos p WHERE "Codigo" = %s;', (code,))
+                product = cur.fetchone()
+            current.set(rows=int(product is not None))
     except Exception as e:
-        print(f"Error al buscar el producto: {e}")
-    finally:
-        conn.close()
-    
-    return _convert_decimals_to_floats(dict(product)) if product else None
+        logger.error("Error al buscar el producto: %s", e)
+
+    if not product:
+        return None
+    product = _convert_decimals_to_floats(dict(product))
+    cache.put(product, generation)
+    return product
+
+def get_products_by_codes_from_db(codes: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Busca varios productos por código: primero en el cache y los que falten en
+    una sola consulta (`"Codigo" = ANY(...)`).
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Productos encontrados, indexados por código.
+    """
+    cache = get_product_cache()
+    found: Dict[str, Dict[str, Any]] = {}
+    missing = []
+    for code in dict.fromkeys(codes):
+        cached = cache.get(code)
+        if cached is not None:
+            found[code] = cached
+        else:
+            missing.append(code)
+    annotate(cache_hits=len(found), cache_misses=len(missing))
+    if not missing:
+        return found
+
+    generation = cache.generation()
+    try:
+        with span("sql.products_by_codes", codes=len(missing)) as current, get_pool().connection() as conn:
+            with conn.cursor(cursor_factory=DictCursor) as cur:
+                cur.execute(
+                    f'SELECT {PRODUCT_SELECT} FROM productos p WHERE "Codigo" = ANY(%s);',
+                    (missing,),
+                )
+                rows = cur.fetchall()
+            current.set(rows=len(rows))
+    except Exception as e:
+        logger.error("Error al buscar los productos: %s", e)
+        return found
+
+    products = [_convert_decimals_to_floats(dict(row)) for row in rows]
+    cache.put_many(products, generation)
+    found.update((product["Codigo"], product) for product in products)
+    return found
+
+
+class _SearchTier(NamedTuple):
+    """Un nivel de la búsqueda: nombre (para las trazas), condiciones, orden y límite con sus parámetros."""
+    name: str
+    where: List[str]
+    where_params: List[Any]
+    order_by: List[str]
+    order_params: List[Any]
+    limit: Optional[int]
+
+
+def _build_search_tiers(
+    categoria: Optional[str] = None,
+    fabricante: Optional[str] = None,
+    producto: Optional[str] = None,
+    precio_max_usd: Optional[float] = None,
+    precio_min_usd: Optional[float] = None,
+    codigo: Optional[str] = None,
+    nro_de_parte: Optional[str] = None,
+    socket_type: Optional[str] = None,
+) -> List[_SearchTier]:
+    """Arma los niveles de búsqueda en orden de prioridad para los criterios dados."""
+    # Todos los niveles consultan la vista `productos_busqueda` (ver db_migrations),
+    # que ya trae el número de parte sin espacios, el nombre en minúsculas, los
+    # sockets, la serie y el stock como entero.
+    # Los filtros de similitud combinan el operador `%` (que puede usar los índices
+    # GIN trigram; umbral fijado con set_limit en db_migrations) con la verificación
+    # exacta del umbral de cada nivel, y el orden usa la distancia `<->`.
+    tiers = []
+
+    # Nivel 1: Búsqueda por Código o Número de Parte (Exacta)
+    if codigo or nro_de_parte:
+        where, params = [], []
+        if codigo:
+            where.append("\"Codigo\" = %s")
+            params.append(codigo)
+        if nro_de_parte:
+            normalized_nro_de_parte = nro_de_parte.replace(" ", "")
+            where.append("nro_de_parte_norm ILIKE %s")
+            params.append(f"%{normalized_nro_de_parte}%")
+        tiers.append(_SearchTier("codigo", where, params, ["id ASC"], [], None))
+
+    # Nivel 2: Búsqueda por Categoría y Producto/Fabricante (Similitud y ILIKE para series)
+    if categoria or producto or fabricante or socket_type:
+        where, params = [], []
+        order_clauses, order_params = [], []
+
+        if categoria:
+            where.append("\"Categoria\" %% %s AND similarity(\"Categoria\", %s) > 0.2")
+            params.extend([categoria, categoria])
+            order_clauses.append("\"Categoria\" <-> %s")
+            order_params.append(categoria)
+
+        if producto:
+            # Abreviaturas de series de procesadores (r5 -> ryzen 5, i7 -> core i7):
+            # la vista ya tiene la serie de cada producto.
+            serie = producto.strip().lower()
+            if serie in SERIES_ALIASES:
+                where.append("(serie = %s OR (producto_lower %% %s AND similarity(producto_lower, %s) > 0.1))")
+                params.append(serie)
+            else:
+                where.append("(producto_lower LIKE %s OR (producto_lower %% %s AND similarity(producto_lower, %s) > 0.1))")
+                params.append(f"%{producto.lower()}%")
+            params.extend([producto, producto]) # For similarity
+
+            order_clauses.append("producto_lower <-> %s")
+            order_params.append(producto) # Still order by original product term similarity
+
+        if fabricante:
+            fabricante_terms = expand_manufacturer(fabricante)
+            where.append(
+                "(" + " OR ".join(["\"Fabricante\" ILIKE %s"] * len(fabricante_terms)) + ")"
+            )
+            params.extend(f"%{term}%" for term in fabricante_terms)
+
+        if socket_type: # Nuevo filtro por socket
+            # Los sockets de la vista están normalizados: "S1700" y "LGA1700" son "1700".
+            where.append("sockets @> ARRAY[%s]")
+            params.append(normalize_socket(socket_type).upper())
+
+        if precio_max_usd is not None:
+            where.append("\"Precio Final U$D\" <= %s")
+            params.append(precio_max_usd)
+        if precio_min_usd is not None:
+            where.append("\"Precio Final U$D\" >= %s")
+            params.append(precio_min_usd)
+
+        order_clauses.append("\"Stock\" DESC")
+        order_clauses.append("id ASC")
+        tiers.append(_SearchTier("categoria", where, params, order_clauses, order_params, 10))
 
+    # Nivel 3: Búsqueda Amplia por Producto (Similitud, si solo se dio producto)
+    if producto:
+        tiers.append(_SearchTier(
+            "amplia",
+            ["producto_lower %% %s AND similarity(producto_lower, %s) > 0.05"], [producto, producto],
+            ["producto_lower <-> %s", "\"Stock\" DESC", "id ASC"], [producto],
+            10,
+        ))
+
+    return tiers
+
+
+def _build_tiers_with_fallback(**criteria) -> Tuple[List[_SearchTier], int]:
+    """
+    Niveles de la búsqueda seguidos de los de la búsqueda flexible dentro de la
+    categoría (el término de producto se busca como número de parte y viceversa).
+
+    Returns:
+        Tuple[List[_SearchTier], int]: Todos los niveles y cuántos son de la búsqueda principal.
+    """
+    tiers = _build_search_tiers(**criteria)
+    primary_tiers = len(tiers)
+    categoria = criteria.get("categoria")
+    if criteria.get("producto"):
+        tiers += _build_search_tiers(categoria=categoria, nro_de_parte=criteria["producto"])
+    elif criteria.get("nro_de_parte"):
+        tiers += _build_search_tiers(categoria=categoria, producto=criteria["nro_de_parte"])
+    return tiers, primary_tiers
+
+
+def _tier_query(tier: _SearchTier) -> Tuple[str, List[Any]]:
+    """SQL de un nivel ejecutado por separado (modo secuencial)."""
+    query = f"SELECT {_SEARCH_SELECT} FROM {SEARCH_VIEW} p WHERE " + " AND ".join(tier.where)
+    query += " ORDER BY " + ", ".join(tier.order_by)
+    if tier.limit is not None:
+        query += f" LIMIT {tier.limit}"
+    return query, tier.where_params + tier.order_params
+
+
+def _combined_tiers_query(tiers: List[_SearchTier]) -> Tuple[str, List[Any]]:
+    """
+    SQL que evalúa todos los niveles en una sola sentencia.
+
+    Cada nivel es un CTE que sólo se ejecuta si los anteriores no devolvieron
+    filas (`NOT EXISTS` se evalúa como filtro de una sola vez), así que el
+    resultado es el mismo que correr los niveles en secuencia pero con un único
+    viaje a la base. Las filas se ordenan por nivel y luego por su posición
+    dentro del nivel.
+    """
+    ctes, params = [], []
+    for index, tier in enumerate(tiers):
+        where = list(tier.where)
+        where.extend(f"NOT EXISTS (SELECT 1 FROM nivel_{prev})" for prev in range(index))
+        cte = (
+            f"nivel_{index} AS ("
+            f"SELECT {_SEARCH_SELECT}, {index} AS search_tier, "
+            f"row_number() OVER (ORDER BY {', '.join(tier.order_by)}) AS search_rank "
+            f"FROM {SEARCH_VIEW} p WHERE {' AND '.join(where)} "
+            f"ORDER BY search_rank"
+        )
+        if tier.limit is not None:
+            cte += f" LIMIT {tier.limit}"
+        ctes.append(cte + ")")
+        params.extend(tier.order_params)
+        params.extend(tier.where_params)
+    union = " UNION ALL ".join(f"SELECT * FROM nivel_{index}" for index in range(len(tiers)))
+    query = "WITH " + ", ".join(ctes) + f" {union} ORDER BY search_tier, search_rank"
+    return query, params
+
+
+def _run_search_tiers(tiers: List[_SearchTier]) -> Tuple[Optional[int], List[Dict[str, Any]]]:
+    """
+    Ejecuta los niveles y devuelve (índice del nivel que encontró resultados, productos).
+
+    En modo "combined" (por defecto) todos los niveles viajan en una sola
+    sentencia; en modo "sequential" se ejecutan uno por uno como antes.
+    """
+    if not tiers:
+        return None, []
+
+    cache = get_product_cache()
+    generation = cache.generation()
+    try:
+        with span("sql.search", mode=configs.DB_SEARCH_MODE) as current, \
+                get_pool().connection() as conn, conn.cursor(cursor_factory=DictCursor) as cur:
+            if configs.DB_SEARCH_MODE == "sequential":
+                for index, tier in enumerate(tiers):
+                    with span("sql.tier", tier=tier.name) as tier_span:
+                        cur.execute(*_tier_query(tier))
+                        products = [_convert_decimals_to_floats(dict(row)) for row in cur.fetchall()]
+                        tier_span.set(rows=len(products))
+                    if products:
+                        current.set(tier=tier.name, rows=len(products))
+                        cache.put_many(products, generation)
+                        return index, products
+                current.set(tier=None, rows=0)
+                return None, []
+
+            cur.execute(*_combined_tiers_query(tiers))
+            rows = cur.fetchall()
+            current.set(tier=tiers[rows[0]["search_tier"]].name if rows else None, rows=len(rows))
+    except Exception as e:
+        logger.error("Error al buscar productos en la base de datos: %s", e)
+        return None, []
+
+    if not rows:
+        return None, []
+    products = []
+    for row in rows:
+        product = dict(row)
+        tier_index = product.pop("search_tier")
+        product.pop("search_rank")
+        products.append(_convert_decimals_to_floats(product))
+    # Los resultados alimentan el cache: el producto elegido suele agregarse
+    # enseguida al presupuesto con get_product_by_code_from_db.
+    cache.put_many(products, generation)
+    return tier_index, products
 
 
 def search_products_from_db(
@@ -92,125 +330,49 @@ def search_products_from_db(
     Busca productos en la base de datos basándose en los criterios proporcionados.
     Implementa una estrategia de búsqueda por niveles para mayor robustez.
     """
-    conn = get_db_connection()
-    if conn is None:
-        return []
+    _, products = _run_search_tiers(_build_search_tiers(
+        categoria=categoria,
+        fabricante=fabricante,
+        producto=producto,
+        precio_max_usd=precio_max_usd,
+        precio_min_usd=precio_min_usd,
+        codigo=codigo,
+        nro_de_parte=nro_de_parte,
+        socket_type=socket_type,
+    ))
+    return products
 
-    products = []
-    try:
-        with conn.cursor(cursor_factory=DictCursor) as cur:
-            # Nivel 1: Búsqueda por Código o Número de Parte (Exacta)
-            if codigo or nro_de_parte:
-                query = "SELECT * FROM productos WHERE 1=1"
-                params = []
-                if codigo:
-                    query += " AND \"Codigo\" = %s"
-                    params.append(codigo)
-                if nro_de_parte:
-                    normalized_nro_de_parte = nro_de_parte.replace(" ", "")
-                    query += " AND REPLACE(\"Nro. de Parte\", ' ', '') ILIKE %s"
-                    params.append(f"%{normalized_nro_de_parte}%")
-                cur.execute(query, params)
-                products = [_convert_decimals_to_floats(dict(row)) for row in cur.fetchall()]
-                if products: return products
-
-            # Nivel 2: Búsqueda por Categoría y Producto/Fabricante (Similitud y ILIKE para series)
-            if categoria or producto or fabricante or socket_type:
-                query = "SELECT * FROM productos WHERE 1=1"
-                params = []
-                order_clauses = []
-
-                if categoria:
-                    query += " AND similarity(\"Categoria\", %s) > 0.2"
-                    params.append(categoria)
-                    order_clauses.append("similarity(\"Categoria\", %s) DESC")
-                    params.append(categoria)
-                
-                if producto:
-                    # Check for common processor series abbreviations
-                    processed_producto = producto.lower()
-                    search_terms = []
-
-                    if processed_producto == 'r3':
-                        search_terms = ['ryzen 3', 'r3']
-                    elif processed_producto == 'r5':
-                        search_terms = ['ryzen 5', 'r5']
-                    elif processed_producto == 'r7':
-                        search_terms = ['ryzen 7', 'r7']
-                    elif processed_producto == 'r9':
-                        search_terms = ['ryzen 9', 'r9']
-                    elif processed_producto == 'i3':
-                        search_terms = ['core i3', 'i3']
-                    elif processed_producto == 'i5':
-                        search_terms = ['core i5', 'i5']
-                    elif processed_producto == 'i7':
-                        search_terms = ['core i7', 'i7']
-                    elif processed_producto == 'i9':
-                        search_terms = ['core i9', 'i9']
-                    else:
-                        search_terms = [producto] # Default to original product term
-
-                    # Build the product search condition
-                    product_conditions = []
-                    product_params = []
-                    for term in search_terms:
-                        product_conditions.append("(\"Producto\" ILIKE %s OR similarity(\"Producto\", %s) > 0.1)")
-                        product_params.append(f"%{term}%")
-                        product_params.append(term) # For similarity
-
-                    query += " AND (" + " OR ".join(product_conditions) + ")"
-                    params.extend(product_params)
-
-                    order_clauses.append("similarity(\"Producto\", %s) DESC")
-                    params.append(producto) # Still order by original product term similarity
-                
-                if fabricante:
-                    query += " AND \"Fabricante\" ILIKE %s"
-                    params.append(f"%{fabricante}%")
-                
-                if socket_type: # Nuevo filtro por socket
-                    socket_patterns = [
-                        f"%{socket_type}%",
-                        f"%S{socket_type}%",
-                        f"%LGA{socket_type}%"
-                    ]
-                    socket_conditions = []
-                    for pattern in socket_patterns:
-                        socket_conditions.append("\"Producto\" ILIKE %s")
-                        params.append(pattern)
-                    query += " AND (" + " OR ".join(socket_conditions) + ")"
-                
-                if precio_max_usd is not None:
-                    query += " AND \"Precio Final U$D\" <= %s"
-                    params.append(precio_max_usd)
-                if precio_min_usd is not None:
-                    query += " AND \"Precio Final U$D\" >= %s"
-                    params.append(precio_min_usd)
-
-                order_clauses.append("\"Stock\" DESC")
-                order_clauses.append("id ASC")
-                query += " ORDER BY " + ", ".join(order_clauses)
-                query += " LIMIT 10"
-
-                cur.execute(query, params)
-                products = [_convert_decimals_to_floats(dict(row)) for row in cur.fetchall()]
-                if products: return products
-
-            # Nivel 3: Búsqueda Amplia por Producto (Similitud, si solo se dio producto)
-            if producto:
-                query = "SELECT * FROM productos WHERE similarity(\"Producto\", %s) > 0.05"
-                params = [producto]
-                order_clauses = ["similarity(\"Producto\", %s) DESC", "\"Stock\" DESC", "id ASC"]
-                params.append(producto)
-                query += " ORDER BY " + ", ".join(order_clauses)
-                query += " LIMIT 10"
-                cur.execute(query, params)
-                products = [_convert_decimals_to_floats(dict(row)) for row in cur.fetchall()]
-                if products: return products
 
-    except Exception as e:
-        print(f"Error al buscar productos en la base de datos: {e}")
-    finally:
-        conn.close()
+def search_products_with_fallback_from_db(
+    categoria: Optional[str] = None,
+    fabricante: Optional[str] = None,
+    producto: Optional[str] = None,
+    precio_max_usd: Optional[float] = None,
+    precio_min_usd: Optional[float] = None,
+    codigo: Optional[str] = None,
+    nro_de_parte: Optional[str] = None,
+    socket_type: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Igual que `search_products_from_db`, pero si no hay resultados intenta la
+    búsqueda flexible dentro de la categoría (el término de producto se busca
+    como número de parte y viceversa), todo en la misma consulta.
 
-    return products
+    Returns:
+        Tuple[List[Dict[str, Any]], bool]: Los productos encontrados y si
+        provienen de la búsqueda flexible.
+    """
+    tiers, primary_tiers = _build_tiers_with_fallback(
+        categoria=categoria,
+        fabricante=fabricante,
+        producto=producto,
+        precio_max_usd=precio_max_usd,
+        precio_min_usd=precio_min_usd,
+        codigo=codigo,
+        nro_de_parte=nro_de_parte,
+        socket_type=socket_type,
+    )
+    tier_index, products = _run_search_tiers(tiers)
+    is_fallback = tier_index is not None and tier_index >= primary_tiers
+    annotate(fallback=is_fallback)
+    return products, is_fallback
@@ -0,0 +1,309 @@
+"""Concurrent, resumable datasheet downloader.
+
+For every part number the engine searches for a PDF datasheet (SerpApi by
+default) and streams it to disk. Compared to the old sequential loop:
+
+* searches and PDF downloads run concurrently, with separate limits: a
+  semaphore plus a token bucket for the search API quota, and a global and a
+  per-host semaphore for the PDF hosts;
+* every outcome is appended to a JSONL journal, so an interrupted run resumes
+  where it stopped instead of starting over;
+* PDFs are written to a temporary file while their SHA-256 is computed; a file
+  identical to one already downloaded is hard-linked instead of stored twice.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .shared_libraries.rate_limiter import AsyncTokenBucket
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+)
+
+# Journal statuses. "failed" entries are retried on the next run.
+DOWNLOADED = "downloaded"
+DUPLICATE = "duplicate"
+NOT_FOUND = "not_found"
+FAILED = "failed"
+
+SearchFn = Callable[[str], Awaitable[Optional[str]]]
+
+
+def sanitize_filename(part_number: str) -> str:
+    """File name (without extension) used for a part number's datasheet."""
+    return "".join(c for c in part_number if c.isalnum() or c in ("-", "_")).rstrip()
+
+
+def datasheet_filename(part_number: str) -> str:
+    """PDF file name of a part number's datasheet, in the folder and the bucket."""
+    return f"{sanitize_filename(part_number)}.pdf"
+
+
+def serpapi_search(api_key: str) -> SearchFn:
+    """Returns a search function that asks SerpApi for a direct PDF link."""
+    from serpapi import GoogleSearch
+
+    def search(part_number: str) -> Optional[str]:
+        params = {
+            "api_key": api_key,
+            "engine": "google",
+            "q": f"{part_number} datasheet filetype:pdf",
+            "hl": "en",
+        }
+        results = GoogleSearch(params).get_dict()
+        for result in results.get("organic_results", []):
+            link = result.get("link", "")
+            if link.lower().endswith(".pdf"):
+                return link
+        return None
+
+    async def search_async(part_number: str) -> Optional[str]:
+        # The SerpApi client is blocking; keep it off the event loop.
+        return await asyncio.to_thread(search, part_number)
+
+    return search_async
+
+
+class ProgressJournal:
+    """Append-only JSONL log of per-part outcomes.
+
+    The last entry for a part number wins. Entries are flushed as they are
+    written, so a crash loses at most the downloads that were in flight.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, dict] = {}
+        self.by_checksum: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        self._index(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A line cut short by a crash; the part is retried.
+                        continue
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _index(self, entry: dict):
+        self.entries[entry["part_number"]] = entry
+        if entry.get("sha256") and entry["status"] == DOWNLOADED:
+            self.by_checksum.setdefault(entry["sha256"], entry["file"])
+
+    def is_done(self, part_number: str, retry_not_found: bool = False) -> bool:
+        entry = self.entries.get(part_number)
+        if entry is None or entry["status"] == FAILED:
+            return False
+        if entry["status"] == NOT_FOUND:
+            return not retry_not_found
+        return os.path.exists(entry["file"])
+
+    def record(self, part_number: str, status: str, **details):
+        entry = {"part_number": part_number, "status": status, "ts": time.time(), **details}
+        self._index(entry)
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+@dataclass
+class DownloadSummary:
+    counts: Counter = field(default_factory=Counter)
+    skipped: int = 0
+    elapsed_secs: float = 0.0
+
+    def __str__(self) -> str:
+        parts = ", ".join(f"{status}={count}" for status, count in sorted(self.counts.items()))
+        return f"{parts or 'nothing to do'}, skipped={self.skipped} in {self.elapsed_secs:.1f}s"
+
+
+class DatasheetDownloader:
+    """Downloads datasheets for many part numbers concurrently.
+
+    Args:
+      search: Coroutine function returning the PDF URL for a part, or None.
+      download_folder: Where the PDFs are stored.
+      journal: Progress journal (defaults to `<download_folder>/.journal.jsonl`).
+      search_concurrency: Searches in flight at once.
+      search_bucket: Token bucket for the search API quota.
+      download_concurrency: PDF downloads in flight at once, across all hosts.
+      per_host_concurrency: PDF downloads in flight against a single host.
+      client: httpx.AsyncClient to use (one is created if omitted).
+      max_attempts: Attempts per PDF download on transient errors.
+      retry_not_found: Also search again parts previously not found.
+    """
+
+    def __init__(
+        self,
+        search: SearchFn,
+        download_folder: str,
+        journal: Optional[ProgressJournal] = None,
+        search_concurrency: int = 2,
+        search_bucket: Optional[AsyncTokenBucket] = None,
+        download_concurrency: int = 8,
+        per_host_concurrency: int = 2,
+        client: Optional[httpx.AsyncClient] = None,
+        max_attempts: int = 3,
+        retry_not_found: bool = False,
+    ):
+        os.makedirs(download_folder, exist_ok=True)
+        self._search = search
+        self.download_folder = download_folder
+        self.journal = journal or ProgressJournal(os.path.join(download_folder, ".journal.jsonl"))
+        self.search_concurrency = search_concurrency
+        self.search_bucket = search_bucket
+        self.download_concurrency = download_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self._client = client
+        self.max_attempts = max_attempts
+        self.retry_not_found = retry_not_found
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._checksum_lock = asyncio.Lock()
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._host_limits[host]
+
+    def _pending(self, part_numbers: Iterable[str]) -> List[str]:
+        pending, seen = [], set()
+        for part_number in part_numbers:
+            if part_number in seen:
+                continue
+            seen.add(part_number)
+            existing = os.path.join(self.download_folder, datasheet_filename(part_number))
+            if self.journal.is_done(part_number, self.retry_not_found):
+                continue
+            if part_number not in self.journal.entries and os.path.exists(existing):
+                # Downloaded before the journal existed.
+                continue
+            pending.append(part_number)
+        return pending
+
+    async def run(self, part_numbers: Iterable[str]) -> DownloadSummary:
+        """Processes every part number that is not already done."""
+        start = time.monotonic()
+        part_numbers = list(part_numbers)
+        pending = self._pending(part_numbers)
+        summary = DownloadSummary(skipped=len(set(part_numbers)) - len(pending))
+        logger.info("%d part numbers to process (%d skipped).", len(pending), summary.skipped)
+
+        self._search_limit = asyncio.Semaphore(self.search_concurrency)
+        self._download_limit = asyncio.Semaphore(self.download_concurrency)
+        own_client = self._client is None
+        client = self._client or httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            timeout=60,
+            follow_redirects=True,
+        )
+        queue: asyncio.Queue = asyncio.Queue()
+        for part_number in pending:
+            queue.put_nowait(part_number)
+
+        async def worker():
+            while True:
+                try:
+                    part_number = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                summary.counts[await self.process(client, part_number)] += 1
+
+        # Enough workers to keep both the search and the download limits busy.
+        workers = self.search_concurrency + self.download_concurrency
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(workers, len(pending)))))
+        finally:
+            if own_client:
+                await client.aclose()
+        summary.elapsed_secs = time.monotonic() - start
+        return summary
+
+    async def process(self, client: httpx.AsyncClient, part_number: str) -> str:
+        """Searches and downloads one datasheet; records and returns the outcome."""
+        try:
+            async with self._search_limit:
+                if self.search_bucket is not None:
+                    await self.search_bucket.acquire()
+                logger.info("Searching for: %s datasheet", part_number)
+                url = await self._search(part_number)
+        except Exception as e:
+            logger.error("Search failed for %s: %s", part_number, e)
+            self.journal.record(part_number, FAILED, error=f"search: {e}")
+            return FAILED
+
+        if not url:
+            logger.warning("No direct PDF link found for %s.", part_number)
+            self.journal.record(part_number, NOT_FOUND)
+            return NOT_FOUND
+
+        target = os.path.join(self.download_folder, datasheet_filename(part_number))
+        try:
+            # Host slot first: downloads queued behind a busy host must not hold
+            # global slots that other hosts could use.
+            async with self._host_limit(url):
+                async with self._download_limit:
+                    status, checksum, stored_as = await self._download(client, url, target)
+        except Exception as e:
+            logger.error("Download failed for %s (%s): %s", part_number, url, e)
+            self.journal.record(part_number, FAILED, url=url, error=str(e))
+            return FAILED
+
+        logger.info("Saved datasheet for %s to %s (%s)", part_number, target, status)
+        self.journal.record(part_number, status, url=url, file=target, sha256=checksum, same_as=stored_as)
+        return status
+
+    async def _download(self, client: httpx.AsyncClient, url: str, target: str):
+        """Streams `url` into `target`; returns (status, sha256, original file)."""
+        temp_path = f"{target}.part"
+        for attempt in range(1, self.max_attempts + 1):
+            digest = hashlib.sha256()
+            try:
+                async with client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    with open(temp_path, "wb") as output:
+                        async for chunk in response.aiter_bytes(64 * 1024):
+                            digest.update(chunk)
+                            output.write(chunk)
+                break
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                retryable = not isinstance(e, httpx.HTTPStatusError) or (
+                    e.response.status_code == 429 or e.response.status_code >= 500
+                )
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                if not retryable or attempt == self.max_attempts:
+                    raise
+                await asyncio.sleep(2 ** (attempt - 1))
+
+        checksum = digest.hexdigest()
+        async with self._checksum_lock:
+            original = self.journal.by_checksum.get(checksum)
+            if original and original != target and os.path.exists(original):
+                os.remove(temp_path)
+                if os.path.exists(target):
+                    os.remove(target)
+                try:
+                    os.link(original, target)
+                except OSError:
+                    os.symlink(os.path.abspath(original), target)
+                return DUPLICATE, checksum, original
+            os.replace(temp_path, target)
+            self.journal.by_checksum.setdefault(checksum, target)
+        return DOWNLOADED, checksum, None
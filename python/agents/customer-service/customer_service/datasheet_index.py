@@ -0,0 +1,469 @@
+"""Local datasheet index: an offline alternative to the Vertex AI Search store.
+
+`build_index_from_folder` extracts the text of every PDF in the datasheet
+folder (in parallel worker processes), splits it into overlapping chunks and
+writes, under the index directory:
+
+* `index.json`: parameters and sizes;
+* `parts.json`: part number -> [first chunk, last chunk + 1); the chunks of a
+  datasheet are contiguous, so a part-number filter is a slice;
+* `chunks.jsonl`: the chunk texts;
+* `vocab.json` and `postings_*.npy`: a BM25 inverted index in CSR layout
+  (term -> sorted chunk ids and term frequencies);
+* `embeddings.f32` (optional): an L2-normalized float32 matrix with one row
+  per chunk, memory-mapped at query time.
+
+`DatasheetIndex.search` scores with BM25 and, when the index has embeddings
+and a query embedding is given, fuses BM25 and cosine rankings (reciprocal
+rank fusion). Part numbers mentioned in the query restrict the search to
+their datasheets. `LocalSearchBackend` plugs the index into
+`datasheet_rag.DatasheetRetriever`.
+
+    python -m customer_service.datasheet_index build [--embed]
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .datasheet_rag import normalize_query
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 50
+# Candidates taken from each ranking before reciprocal rank fusion.
+FUSION_DEPTH = 50
+RRF_K = 60
+
+Embedder = Callable[[List[str]], Sequence[Sequence[float]]]
+
+
+class SearchHit(NamedTuple):
+    part_number: str
+    text: str
+    score: float
+
+
+@dataclass
+class IndexStats:
+    documents: int = 0
+    chunks: int = 0
+    terms: int = 0
+    failed: int = 0
+    embedding_dim: int = 0
+
+
+def tokenize(text: str) -> List[str]:
+    return normalize_query(text).split()
+
+
+def part_number_key(part_number: str) -> str:
+    """Matching key for part numbers: "A520M-K", "a520m k" and "A520MK" agree."""
+    return "".join(c for c in part_number.casefold() if c.isalnum())
+
+
+def extract_pdf_text(path: str) -> str:
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(path)
+    return "\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def chunk_text(text: str, words: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Splits `text` into windows of `words` words overlapping by `overlap`."""
+    tokens = text.split()
+    if not tokens:
+        return []
+    step = max(1, words - overlap)
+    return [
+        " ".join(tokens[start:start + words])
+        for start in range(0, max(1, len(tokens) - overlap), step)
+    ]
+
+
+def _extract(path: str) -> Tuple[str, Optional[str], Optional[str]]:
+    try:
+        return path, extract_pdf_text(path), None
+    except Exception as e:  # A broken PDF must not stop the build.
+        return path, None, str(e)
+
+
+def _replace_dir(tmp_dir: str, out_dir: str):
+    old_dir = f"{out_dir.rstrip(os.sep)}.old"
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    if os.path.exists(old_dir):
+        shutil.rmtree(old_dir)
+
+
+def build_index(
+    documents: Iterable[Tuple[str, str]],
+    out_dir: str,
+    embedder: Optional[Embedder] = None,
+    chunk_words: int = CHUNK_WORDS,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    k1: float = 1.2,
+    b: float = 0.75,
+    embed_batch_size: int = 64,
+) -> IndexStats:
+    """Builds the index from (part number, text) pairs into `out_dir`.
+
+    The index is written to a sibling directory and swapped in at the end, so
+    a running process never sees a half-written index.
+    """
+    tmp_dir = f"{out_dir.rstrip(os.sep)}.tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(tmp_dir)
+
+    stats = IndexStats()
+    parts: Dict[str, List[int]] = {}
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    doc_lengths: List[int] = []
+    texts: List[str] = []
+    with open(os.path.join(tmp_dir, "chunks.jsonl"), "w", encoding="utf-8") as chunks_file:
+        for part_number, text in documents:
+            if part_number in parts:
+                logger.warning("Duplicate datasheet for %s ignored.", part_number)
+                continue
+            chunks = chunk_text(text, chunk_words, chunk_overlap)
+            if not chunks:
+                continue
+            stats.documents += 1
+            parts[part_number] = [len(doc_lengths), len(doc_lengths) + len(chunks)]
+            for chunk in chunks:
+                chunk_id = len(doc_lengths)
+                # The part number is indexed with every chunk of its datasheet.
+                counts = Counter(tokenize(chunk))
+                counts.update(tokenize(part_number))
+                for term, tf in counts.items():
+                    postings.setdefault(term, []).append((chunk_id, tf))
+                doc_lengths.append(sum(counts.values()))
+                chunks_file.write(json.dumps({"text": chunk}, ensure_ascii=False) + "\n")
+                if embedder is not None:
+                    texts.append(f"{part_number}: {chunk}")
+
+    stats.chunks = len(doc_lengths)
+    stats.terms = len(postings)
+    vocab = {term: term_id for term_id, term in enumerate(sorted(postings))}
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    for term, term_id in vocab.items():
+        offsets[term_id + 1] = len(postings[term])
+    np.cumsum(offsets, out=offsets)
+    docs = np.empty(offsets[-1], dtype=np.int32)
+    tfs = np.empty(offsets[-1], dtype=np.float32)
+    for term, term_id in vocab.items():
+        entries = np.asarray(postings[term], dtype=np.int64).reshape(-1, 2)
+        docs[offsets[term_id]:offsets[term_id + 1]] = entries[:, 0]
+        tfs[offsets[term_id]:offsets[term_id + 1]] = entries[:, 1]
+    np.save(os.path.join(tmp_dir, "postings_offsets.npy"), offsets)
+    np.save(os.path.join(tmp_dir, "postings_docs.npy"), docs)
+    np.save(os.path.join(tmp_dir, "postings_tf.npy"), tfs)
+    np.save(os.path.join(tmp_dir, "doc_lengths.npy"), np.asarray(doc_lengths, dtype=np.float32))
+    with open(os.path.join(tmp_dir, "vocab.json"), "w", encoding="utf-8") as vocab_file:
+        json.dump(vocab, vocab_file, ensure_ascii=False)
+    with open(os.path.join(tmp_dir, "parts.json"), "w", encoding="utf-8") as parts_file:
+        json.dump(parts, parts_file, ensure_ascii=False)
+
+    if embedder is not None and texts:
+        matrix = None
+        for start in range(0, len(texts), embed_batch_size):
+            batch = np.asarray(embedder(texts[start:start + embed_batch_size]), dtype=np.float32)
+            if matrix is None:
+                matrix = np.memmap(
+                    os.path.join(tmp_dir, "embeddings.f32"),
+                    dtype=np.float32,
+                    mode="w+",
+                    shape=(len(texts), batch.shape[1]),
+                )
+            norms = np.linalg.norm(batch, axis=1, keepdims=True)
+            matrix[start:start + len(batch)] = batch / np.maximum(norms, 1e-12)
+        matrix.flush()
+        stats.embedding_dim = matrix.shape[1]
+        del matrix
+
+    meta = {
+        "version": INDEX_VERSION,
+        "chunks": stats.chunks,
+        "avgdl": float(np.mean(doc_lengths)) if doc_lengths else 0.0,
+        "k1": k1,
+        "b": b,
+        "chunk_words": chunk_words,
+        "chunk_overlap": chunk_overlap,
+        "embedding_dim": stats.embedding_dim,
+    }
+    with open(os.path.join(tmp_dir, "index.json"), "w", encoding="utf-8") as meta_file:
+        json.dump(meta, meta_file)
+    _replace_dir(tmp_dir, out_dir)
+    return stats
+
+
+def build_index_from_folder(
+    folder: str,
+    out_dir: str,
+    embedder: Optional[Embedder] = None,
+    workers: Optional[int] = None,
+    **kwargs,
+) -> IndexStats:
+    """Builds the index from the PDFs in `folder` (part number = file name)."""
+    paths = sorted(
+        os.path.join(folder, name)
+        for name in os.listdir(folder)
+        if name.lower().endswith(".pdf")
+    )
+    failed = 0
+
+    def documents():
+        nonlocal failed
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, text, error in pool.map(_extract, paths, chunksize=8):
+                if error is not None:
+                    failed += 1
+                    logger.warning("Could not extract %s: %s", path, error)
+                    continue
+                yield os.path.splitext(os.path.basename(path))[0], text
+
+    stats = build_index(documents(), out_dir, embedder=embedder, **kwargs)
+    stats.failed = failed
+    return stats
+
+
+def genai_embedder(model: str = "text-embedding-005") -> Embedder:
+    """Embeds texts with the Gemini / Vertex AI embedding API."""
+    from google import genai
+
+    client = genai.Client()
+
+    def embed(texts: List[str]) -> List[List[float]]:
+        response = client.models.embed_content(model=model, contents=texts)
+        return [embedding.values for embedding in response.embeddings]
+
+    return embed
+
+
+class DatasheetIndex:
+    """Read-only view of an index written by `build_index`."""
+
+    def __init__(self, index_dir: str, mmap: bool = True):
+        mode = "r" if mmap else None
+        with open(os.path.join(index_dir, "index.json"), encoding="utf-8") as meta_file:
+            self.meta = json.load(meta_file)
+        if self.meta["version"] != INDEX_VERSION:
+            raise ValueError(f"unsupported datasheet index version {self.meta['version']}")
+        with open(os.path.join(index_dir, "vocab.json"), encoding="utf-8") as vocab_file:
+            self.vocab: Dict[str, int] = json.load(vocab_file)
+        with open(os.path.join(index_dir, "parts.json"), encoding="utf-8") as parts_file:
+            self.parts: Dict[str, Tuple[int, int]] = {
+                part_number: tuple(bounds) for part_number, bounds in json.load(parts_file).items()
+            }
+        with open(os.path.join(index_dir, "chunks.jsonl"), encoding="utf-8") as chunks_file:
+            self.texts = [json.loads(line)["text"] for line in chunks_file]
+        self.offsets = np.load(os.path.join(index_dir, "postings_offsets.npy"))
+        self.docs = np.load(os.path.join(index_dir, "postings_docs.npy"), mmap_mode=mode)
+        self.tfs = np.load(os.path.join(index_dir, "postings_tf.npy"), mmap_mode=mode)
+        self.doc_lengths = np.load(os.path.join(index_dir, "doc_lengths.npy"))
+
+        n = self.meta["chunks"]
+        df = np.diff(self.offsets).astype(np.float32)
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5))
+        k1, b, avgdl = self.meta["k1"], self.meta["b"], self.meta["avgdl"] or 1.0
+        # Per-chunk part of the BM25 denominator, computed once.
+        self._norm = k1 * (1 - b + b * self.doc_lengths / avgdl)
+
+        self.chunk_part = np.empty(n, dtype=np.int32)
+        self.part_names = list(self.parts)
+        for part_id, part_number in enumerate(self.part_names):
+            start, end = self.parts[part_number]
+            self.chunk_part[start:end] = part_id
+        self._part_keys = {part_number_key(part_number): part_number for part_number in self.parts}
+
+        self.embeddings = None
+        if self.meta["embedding_dim"]:
+            self.embeddings = np.memmap(
+                os.path.join(index_dir, "embeddings.f32"),
+                dtype=np.float32,
+                mode="r",
+                shape=(n, self.meta["embedding_dim"]),
+            )
+
+    def __len__(self) -> int:
+        return self.meta["chunks"]
+
+    def resolve_part_number(self, part_number: str) -> Optional[str]:
+        """Name under which `part_number` (as written in the catalog) is indexed."""
+        if part_number in self.parts:
+            return part_number
+        return self._part_keys.get(part_number_key(part_number))
+
+    def detect_part_numbers(self, query: str, max_words: int = 3) -> List[str]:
+        """Part numbers of the index mentioned in `query`.
+
+        Runs of up to `max_words` consecutive words are tried, so "A520M K"
+        finds the datasheet stored as "A520MK".
+        """
+        words = [part_number_key(word) for word in query.split()]
+        found = []
+        for start in range(len(words)):
+            key = ""
+            for word in words[start:start + max_words]:
+                key += word
+                part_number = self._part_keys.get(key)
+                if part_number is not None and part_number not in found:
+                    found.append(part_number)
+        return found
+
+    def _candidate_ranges(self, part_numbers: Optional[Iterable[str]]) -> List[Tuple[int, int]]:
+        if part_numbers is None:
+            return [(0, len(self))]
+        return [self.parts[part_number] for part_number in part_numbers if part_number in self.parts]
+
+    def _bm25(self, terms: Iterable[str], lo: int, hi: int) -> np.ndarray:
+        k1 = self.meta["k1"]
+        scores = np.zeros(hi - lo, dtype=np.float32)
+        for term in set(terms):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.docs[start:end]
+            if (lo, hi) != (0, len(self)):
+                first, last = np.searchsorted(docs, (lo, hi))
+                docs, start, end = docs[first:last], start + first, start + last
+            tf = self.tfs[start:end]
+            scores[docs - lo] += self.idf[term_id] * tf * (k1 + 1) / (tf + self._norm[docs])
+        return scores
+
+    def search(
+        self,
+        query: str,
+        k: int = 5,
+        part_numbers: Optional[Iterable[str]] = None,
+        query_embedding: Optional[Sequence[float]] = None,
+        filter_part_numbers: bool = True,
+    ) -> List[SearchHit]:
+        """Top `k` chunks for `query`.
+
+        Args:
+          part_numbers: Restrict the search to these datasheets. If None, the
+            part numbers mentioned in the query are used, if any.
+          query_embedding: Enables the hybrid ranking (needs embeddings).
+          filter_part_numbers: Set to False to search every datasheet even if
+            the query mentions part numbers.
+        """
+        if part_numbers is None and filter_part_numbers:
+            part_numbers = self.detect_part_numbers(query) or None
+        terms = tokenize(query)
+        ids, bm25 = [], []
+        for lo, hi in self._candidate_ranges(part_numbers):
+            ids.append(np.arange(lo, hi))
+            bm25.append(self._bm25(terms, lo, hi))
+        if not ids:
+            return []
+        ids, bm25 = np.concatenate(ids), np.concatenate(bm25)
+
+        if query_embedding is not None and self.embeddings is not None:
+            vector = np.asarray(query_embedding, dtype=np.float32)
+            vector /= max(float(np.linalg.norm(vector)), 1e-12)
+            dense = np.concatenate(
+                [self.embeddings[lo:hi] @ vector for lo, hi in self._candidate_ranges(part_numbers)]
+            )
+            fused = np.zeros(len(ids), dtype=np.float32)
+            for scores, require_match in ((bm25, True), (dense, False)):
+                order = _top(scores, FUSION_DEPTH)
+                if require_match:
+                    order = order[scores[order] > 0]
+                fused[order] += 1.0 / (RRF_K + np.arange(1, len(order) + 1))
+            candidates = np.nonzero(fused)[0]
+            # Ties in the fused rank are broken by the BM25 score.
+            order = candidates[np.lexsort((-bm25[candidates], -fused[candidates]))][:k]
+            scores = fused
+        else:
+            scores = bm25
+            order = _top(scores, k)
+
+        return [
+            SearchHit(self.part_names[self.chunk_part[ids[i]]], self.texts[ids[i]], float(scores[i]))
+            for i in order
+            if scores[i] > 0
+        ]
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the `k` highest scores, best first."""
+    if len(scores) > k:
+        candidates = np.argpartition(-scores, k)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class LocalSearchBackend:
+    """`datasheet_rag.SearchBackend` over a local `DatasheetIndex`.
+
+    Args:
+      index: The loaded index.
+      embedder: Embeds the query for the hybrid ranking; BM25 only if None.
+    """
+
+    def __init__(self, index: DatasheetIndex, embedder: Optional[Embedder] = None):
+        self.index = index
+        self.embedder = embedder
+
+    def search(self, query: str, page_size: int) -> List[str]:
+        query_embedding = None
+        if self.embedder is not None and self.index.embeddings is not None:
+            query_embedding = self.embedder([query])[0]
+        hits = self.index.search(query, k=page_size, query_embedding=query_embedding)
+        return [f"[{hit.part_number}] {hit.text}" for hit in hits]
+
+    def search_part(self, part_number: str, query: str, page_size: int) -> List[str]:
+        """Snippets from one datasheet; its first chunks if nothing matches `query`."""
+        indexed = self.index.resolve_part_number(part_number)
+        if indexed is None:
+            return []
+        query_embedding = None
+        if self.embedder is not None and self.index.embeddings is not None:
+            query_embedding = self.embedder([query])[0]
+        hits = self.index.search(
+            query, k=page_size, part_numbers=[indexed], query_embedding=query_embedding
+        )
+        if hits:
+            return [hit.text for hit in hits]
+        start, end = self.index.parts[indexed]
+        return self.index.texts[start:min(end, start + page_size)]
+
+
+def main():
+    from .config import Config
+
+    configs = Config()
+    parser = argparse.ArgumentParser(description="Builds the local datasheet index.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--folder", default=configs.DATASHEET_DIR)
+    parser.add_argument("--out", default=configs.DATASHEET_INDEX_DIR)
+    parser.add_argument("--embed", action="store_true", help="Also compute chunk embeddings.")
+    parser.add_argument("--embedding-model", default=configs.DATASHEET_INDEX_EMBEDDING_MODEL)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    embedder = genai_embedder(args.embedding_model) if args.embed else None
+    stats = build_index_from_folder(args.folder, args.out, embedder=embedder, workers=args.workers)
+    logger.info("Datasheet index written to %s: %s", args.out, stats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""Datasheet inventory: which part numbers have a PDF, and which were uploaded.
+
+The `datasheet_manifest` table keeps one row per part number with the
+sanitized file name, SHA-256, size, mtime and upload state:
+
+* `faltante`: no PDF in the datasheet folder;
+* `local`: the PDF is on disk but this version was not uploaded yet;
+* `subido`: the current version is in the GCS bucket.
+
+`reconcile` brings the manifest up to date with a single query for the part
+numbers, a single query for the manifest and a single directory scan; files
+are only re-hashed when their size or mtime changed, and all state changes
+are written in batches. The upload script and the download report read the
+manifest instead of touching the file system or the database per part.
+"""
+
+import hashlib
+import logging
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from psycopg2.extras import execute_values
+
+from .datasheet_downloader import datasheet_filename
+from .db_migrations import DATASHEET_MANIFEST_DDL
+
+logger = logging.getLogger(__name__)
+
+MISSING = "faltante"
+LOCAL = "local"
+UPLOADED = "subido"
+
+_COLUMNS = (
+    "nro_de_parte",
+    "archivo",
+    "sha256",
+    "tamano_bytes",
+    "modificado_en",
+    "estado",
+    "sha256_subido",
+)
+
+BATCH_SIZE = 500
+
+
+class ManifestEntry(NamedTuple):
+    nro_de_parte: str
+    archivo: str
+    sha256: Optional[str]
+    tamano_bytes: Optional[int]
+    modificado_en: Optional[float]
+    estado: str
+    sha256_subido: Optional[str]
+
+
+class ReconcileReport(NamedTuple):
+    part_numbers: int
+    files_scanned: int
+    hashed: int
+    changed: int
+    removed: int
+    counts: Dict[str, int]
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as pdf:
+        for chunk in iter(lambda: pdf.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_folder(folder: str) -> Dict[str, Tuple[int, float]]:
+    """One directory scan: PDF file name -> (size, mtime)."""
+    if not os.path.isdir(folder):
+        return {}
+    files = {}
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.lower().endswith(".pdf") and entry.is_file():
+                stat = entry.stat()
+                files[entry.name] = (stat.st_size, stat.st_mtime)
+    return files
+
+
+def ensure_manifest(conn):
+    """Creates the manifest table if it does not exist yet."""
+    with conn.cursor() as cur:
+        for statement in DATASHEET_MANIFEST_DDL:
+            cur.execute(statement)
+    conn.commit()
+
+
+def load_manifest(conn) -> Dict[str, ManifestEntry]:
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT {', '.join(_COLUMNS)} FROM datasheet_manifest;")
+        return {row[0]: ManifestEntry(*row) for row in cur.fetchall()}
+
+
+def _catalog_part_numbers(cur) -> List[str]:
+    cur.execute('SELECT DISTINCT "Nro. de Parte" FROM productos;')
+    return [row[0] for row in cur.fetchall() if row[0] and row[0].strip()]
+
+
+def _legacy_indexed_part_numbers(cur) -> Set[str]:
+    """Part numbers marked with the old `productos.datasheet_indexed_at`, if present."""
+    cur.execute(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_name = 'productos' AND column_name = 'datasheet_indexed_at';"
+    )
+    if cur.fetchone() is None:
+        return set()
+    cur.execute(
+        'SELECT DISTINCT "Nro. de Parte" FROM productos WHERE datasheet_indexed_at IS NOT NULL;'
+    )
+    return {row[0] for row in cur.fetchall()}
+
+
+def reconcile_entries(
+    part_numbers: Iterable[str],
+    manifest: Dict[str, ManifestEntry],
+    files: Dict[str, Tuple[int, float]],
+    folder: str,
+    legacy_uploaded: Set[str] = frozenset(),
+) -> Tuple[List[ManifestEntry], List[str], int]:
+    """Computes the manifest changes for the current catalog and folder scan.
+
+    Returns:
+      The entries to upsert, the part numbers to delete and how many files
+      were hashed.
+    """
+    changed, hashed, seen = [], 0, set()
+    for part_number in part_numbers:
+        if part_number in seen:
+            continue
+        seen.add(part_number)
+        current = manifest.get(part_number)
+        archivo = datasheet_filename(part_number)
+        sha256_subido = current.sha256_subido if current else None
+
+        stat = files.get(archivo)
+        if stat is None:
+            sha256 = size = mtime = None
+        else:
+            size, mtime = stat
+            if (
+                current is not None
+                and current.sha256
+                and (current.tamano_bytes, current.modificado_en) == (size, mtime)
+            ):
+                sha256 = current.sha256
+            else:
+                sha256 = file_sha256(os.path.join(folder, archivo))
+                hashed += 1
+            if current is None and part_number in legacy_uploaded:
+                sha256_subido = sha256
+
+        if sha256 is not None:
+            estado = UPLOADED if sha256 == sha256_subido else LOCAL
+        else:
+            # The PDF is no longer on disk, but a previous version may still be in GCS.
+            estado = UPLOADED if sha256_subido else MISSING
+
+        entry = ManifestEntry(part_number, archivo, sha256, size, mtime, estado, sha256_subido)
+        if entry != current:
+            changed.append(entry)
+
+    removed = [part_number for part_number in manifest if part_number not in seen]
+    return changed, removed, hashed
+
+
+def reconcile(conn, folder: str) -> ReconcileReport:
+    """Brings `datasheet_manifest` up to date with the catalog and the folder."""
+    with conn.cursor() as cur:
+        part_numbers = _catalog_part_numbers(cur)
+        legacy_uploaded = _legacy_indexed_part_numbers(cur)
+    manifest = load_manifest(conn)
+    files = scan_folder(folder)
+    changed, removed, hashed = reconcile_entries(
+        part_numbers, manifest, files, folder, legacy_uploaded
+    )
+
+    try:
+        with conn.cursor() as cur:
+            if changed:
+                updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in _COLUMNS[1:])
+                execute_values(
+                    cur,
+                    f"INSERT INTO datasheet_manifest ({', '.join(_COLUMNS)}) VALUES %s "
+                    f"ON CONFLICT (nro_de_parte) DO UPDATE SET {updates}, "
+                    "actualizado_en = CURRENT_TIMESTAMP;",
+                    changed,
+                    page_size=BATCH_SIZE,
+                )
+            if removed:
+                cur.execute(
+                    "DELETE FROM datasheet_manifest WHERE nro_de_parte = ANY(%s);", (removed,)
+                )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    counts = {MISSING: 0, LOCAL: 0, UPLOADED: 0}
+    merged = dict(manifest)
+    merged.update((entry.nro_de_parte, entry) for entry in changed)
+    for part_number in removed:
+        merged.pop(part_number, None)
+    for entry in merged.values():
+        counts[entry.estado] += 1
+    report = ReconcileReport(len(merged), len(files), hashed, len(changed), len(removed), counts)
+    logger.info("Datasheet manifest reconciled: %s", report)
+    return report
+
+
+def pending_uploads(conn) -> List[ManifestEntry]:
+    """Entries whose current PDF still has to be uploaded."""
+    with conn.cursor() as cur:
+        cur.execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM datasheet_manifest "
+            "WHERE estado = %s ORDER BY nro_de_parte;",
+            (LOCAL,),
+        )
+        return [ManifestEntry(*row) for row in cur.fetchall()]
+
+
+def mark_uploaded(conn, uploads: Iterable[Tuple[str, str]]) -> int:
+    """Marks (part number, uploaded sha256) pairs as uploaded in one statement.
+
+    Returns:
+        int: Number of manifest rows updated, whatever the number of pairs.
+    """
+    uploads = list(uploads)
+    if not uploads:
+        return 0
+    part_numbers, hashes = (list(column) for column in zip(*uploads))
+    with conn.cursor() as cur:
+        cur.execute(
+            f"UPDATE datasheet_manifest AS m SET estado = '{UPLOADED}', "
+            "sha256_subido = v.sha256, subido_en = CURRENT_TIMESTAMP, "
+            "actualizado_en = CURRENT_TIMESTAMP "
+            "FROM unnest(%s::text[], %s::text[]) AS v (nro_de_parte, sha256) "
+            # If the file changed while it was being uploaded it stays pending.
+            "WHERE m.nro_de_parte = v.nro_de_parte AND m.sha256 = v.sha256;",
+            (part_numbers, hashes),
+        )
+        updated = cur.rowcount
+    conn.commit()
+    return updated
+
+
+def build_report(conn) -> str:
+    """Download report (with / without PDF) generated from the manifest."""
+    with_pdf, without_pdf = [], []
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT nro_de_parte, sha256 IS NOT NULL FROM datasheet_manifest ORDER BY nro_de_parte;"
+        )
+        for part_number, has_pdf in cur.fetchall():
+            (with_pdf if has_pdf else without_pdf).append(part_number)
+
+    report_content = f"""
+    # Informe de Descarga de Datasheets
+
+    Total de Artículos Únicos: {len(with_pdf) + len(without_pdf)}
+    Artículos con PDF Descargado: {len(with_pdf)}
+    Artículos sin PDF: {len(without_pdf)}
+
+    --- Artículos CON PDF ({len(with_pdf)}) ---
+    """
+    report_content += "\n".join(with_pdf)
+    report_content += f"""
+
+    --- Artículos SIN PDF ({len(without_pdf)}) ---
+    """
+    report_content += "\n".join(without_pdf)
+    return report_content
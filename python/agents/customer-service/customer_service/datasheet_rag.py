@@ -0,0 +1,365 @@
+"""Datasheet retrieval for `query_datasheet_rag`.
+
+The Vertex AI Search (Discovery Engine) client and serving config path are
+created once per process and reused. Results are cached by normalized query
+("¿TDP del Ryzen 5 5600?" and "tdp del ryzen 5 5600" share an entry), and
+identical queries that arrive while a search is in flight wait for that
+search instead of issuing their own. `search_part` does the same for a
+single part number's datasheet (cached per part and question), which is what
+`search_products_with_specs` uses to enrich catalog results; it only returns
+snippets that come from (or mention) that part's datasheet.
+
+The backend is pluggable: `DATASHEET_RAG_BACKEND=local` answers from the
+offline index built by `datasheet_index`, and `FakeSearchBackend` answers
+from an in-memory corpus for tests and benchmarks.
+"""
+
+import asyncio
+import posixpath
+import re
+import threading
+import time
+import unicodedata
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, List, Mapping, Optional, Protocol
+
+from .config import Config
+from .shared_libraries.cache import LRUTTLCache
+from .tracing import annotate, span
+
+# Words, keeping part numbers such as "i5-12400" or "2.5" in one piece.
+_WORD_RE = re.compile(r"\w+(?:[.+-]\w+)*")
+
+# Results requested by `DiscoveryEngineBackend.search_part`, before keeping
+# only the ones from the part's datasheet.
+PART_SEARCH_CANDIDATES = 20
+
+
+class SearchBackend(Protocol):
+    """A datasheet search backend.
+
+    Backends may also implement `search_part(part_number, query, page_size)`
+    to search a single datasheet; otherwise the part number is added to the
+    query and only the snippets that mention it are kept.
+    """
+
+    def search(self, query: str, page_size: int) -> List[str]:
+        ...
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: case, accents, punctuation and spacing folded."""
+    text = unicodedata.normalize("NFKD", query.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(_WORD_RE.findall(text))
+
+
+def mentions_part_number(text: str, part_number: str) -> bool:
+    """True if `text` contains `part_number` as whole words ("5600" is not in "15600")."""
+    part = normalize_query(part_number)
+    return bool(part) and f" {part} " in f" {normalize_query(text)} "
+
+
+class DiscoveryEngineBackend:
+    """Searches a Discovery Engine data store with one shared client."""
+
+    def __init__(self, project: str, location: str, data_store: str):
+        self.project = project
+        self.location = location
+        self.data_store = data_store
+        self._client = None
+        self._serving_config = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from google.cloud import discoveryengine
+
+                    client = discoveryengine.SearchServiceClient()
+                    self._serving_config = client.serving_config_path(
+                        project=self.project,
+                        location=self.location,
+                        data_store=self.data_store,
+                        serving_config="default",
+                    )
+                    self._client = client
+        return self._client
+
+    def _search(self, query: str, page_size: int):
+        from google.cloud import discoveryengine
+
+        client = self._get_client()
+        request = discoveryengine.SearchRequest(
+            serving_config=self._serving_config,
+            query=query,
+            page_size=page_size,
+            query_expansion_spec=discoveryengine.SearchRequest.QueryExpansionSpec(
+                mode=discoveryengine.SearchRequest.QueryExpansionSpec.Mode.AUTO
+            ),
+            content_search_spec=discoveryengine.SearchRequest.ContentSearchSpec(
+                snippet_spec=discoveryengine.SearchRequest.ContentSearchSpec.SnippetSpec(
+                    return_snippets=True
+                )
+            ),
+        )
+        return client.search(request).results
+
+    @staticmethod
+    def _snippets(result) -> List[str]:
+        if result.snippet and result.snippet.snippet:
+            return [result.snippet.snippet]
+        snippets = []
+        if (
+            result.document
+            and result.document.derived_struct_data
+            and "extractive_answers" in result.document.derived_struct_data
+        ):
+            # Fallback for extractive answers if direct snippets are not ideal.
+            for answer in result.document.derived_struct_data["extractive_answers"]:
+                if "content" in answer:
+                    snippets.append(answer["content"])
+        return snippets
+
+    def search(self, query: str, page_size: int) -> List[str]:
+        snippets = []
+        for result in self._search(query, page_size):
+            snippets.extend(self._snippets(result))
+        return snippets
+
+    def search_part(self, part_number: str, query: str, page_size: int) -> List[str]:
+        """Snippets of the datasheet uploaded for `part_number` only.
+
+        The data store indexes the PDFs under the name `datasheet_filename`
+        gives them; results from other documents are dropped.
+        """
+        from .datasheet_downloader import datasheet_filename
+
+        filename = datasheet_filename(part_number).casefold()
+        snippets = []
+        candidates = max(page_size, PART_SEARCH_CANDIDATES)
+        for result in self._search(f"{part_number} {query}", candidates):
+            data = result.document.derived_struct_data if result.document else None
+            link = (data or {}).get("link") or ""
+            if posixpath.basename(link).casefold() == filename:
+                snippets.extend(self._snippets(result))
+        return snippets[:page_size]
+
+
+class FakeSearchBackend:
+    """In-memory backend: returns the documents sharing the most query words.
+
+    Args:
+      documents: Document id -> text.
+      latency_secs: Simulated round trip per search.
+    """
+
+    def __init__(self, documents: Mapping[str, str], latency_secs: float = 0.0):
+        self.latency_secs = latency_secs
+        self.calls = 0
+        self._documents = [
+            (text, set(normalize_query(text).split())) for text in documents.values()
+        ]
+        self._lock = threading.Lock()
+
+    def search(self, query: str, page_size: int) -> List[str]:
+        with self._lock:
+            self.calls += 1
+        if self.latency_secs:
+            time.sleep(self.latency_secs)
+        words = set(normalize_query(query).split())
+        ranked = sorted(
+            (
+                (len(words & document_words), -index, text)
+                for index, (text, document_words) in enumerate(self._documents)
+            ),
+            reverse=True,
+        )
+        return [text for score, _, text in ranked if score][:page_size]
+
+
+class DatasheetRetriever:
+    """Cached, coalescing front end over a `SearchBackend`.
+
+    Args:
+      backend: Where the searches go.
+      cache: Normalized query -> snippets.
+      page_size: Results requested per search.
+    """
+
+    def __init__(self, backend: SearchBackend, cache: LRUTTLCache, page_size: int = 5):
+        self.backend = backend
+        self.cache = cache
+        self.page_size = page_size
+        self.backend_calls = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self._inflight_async: Dict[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Future]] = {}
+
+    def _fetch(self, fetch: Callable[[], List[str]]) -> List[str]:
+        with self._lock:
+            self.backend_calls += 1
+        with span("rag.backend"):
+            return fetch()
+
+    def _part_fetch(self, part_number: str, query: str, page_size: Optional[int]):
+        key = ("part", normalize_query(part_number), normalize_query(query))
+        page_size = page_size or self.page_size
+        search_part = getattr(self.backend, "search_part", None)
+        if search_part is not None:
+            return key, lambda: search_part(part_number, query, page_size)
+        # Backends without a part filter get the part number in the query;
+        # snippets that don't mention it may come from other datasheets.
+        def fetch():
+            snippets = self.backend.search(f"{part_number} {query}", page_size)
+            return [s for s in snippets if mentions_part_number(s, part_number)]
+
+        return key, fetch
+
+    def search(self, query: str) -> List[str]:
+        """Snippets for `query`, from the cache or a (shared) backend search."""
+        with span("rag.search"):
+            return self._cached(
+                normalize_query(query), lambda: self.backend.search(query, self.page_size)
+            )
+
+    def search_part(self, part_number: str, query: str, page_size: Optional[int] = None) -> List[str]:
+        """Snippets for `query` from the datasheet of `part_number` only."""
+        with span("rag.search_part"):
+            return self._cached(*self._part_fetch(part_number, query, page_size))
+
+    async def search_async(self, query: str) -> List[str]:
+        """Async version of `search`; the backend call runs in a worker thread."""
+        with span("rag.search"):
+            return await self._cached_async(
+                normalize_query(query), lambda: self.backend.search(query, self.page_size)
+            )
+
+    async def search_part_async(
+        self, part_number: str, query: str, page_size: Optional[int] = None
+    ) -> List[str]:
+        """Async version of `search_part`."""
+        with span("rag.search_part"):
+            return await self._cached_async(*self._part_fetch(part_number, query, page_size))
+
+    def _cached(self, key: Hashable, fetch: Callable[[], List[str]]) -> List[str]:
+        cached = self.cache.get(key)
+        annotate(cache_hit=cached is not None)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            annotate(coalesced=True)
+            return future.result()
+
+        generation = self.cache.generation
+        try:
+            snippets = self._fetch(fetch)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            self.cache.set(key, snippets, generation)
+            future.set_result(snippets)
+            return snippets
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    async def _cached_async(self, key: Hashable, fetch: Callable[[], List[str]]) -> List[str]:
+        cached = self.cache.get(key)
+        annotate(cache_hit=cached is not None)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight_async.get(loop)
+        if inflight is None:
+            for other in [other for other in self._inflight_async if other.is_closed()]:
+                del self._inflight_async[other]
+            inflight = self._inflight_async[loop] = {}
+        future = inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            annotate(coalesced=True)
+            # shield: a follower that is cancelled must not cancel the leader.
+            return await asyncio.shield(future)
+
+        future = inflight[key] = loop.create_future()
+        generation = self.cache.generation
+        try:
+            snippets = await asyncio.to_thread(self._fetch, fetch)
+        except BaseException as e:
+            future.set_exception(e)
+            # Followers (if any) receive the error; avoid "never retrieved".
+            future.exception()
+            raise
+        else:
+            self.cache.set(key, snippets, generation)
+            future.set_result(snippets)
+            return snippets
+        finally:
+            del inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "backend_calls": self.backend_calls,
+            "coalesced": self.coalesced,
+            **self.cache.stats(),
+        }
+
+
+def _configured_backend(configs: Config) -> SearchBackend:
+    if configs.DATASHEET_RAG_BACKEND == "local":
+        from .datasheet_index import DatasheetIndex, LocalSearchBackend, genai_embedder
+
+        index = DatasheetIndex(configs.DATASHEET_INDEX_DIR)
+        embedder = None
+        if configs.DATASHEET_INDEX_HYBRID and index.embeddings is not None:
+            embedder = genai_embedder(configs.DATASHEET_INDEX_EMBEDDING_MODEL)
+        return LocalSearchBackend(index, embedder)
+    if configs.DATASHEET_RAG_BACKEND != "remote":
+        raise ValueError(f"unknown DATASHEET_RAG_BACKEND {configs.DATASHEET_RAG_BACKEND!r}")
+    return DiscoveryEngineBackend(
+        configs.CLOUD_PROJECT,
+        configs.CLOUD_LOCATION,
+        configs.DATASHEET_RAG_DATA_STORE_ID,
+    )
+
+
+_retriever: Optional[DatasheetRetriever] = None
+_retriever_lock = threading.Lock()
+
+
+def get_datasheet_retriever() -> DatasheetRetriever:
+    """Returns the process-wide retriever, creating it on first use."""
+    global _retriever
+    if _retriever is None:
+        with _retriever_lock:
+            if _retriever is None:
+                configs = Config()
+                _retriever = DatasheetRetriever(
+                    _configured_backend(configs),
+                    LRUTTLCache(
+                        max_size=configs.DATASHEET_RAG_CACHE_MAX_SIZE,
+                        ttl=configs.DATASHEET_RAG_CACHE_TTL_SECS,
+                    ),
+                    page_size=configs.DATASHEET_RAG_PAGE_SIZE,
+                )
+    return _retriever
+
+
+def set_datasheet_retriever(retriever: Optional[DatasheetRetriever]):
+    """Replaces the process-wide retriever (e.g. with a `FakeSearchBackend`)."""
+    global _retriever
+    with _retriever_lock:
+        _retriever = retriever
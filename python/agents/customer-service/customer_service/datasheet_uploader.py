@@ -0,0 +1,160 @@
+"""Parallel datasheet ingestion into the RAG bucket.
+
+Uploads are network bound, so a bounded thread pool keeps several of them in
+flight while the main thread records the results. Each upload is retried with
+exponential backoff on errors, large files use chunked resumable uploads (a
+dropped connection resumes from the last chunk instead of starting over), and
+successful uploads are committed to the datasheet manifest in batches.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Protocol, Tuple
+
+from .datasheet_inventory import ManifestEntry
+
+logger = logging.getLogger(__name__)
+
+# Files larger than this are uploaded in resumable chunks (must be a multiple
+# of 256 KiB for GCS).
+RESUMABLE_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+class BlobStore(Protocol):
+    def upload(self, local_path: str, destination: str) -> None:
+        ...
+
+
+class GCSBlobStore:
+    """Uploads to a GCS bucket, with one client per worker thread."""
+
+    def __init__(
+        self, bucket_name: str, project: Optional[str] = None, chunk_size: int = RESUMABLE_CHUNK_SIZE
+    ):
+        self.bucket_name = bucket_name
+        self.project = project
+        self.chunk_size = chunk_size
+        self._local = threading.local()
+
+    def _bucket(self):
+        bucket = getattr(self._local, "bucket", None)
+        if bucket is None:
+            from google.cloud import storage
+
+            bucket = storage.Client(project=self.project).bucket(self.bucket_name)
+            self._local.bucket = bucket
+        return bucket
+
+    def upload(self, local_path: str, destination: str) -> None:
+        blob = self._bucket().blob(destination)
+        if os.path.getsize(local_path) > self.chunk_size:
+            blob.chunk_size = self.chunk_size
+        blob.upload_from_filename(local_path, content_type="application/pdf")
+
+
+@dataclass
+class UploadSummary:
+    uploaded: int = 0
+    failed: int = 0
+    bytes_uploaded: int = 0
+    elapsed_secs: float = 0.0
+
+    def __str__(self) -> str:
+        rate = self.bytes_uploaded / self.elapsed_secs / 1e6 if self.elapsed_secs else 0.0
+        return (
+            f"{self.uploaded} uploaded, {self.failed} failed, "
+            f"{self.bytes_uploaded / 1e6:.1f} MB in {self.elapsed_secs:.1f}s ({rate:.1f} MB/s)"
+        )
+
+
+def upload_with_retry(
+    store: BlobStore,
+    local_path: str,
+    destination: str,
+    max_attempts: int = 4,
+    backoff_secs: float = 1.0,
+    sleep: Callable[[float], None] = time.sleep,
+) -> None:
+    """Uploads one file, retrying with exponential backoff and jitter."""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            store.upload(local_path, destination)
+            return
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            if attempt == max_attempts:
+                raise
+            delay = backoff_secs * 2 ** (attempt - 1) * (1 + random.random())
+            logger.warning(
+                "Upload of %s failed (attempt %d/%d): %s; retrying in %.1fs",
+                local_path, attempt, max_attempts, e, delay,
+            )
+            sleep(delay)
+
+
+def upload_datasheets(
+    entries: Iterable[ManifestEntry],
+    store: BlobStore,
+    folder: str,
+    on_batch: Callable[[List[Tuple[str, str]]], object],
+    workers: int = 8,
+    batch_size: int = 50,
+    max_attempts: int = 4,
+    backoff_secs: float = 1.0,
+    prefix: str = "datasheets/",
+) -> UploadSummary:
+    """Uploads the manifest entries with `workers` threads.
+
+    Args:
+      entries: Entries to upload (see `datasheet_inventory.pending_uploads`).
+      store: Destination blob store.
+      folder: Local datasheet folder.
+      on_batch: Called from the calling thread with lists of
+        (part number, sha256) of successful uploads, at most `batch_size`
+        at a time, e.g. `lambda batch: mark_uploaded(conn, batch)`.
+      workers: Uploads in flight at once.
+
+    Returns:
+      UploadSummary with counts, bytes and elapsed time.
+    """
+    start = time.monotonic()
+    summary = UploadSummary()
+    batch: List[Tuple[str, str]] = []
+
+    def upload(entry: ManifestEntry) -> ManifestEntry:
+        upload_with_retry(
+            store,
+            os.path.join(folder, entry.archivo),
+            f"{prefix}{entry.archivo}",
+            max_attempts=max_attempts,
+            backoff_secs=backoff_secs,
+        )
+        return entry
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="datasheet-upload") as pool:
+        futures = {pool.submit(upload, entry): entry for entry in entries}
+        for future in as_completed(futures):
+            entry = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                summary.failed += 1
+                logger.error("Failed to upload %s: %s", entry.archivo, e)
+                continue
+            summary.uploaded += 1
+            summary.bytes_uploaded += entry.tamano_bytes or 0
+            batch.append((entry.nro_de_parte, entry.sha256))
+            if len(batch) >= batch_size:
+                on_batch(batch)
+                batch = []
+    if batch:
+        on_batch(batch)
+
+    summary.elapsed_secs = time.monotonic() - start
+    return summary
@@ -0,0 +1,294 @@
+"""Bootstrap y mantenimiento del esquema de búsqueda de productos.
+
+Crea la extensión `pg_trgm` y la vista materializada `productos_busqueda`, que
+es donde buscan todos los niveles de `data_manager`: trae cada producto con el
+"Stock" ya convertido a entero y columnas precalculadas (número de parte sin
+espacios, nombre en minúsculas, sockets y serie de procesador), con sus índices
+GIN (`gin_trgm_ops`) para similitud / ILIKE. También instala la versión del
+catálogo y el trigger que avisa por NOTIFY cuando cambia `productos`, y la tabla
+del inventario de datasheets. Todas las sentencias son idempotentes, así que se
+pueden correr en cada arranque.
+
+`catalog_import` refresca la vista en la misma transacción que actualiza
+`productos`. Si el catálogo se modifica por otro camino (psql, scripts), hay que
+refrescarla a mano:
+
+    python -m customer_service.db_migrations
+"""
+
+import logging
+from typing import List, Tuple
+
+from .normalization import SERIES_ALIASES, SOCKET_NAME_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+# Umbral mínimo usado por el operador `%`. Debe ser el menor de los umbrales de
+# similitud de las búsquedas; cada consulta vuelve a verificar su umbral real con
+# `similarity(...) > x`, y el índice sólo se usa para descartar candidatos.
+TRGM_SIMILARITY_LIMIT = 0.05
+
+# Vista materializada sobre la que corren las búsquedas de productos.
+SEARCH_VIEW = "productos_busqueda"
+
+# Columnas de `productos`, en orden. Las consultas de productos devuelven
+# "Stock" como entero (ver STOCK_UNIDADES).
+PRODUCT_COLUMNS: Tuple[str, ...] = (
+    "id",
+    "Codigo",
+    "Categoria",
+    "Producto",
+    "Fabricante",
+    "Nro. de Parte",
+    "Moneda",
+    "Precio sin IVA",
+    "%IVA",
+    "Imp. Int.",
+    "Precio Final U$D",
+    "Stock",
+)
+
+# "Stock" es texto en la lista de precios ("12", "nan", vacío): unidades como
+# entero, 0 si no hay un número.
+STOCK_UNIDADES = "COALESCE(substring(p.\"Stock\" from '\\d+')::integer, 0)"
+
+# Número de parte sin espacios.
+NRO_DE_PARTE_NORMALIZADO = "REPLACE(p.\"Nro. de Parte\", ' ', '')"
+
+# Los patrones de `normalization.extract_socket`, pero sólo como palabras
+# completas (`\m`, `\M`): si no, "12400" aporta "1240" y "A520M" aporta "520".
+SOCKET_WORDS_REGEX = "|".join(f"\\m(?:{pattern})\\M" for pattern in SOCKET_NAME_PATTERNS)
+
+# Sockets que aparecen en el nombre, en la forma de `normalize_socket` (en
+# mayúsculas y sin el prefijo LGA/S de los sockets Intel). Son todos los que
+# aparecen, no sólo el primero: un cooler "AM4/1700" sirve para ambos.
+SOCKETS_SQL = (
+    "ARRAY(SELECT DISTINCT regexp_replace(upper(m[1]), '^(LGA|S)(\\d)', '\\2') "
+    "FROM regexp_matches(p.\"Producto\", '(" + SOCKET_WORDS_REGEX + ")', 'gi') AS m)"
+)
+
+# Serie de procesador (clave de `normalization.SERIES_ALIASES`) según el nombre.
+SERIE_SQL = (
+    "CASE "
+    + " ".join(
+        f"WHEN lower(p.\"Producto\") ~ '\\m({'|'.join(terms)})\\M' THEN '{serie}'"
+        for serie, terms in SERIES_ALIASES.items()
+    )
+    + " END"
+)
+
+
+def _quoted(column: str) -> str:
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _search_view_sql() -> str:
+    columns = [f"p.{_quoted(column)}" for column in PRODUCT_COLUMNS if column != "Stock"]
+    columns.append(f'{STOCK_UNIDADES} AS "Stock"')
+    return (
+        f"CREATE MATERIALIZED VIEW IF NOT EXISTS {SEARCH_VIEW} AS SELECT "
+        + ", ".join(columns)
+        + f", {NRO_DE_PARTE_NORMALIZADO} AS nro_de_parte_norm"
+        + ', lower(p."Producto") AS producto_lower'
+        + f", {SOCKETS_SQL} AS sockets"
+        + f", {SERIE_SQL} AS serie"
+        + " FROM productos p;"
+    )
+
+
+# Versión de la definición de la vista, guardada como comentario. `CREATE ...
+# IF NOT EXISTS` no cambia una vista existente: al cambiar la definición se
+# incrementa y el bootstrap borra la vista anterior (con sus índices).
+SEARCH_VIEW_VERSION = "2"
+
+# La vista materializada y sus índices. El índice único sobre `id` es el que
+# permite `REFRESH MATERIALIZED VIEW CONCURRENTLY`.
+SEARCH_VIEW_DDL = [
+    f"""
+    DO $$
+    BEGIN
+        IF to_regclass('{SEARCH_VIEW}') IS NOT NULL AND obj_description(
+            to_regclass('{SEARCH_VIEW}'), 'pg_class'
+        ) IS DISTINCT FROM '{SEARCH_VIEW_VERSION}' THEN
+            DROP MATERIALIZED VIEW {SEARCH_VIEW};
+        END IF;
+    END;
+    $$;
+    """,
+    _search_view_sql(),
+    f"COMMENT ON MATERIALIZED VIEW {SEARCH_VIEW} IS '{SEARCH_VIEW_VERSION}';",
+    f"CREATE UNIQUE INDEX IF NOT EXISTS {SEARCH_VIEW}_id_idx ON {SEARCH_VIEW} (id);",
+    f"CREATE INDEX IF NOT EXISTS {SEARCH_VIEW}_stock_idx "
+    f'ON {SEARCH_VIEW} ("Stock" DESC, id);',
+    f"CREATE INDEX IF NOT EXISTS {SEARCH_VIEW}_sockets_idx ON {SEARCH_VIEW} USING gin (sockets);",
+    f"CREATE INDEX IF NOT EXISTS {SEARCH_VIEW}_serie_idx ON {SEARCH_VIEW} (serie);",
+]
+
+TRGM_INDEXES: List[Tuple[str, str]] = [
+    (f"{SEARCH_VIEW}_producto_trgm_idx", "producto_lower gin_trgm_ops"),
+    (f"{SEARCH_VIEW}_categoria_trgm_idx", '"Categoria" gin_trgm_ops'),
+    (f"{SEARCH_VIEW}_fabricante_trgm_idx", '"Fabricante" gin_trgm_ops'),
+    (f"{SEARCH_VIEW}_nro_parte_trgm_idx", "nro_de_parte_norm gin_trgm_ops"),
+]
+
+# Índices trigram que antes estaban sobre `productos`; las búsquedas ya no los
+# usan y sólo encarecen la importación.
+LEGACY_TRGM_INDEXES = [
+    "productos_producto_trgm_idx",
+    "productos_categoria_trgm_idx",
+    "productos_fabricante_trgm_idx",
+    "productos_nro_parte_trgm_idx",
+]
+
+REFRESH_SEARCH_VIEW_SQL = f"REFRESH MATERIALIZED VIEW CONCURRENTLY {SEARCH_VIEW};"
+
+# Canal NOTIFY por el que se avisa que el catálogo cambió (ver product_cache).
+CATALOG_CHANNEL = "catalogo_actualizado"
+
+# Versión del catálogo: una sola fila que se incrementa con cada sentencia que
+# modifica `productos`, y que además dispara un NOTIFY al confirmarse la
+# transacción. Cubre cualquier camino de recarga (importador, psql, scripts).
+CATALOG_VERSION_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS catalogo_version (
+        id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+        version BIGINT NOT NULL DEFAULT 0,
+        actualizado_en TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    "INSERT INTO catalogo_version (id) VALUES (TRUE) ON CONFLICT DO NOTHING;",
+    f"""
+    CREATE OR REPLACE FUNCTION notificar_cambio_catalogo() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        nueva_version BIGINT;
+    BEGIN
+        UPDATE catalogo_version
+           SET version = version + 1, actualizado_en = CURRENT_TIMESTAMP
+         RETURNING version INTO nueva_version;
+        PERFORM pg_notify('{CATALOG_CHANNEL}', nueva_version::text);
+        RETURN NULL;
+    END;
+    $$;
+    """,
+    """
+    CREATE OR REPLACE TRIGGER productos_notificar_cambio
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON productos
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_catalogo();
+    """,
+]
+
+# Inventario de datasheets (ver datasheet_inventory): una fila por número de
+# parte con el archivo, su hash y si ya se subió al bucket.
+DATASHEET_MANIFEST_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS datasheet_manifest (
+        nro_de_parte VARCHAR(255) PRIMARY KEY,
+        archivo VARCHAR(255) NOT NULL,
+        sha256 CHAR(64),
+        tamano_bytes BIGINT,
+        modificado_en DOUBLE PRECISION,
+        estado VARCHAR(10) NOT NULL DEFAULT 'faltante',
+        sha256_subido CHAR(64),
+        subido_en TIMESTAMP WITH TIME ZONE,
+        actualizado_en TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS datasheet_manifest_estado_idx ON datasheet_manifest (estado);",
+]
+
+
+def _create_index_sql(name: str, expression: str) -> str:
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+        f"ON {SEARCH_VIEW} USING gin ({expression});"
+    )
+
+
+def bootstrap_statements() -> List[str]:
+    """Sentencias idempotentes del bootstrap, en orden (deben correr en autocommit)."""
+    statements = ["CREATE EXTENSION IF NOT EXISTS pg_trgm;"]
+    statements.extend(f"DROP INDEX CONCURRENTLY IF EXISTS {name};" for name in LEGACY_TRGM_INDEXES)
+    statements.extend(SEARCH_VIEW_DDL)
+    statements.extend(_create_index_sql(name, expression) for name, expression in TRGM_INDEXES)
+    statements.extend(CATALOG_VERSION_DDL)
+    statements.extend(DATASHEET_MANIFEST_DDL)
+    return statements
+
+
+def bootstrap_database(conn):
+    """Crea la extensión, la vista de búsqueda, sus índices y el trigger de versión que falten.
+
+    `CREATE INDEX CONCURRENTLY` no bloquea el refresco de la vista, pero
+    no puede correr dentro de una transacción, así que la conexión se usa en modo
+    autocommit mientras dura el bootstrap.
+    """
+    previous_autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for statement in bootstrap_statements():
+                cur.execute(statement)
+    finally:
+        conn.autocommit = previous_autocommit
+
+
+def maintain_indexes(conn) -> List[str]:
+    """Reconstruye los índices trigram inválidos y actualiza estadísticas.
+
+    Un `CREATE INDEX CONCURRENTLY` interrumpido deja el índice marcado como
+    inválido (y `IF NOT EXISTS` no lo vuelve a crear). Conviene llamar a esta
+    función después de cada recarga del catálogo.
+
+    Returns:
+        List[str]: Nombres de los índices reconstruidos.
+    """
+    names = [name for name, _ in TRGM_INDEXES]
+    previous_autocommit = conn.autocommit
+    conn.autocommit = True
+    rebuilt = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT c.relname FROM pg_index i "
+                "JOIN pg_class c ON c.oid = i.indexrelid "
+                "WHERE NOT i.indisvalid AND c.relname = ANY(%s);",
+                (names,),
+            )
+            rebuilt = [row[0] for row in cur.fetchall()]
+            for name in rebuilt:
+                logger.warning("Reconstruyendo índice inválido %s", name)
+                cur.execute(f"REINDEX INDEX CONCURRENTLY {name};")
+            cur.execute("ANALYZE productos;")
+            cur.execute(f"ANALYZE {SEARCH_VIEW};")
+    finally:
+        conn.autocommit = previous_autocommit
+    return rebuilt
+
+
+def refresh_search_view(conn):
+    """Recalcula `productos_busqueda` sin bloquear las búsquedas que están corriendo."""
+    with conn.cursor() as cur:
+        cur.execute(REFRESH_SEARCH_VIEW_SQL)
+    conn.commit()
+
+
+def configure_connection(conn):
+    """Ajusta el umbral del operador `%` para la sesión de una conexión nueva."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT set_limit(%s);", (TRGM_SIMILARITY_LIMIT,))
+    conn.commit()
+
+
+if __name__ == "__main__":
+    from .db_pool import get_pool
+
+    logging.basicConfig(level=logging.INFO)
+    with get_pool().connection() as connection:
+        bootstrap_database(connection)
+        refresh_search_view(connection)
+        rebuilt_indexes = maintain_indexes(connection)
+    print(
+        f"Vista de búsqueda refrescada e índices trigram verificados. "
+        f"Reconstruidos: {rebuilt_indexes or 'ninguno'}"
+    )
@@ -0,0 +1,362 @@
+"""Pool de conexiones PostgreSQL compartido por el agente.
+
+Mantiene un conjunto acotado de conexiones psycopg2 de larga vida para evitar
+el handshake TCP + autenticación en cada consulta de las herramientas. Las
+conexiones ociosas se validan antes de reutilizarse y se cierran cuando pasan
+demasiado tiempo sin uso (respetando siempre el tamaño mínimo).
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+import psycopg2
+from psycopg2 import extensions
+
+from .config import Config
+from .db_migrations import bootstrap_database, configure_connection
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class PoolError(Exception):
+    """Error genérico del pool de conexiones."""
+
+
+class PoolTimeout(PoolError):
+    """No se pudo obtener una conexión dentro del tiempo de espera."""
+
+
+class PoolMetrics:
+    """Contadores del pool. Se leen con `snapshot()`."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.connect_failures = 0
+        self.health_check_failures = 0
+        self.timeouts = 0
+        self.wait_time_total_secs = 0.0
+        self.wait_time_max_secs = 0.0
+
+    def record_wait(self, waited: float):
+        self.checkouts += 1
+        self.wait_time_total_secs += waited
+        self.wait_time_max_secs = max(self.wait_time_max_secs, waited)
+
+    def snapshot(self) -> Dict[str, Any]:
+        data = dict(vars(self))
+        data["wait_time_avg_secs"] = (
+            self.wait_time_total_secs / self.checkouts if self.checkouts else 0.0
+        )
+        return data
+
+
+class ConnectionPool:
+    """Pool de conexiones acotado (min/max) con health checks y desalojo.
+
+    Args:
+        connect: Función que abre una conexión nueva.
+        min_size: Conexiones que se mantienen abiertas aunque estén ociosas.
+        max_size: Máximo de conexiones abiertas (en uso + ociosas).
+        idle_timeout: Segundos que una conexión puede estar ociosa antes de
+            cerrarse, siempre que el pool supere `min_size`.
+        checkout_timeout: Segundos máximos de espera por una conexión libre.
+        health_check_interval: Si una conexión estuvo ociosa más de estos
+            segundos se valida con `SELECT 1` antes de entregarla.
+        setup: Se ejecuta una única vez sobre la primera conexión abierta
+            (por ejemplo, para crear extensiones e índices).
+        configure: Se ejecuta sobre cada conexión nueva.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        idle_timeout: float = 300.0,
+        checkout_timeout: float = 10.0,
+        health_check_interval: float = 30.0,
+        setup: Optional[Callable[[Any], None]] = None,
+        configure: Optional[Callable[[Any], None]] = None,
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(
+                f"Tamaño de pool inválido: min={min_size}, max={max_size}"
+            )
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self._setup = setup
+        self._configure = configure
+        self._setup_done = setup is None
+
+        self._cond = threading.Condition()
+        # (conexión, instante en que se devolvió). La derecha es la más reciente.
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._size = 0
+        self._closed = False
+        self.metrics = PoolMetrics()
+
+    @classmethod
+    def from_config(cls, configs: Config) -> "ConnectionPool":
+        """Crea el pool con los parámetros `DB_*` de la configuración."""
+
+        return cls(
+            lambda: create_connection(configs),
+            min_size=configs.DB_POOL_MIN_SIZE,
+            max_size=configs.DB_POOL_MAX_SIZE,
+            idle_timeout=configs.DB_POOL_IDLE_TIMEOUT_SECS,
+            checkout_timeout=configs.DB_POOL_CHECKOUT_TIMEOUT_SECS,
+            health_check_interval=configs.DB_POOL_HEALTH_CHECK_SECS,
+            setup=bootstrap_database,
+            configure=configure_connection,
+        )
+
+    # --- Ciclo de vida ---
+
+    def open(self):
+        """Abre las `min_size` conexiones iniciales."""
+        conns = []
+        for _ in range(self.min_size):
+            with self._cond:
+                if self._size >= self.min_size:
+                    break
+                self._size += 1
+            conns.append(self._new_connection())
+        now = time.monotonic()
+        with self._cond:
+            self._idle.extend((conn, now) for conn in conns)
+            self._cond.notify_all()
+
+    def close(self):
+        """Cierra todas las conexiones ociosas y rechaza nuevos pedidos."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close_connection(conn)
+
+    # --- Checkout / devolución ---
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Presta una conexión del pool y la devuelve al salir del bloque."""
+        with span("db.checkout"):
+            conn = self.getconn()
+        try:
+            yield conn
+        except BaseException:
+            self.putconn(conn, discard=bool(conn.closed))
+            raise
+        self.putconn(conn)
+
+    def getconn(self):
+        """Obtiene una conexión sana, esperando hasta `checkout_timeout`."""
+        start = time.monotonic()
+        deadline = start + self.checkout_timeout
+        while True:
+            conn, idle_since = None, None
+            create = False
+            expired = []
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError("El pool de conexiones está cerrado.")
+                    expired.extend(self._pop_expired(time.monotonic()))
+                    if self._idle:
+                        conn, idle_since = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.metrics.timeouts += 1
+                        raise PoolTimeout(
+                            "No hay conexiones libres después de "
+                            f"{self.checkout_timeout}s (max={self.max_size})."
+                        )
+                    self._cond.wait(remaining)
+            for old in expired:
+                self._close_connection(old)
+
+            if create:
+                conn = self._new_connection()
+            elif not self._is_healthy(conn, idle_since):
+                self.metrics.health_check_failures += 1
+                self._discard(conn)
+                continue
+
+            self.metrics.record_wait(time.monotonic() - start)
+            return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Devuelve una conexión al pool (o la descarta si quedó inutilizable)."""
+        if not discard and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        if discard or conn.closed:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._closed:
+                closing = True
+                self._size -= 1
+            else:
+                closing = False
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if closing:
+            self._close_connection(conn)
+
+    def evict_idle(self) -> int:
+        """Cierra las conexiones ociosas vencidas. Devuelve cuántas cerró."""
+        with self._cond:
+            expired = self._pop_expired(time.monotonic())
+        for conn in expired:
+            self._close_connection(conn)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas acumuladas más el estado actual del pool."""
+        with self._cond:
+            size, idle = self._size, len(self._idle)
+        data = self.metrics.snapshot()
+        data.update(
+            size=size,
+            idle=idle,
+            in_use=size - idle,
+            min_size=self.min_size,
+            max_size=self.max_size,
+        )
+        return data
+
+    # --- Internos ---
+
+    def _pop_expired(self, now: float):
+        """Quita de la cola las conexiones ociosas vencidas (con el lock tomado)."""
+        expired = []
+        while (
+            self._idle
+            and self._size > self.min_size
+            and now - self._idle[0][1] > self.idle_timeout
+        ):
+            expired.append(self._idle.popleft()[0])
+            self._size -= 1
+        return expired
+
+    def _new_connection(self):
+        conn = None
+        try:
+            conn = self._connect()
+            if not self._setup_done:
+                with self._cond:
+                    run_setup = not self._setup_done
+                    self._setup_done = True
+                if run_setup:
+                    try:
+                        self._setup(conn)
+                    except Exception:
+                        with self._cond:
+                            self._setup_done = False
+                        raise
+            if self._configure:
+                self._configure(conn)
+        except Exception:
+            self.metrics.connect_failures += 1
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            if conn is not None:
+                conn.close()
+            raise
+        self.metrics.connections_created += 1
+        return conn
+
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error as e:
+            logger.warning("Conexión descartada por health check fallido: %s", e)
+            return False
+
+    def _discard(self, conn):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._close_connection(conn)
+
+    def _close_connection(self, conn):
+        self.metrics.connections_closed += 1
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+
+def create_connection(configs: Config):
+    """Abre una conexión nueva (fuera del pool) con los datos de `configs`."""
+    return psycopg2.connect(
+        dbname=configs.DB_NAME,
+        user=configs.DB_USER,
+        password=configs.DB_PASSWORD,
+        host=configs.DB_HOST,
+        port=configs.DB_PORT,
+    )
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Devuelve el pool del proceso, creándolo en el primer uso."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = ConnectionPool.from_config(Config())
+                pool.open()
+                _pool = pool
+    return _pool
+
+
+def close_pool():
+    """Cierra el pool del proceso (por ejemplo, al apagar el worker)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """Métricas del pool del proceso (vacías si todavía no se abrió)."""
+    return _pool.stats() if _pool is not None else {}
@@ -0,0 +1,110 @@
+"""Normalización de términos de búsqueda y nombres de producto.
+
+Reúne en tablas declarativas los sinónimos que antes estaban repartidos en
+cadenas de if/elif: abreviaturas de series de procesadores, variantes de
+escritura de sockets y alias de fabricantes. Las expresiones regulares se
+compilan una sola vez al importar el módulo y los resultados se memorizan, así
+que tanto el armado de consultas (`data_manager`) como el post-procesamiento de
+resultados pagan el costo una vez por término distinto.
+
+Para medir el costo por llamada:
+
+    python -m benchmarks.bench_normalization
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+# --- Tablas de sinónimos ---
+
+# Abreviatura (en minúsculas) -> términos a buscar en "Producto".
+SERIES_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "r3": ("ryzen 3", "r3"),
+    "r5": ("ryzen 5", "r5"),
+    "r7": ("ryzen 7", "r7"),
+    "r9": ("ryzen 9", "r9"),
+    "i3": ("core i3", "i3"),
+    "i5": ("core i5", "i5"),
+    "i7": ("core i7", "i7"),
+    "i9": ("core i9", "i9"),
+}
+
+# Sockets con nombre propio (en minúsculas) -> forma en que aparecen en el catálogo.
+SOCKET_ALIASES: Dict[str, str] = {
+    "am4": "AM4",
+    "am5": "AM5",
+    "tr4": "TR4",
+    "strx4": "sTRX4",
+}
+
+# Alias de fabricante (en minúsculas) -> términos a buscar en "Fabricante".
+MANUFACTURER_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "wd": ("western digital", "wd"),
+    "western digital": ("western digital", "wd"),
+    "hewlett packard": ("hp",),
+    "hewlett-packard": ("hp",),
+    "aorus": ("gigabyte", "aorus"),
+    "rog": ("asus", "rog"),
+}
+
+# Patrones de socket en un nombre de producto, en orden de prioridad: gana el
+# primer patrón que aparezca en cualquier parte del nombre, no la coincidencia
+# más a la izquierda.
+SOCKET_NAME_PATTERNS: Tuple[str, ...] = (
+    r"S\d{3,4}",  # S1200, S1700
+    r"AM\d",  # AM4, AM5
+    r"LGA\d{3,4}",  # LGA1700, LGA1200
+    r"\d{3,4}",  # 1700, 1200 (números de 3 o 4 dígitos)
+    r"TR\d",  # TR4
+    r"sTRX\d",  # sTRX4
+)
+
+# Compiladas una sola vez. Se prueban en orden con `search`: una única
+# alternación que respete la prioridad necesita `.*?` por rama y resulta más
+# lenta por el backtracking.
+_SOCKET_NAME_RES = tuple(
+    re.compile(pattern, re.IGNORECASE) for pattern in SOCKET_NAME_PATTERNS
+)
+
+# Socket Intel escrito con prefijo ("LGA1700", "S 1200") -> sólo el número, que
+# es lo que tienen en común todas las variantes del catálogo.
+_INTEL_SOCKET_RE = re.compile(r"^(?:LGA|S)?\s*(\d{3,4})$", re.IGNORECASE)
+
+_MEMO_SIZE = 4096
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def expand_series(term: str) -> Tuple[str, ...]:
+    """Términos de búsqueda de producto para `term` (ej.: "r5" -> "ryzen 5", "r5")."""
+    return SERIES_ALIASES.get(term.strip().lower(), (term,))
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def normalize_socket(socket_type: str) -> str:
+    """Forma canónica del socket pedido (ej.: "LGA1700" -> "1700", "am4" -> "AM4")."""
+    socket_type = socket_type.strip()
+    alias = SOCKET_ALIASES.get(socket_type.lower())
+    if alias is not None:
+        return alias
+    match = _INTEL_SOCKET_RE.match(socket_type)
+    return match.group(1) if match else socket_type
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def expand_manufacturer(fabricante: str) -> Tuple[str, ...]:
+    """Términos de búsqueda de fabricante para `fabricante`."""
+    return MANUFACTURER_ALIASES.get(fabricante.strip().lower(), (fabricante,))
+
+
+@lru_cache(maxsize=_MEMO_SIZE)
+def extract_socket(product_name: str) -> Optional[str]:
+    """
+    Extrae el tipo de socket de una cadena de nombre de producto.
+    Ejemplos: "S1200", "AM4", "AM5", "LGA1700", "1700", "1200", "1151", "1150", "2066", "TR4", "sTRX4"
+    """
+    for pattern in _SOCKET_NAME_RES:
+        match = pattern.search(product_name)
+        if match:
+            return match.group(0).upper()
+    return None
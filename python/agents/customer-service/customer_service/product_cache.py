@@ -0,0 +1,185 @@
+"""Cache en proceso de productos del catálogo, indexado por "Codigo".
+
+Las búsquedas por código (`add_item_to_quote`) y los resultados de
+`search_products` alimentan un cache LRU con TTL, así que los SKU populares no
+vuelven a consultar la base. Para que los precios nunca queden viejos después
+de una recarga, un hilo escucha el canal NOTIFY `catalogo_actualizado` (lo
+dispara el trigger instalado por `db_migrations`) y vacía el cache ante cada
+cambio. Mientras ese hilo no está conectado el cache no se usa: toda consulta
+va directo a la base.
+"""
+
+import logging
+import select
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import psycopg2
+
+from .config import Config
+from .db_migrations import CATALOG_CHANNEL
+from .db_pool import create_connection
+from .shared_libraries.cache import LRUTTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class ProductCache:
+    """Cache de productos por código que sólo responde mientras es confiable.
+
+    "Confiable" significa que hay un `CatalogChangeListener` conectado que
+    invalidará el cache si el catálogo cambia.
+    """
+
+    def __init__(self, max_size: int = 5000, ttl: Optional[float] = 600.0):
+        self._cache = LRUTTLCache(max_size, ttl)
+        self._trusted = threading.Event()
+
+    @property
+    def trusted(self) -> bool:
+        return self._trusted.is_set()
+
+    def set_trusted(self, trusted: bool):
+        if trusted:
+            self._trusted.set()
+        else:
+            self._trusted.clear()
+
+    def generation(self) -> int:
+        """Marca a tomar antes de leer de la base; ver `put`."""
+        return self._cache.generation
+
+    def get(self, code: str) -> Optional[Dict[str, Any]]:
+        """Devuelve una copia del producto cacheado, o None."""
+        if not self.trusted:
+            return None
+        product = self._cache.get(code)
+        return dict(product) if product is not None else None
+
+    def put(self, product: Dict[str, Any], generation: Optional[int] = None):
+        """Guarda una copia del producto.
+
+        Si se pasa `generation` y el cache se invalidó desde entonces, el
+        producto se descarta porque pudo haberse leído antes de la recarga.
+        """
+        if self.trusted and product.get("Codigo") is not None:
+            self._cache.set(product["Codigo"], dict(product), generation)
+
+    def put_many(
+        self, products: Iterable[Dict[str, Any]], generation: Optional[int] = None
+    ):
+        for product in products:
+            self.put(product, generation)
+
+    def invalidate_all(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        data = self._cache.stats()
+        data["trusted"] = self.trusted
+        return data
+
+
+class CatalogChangeListener(threading.Thread):
+    """Hilo que escucha `LISTEN catalogo_actualizado` y vacía el cache.
+
+    Usa una conexión dedicada (las conexiones del pool no pueden quedarse
+    escuchando). Si la conexión se cae, el cache deja de ser confiable y se
+    vacía hasta reconectar, porque podría haberse perdido un aviso.
+    """
+
+    def __init__(
+        self,
+        cache: ProductCache,
+        connect: Callable[[], Any],
+        channel: str = CATALOG_CHANNEL,
+        keepalive_secs: float = 30.0,
+        retry_delay_secs: float = 5.0,
+    ):
+        super().__init__(name="catalog-change-listener", daemon=True)
+        self._cache = cache
+        self._connect = connect
+        self.channel = channel
+        self.keepalive_secs = keepalive_secs
+        self.retry_delay_secs = retry_delay_secs
+        self._stop_event = threading.Event()
+        self.notifications = 0
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {self.channel};")
+                # Lo cacheado antes de escuchar pudo quedar viejo.
+                self._cache.invalidate_all()
+                self._cache.set_trusted(True)
+                self._listen(conn)
+            except (psycopg2.Error, OSError) as e:
+                logger.warning("Listener del catálogo desconectado: %s", e)
+            finally:
+                self._cache.set_trusted(False)
+                self._cache.invalidate_all()
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except psycopg2.Error:
+                        pass
+            self._stop_event.wait(self.retry_delay_secs)
+
+    def _listen(self, conn):
+        while not self._stop_event.is_set():
+            readable, _, _ = select.select([conn], [], [], self.keepalive_secs)
+            if not readable:
+                # Sin avisos: verificar que la conexión siga viva.
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1;")
+                continue
+            conn.poll()
+            if conn.notifies:
+                self.notifications += len(conn.notifies)
+                logger.info(
+                    "Catálogo actualizado (%s); vaciando cache de productos.",
+                    conn.notifies[-1].payload,
+                )
+                conn.notifies.clear()
+                self._cache.invalidate_all()
+
+
+_product_cache: Optional[ProductCache] = None
+_listener: Optional[CatalogChangeListener] = None
+_cache_lock = threading.Lock()
+
+
+def get_product_cache() -> ProductCache:
+    """Devuelve el cache del proceso y arranca su listener en el primer uso.
+
+    Con `PRODUCT_CACHE_ENABLED=false` el cache nunca se vuelve confiable, así
+    que todas las consultas van a la base.
+    """
+    global _product_cache, _listener
+    if _product_cache is None:
+        with _cache_lock:
+            if _product_cache is None:
+                configs = Config()
+                cache = ProductCache(
+                    max_size=configs.PRODUCT_CACHE_MAX_SIZE,
+                    ttl=configs.PRODUCT_CACHE_TTL_SECS,
+                )
+                if configs.PRODUCT_CACHE_ENABLED:
+                    _listener = CatalogChangeListener(
+                        cache, lambda: create_connection(configs)
+                    )
+                    _listener.start()
+                _product_cache = cache
+    return _product_cache
+
+
+def get_product_cache_stats() -> Dict[str, Any]:
+    """Métricas del cache de productos (vacías si todavía no se usó)."""
+    return _product_cache.stats() if _product_cache is not None else {}
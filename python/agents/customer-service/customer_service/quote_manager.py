@@ -1,38 +1,74 @@
-from typing import List, Dict, Any, Optional
+from typing import Any, Dict, Iterable, MutableMapping, Optional, Tuple
 
 class QuoteManager:
     """
     Gestiona la creación y manipulación de un presupuesto o cotización.
+
+    El presupuesto se guarda en `state` (en las herramientas, el `state` de la
+    sesión de ADK) bajo la clave `presupuesto`, como un dict serializable a
+    JSON: cada conversación tiene su propio presupuesto y éste se persiste con
+    la sesión, así que sobrevive a un reinicio del worker. Los ítems están
+    indexados por "Codigo" y el total se mantiene en centavos al agregar o
+    quitar productos, sin recorrer el presupuesto.
     """
-    def __init__(self):
-        self.items: List[Dict[str, Any]] = []
+    STATE_KEY = "presupuesto"
+
+    def __init__(self, state: Optional[MutableMapping[str, Any]] = None, key: str = STATE_KEY):
+        self._state = state if state is not None else {}
+        self._key = key
+
+    def _load(self) -> Dict[str, Any]:
+        data = self._state.get(self._key)
+        if not data:
+            return {'items': {}, 'total_centavos': 0}
+        # Copia: los cambios sólo se registran en la sesión al reasignar la clave.
+        return {'items': dict(data['items']), 'total_centavos': data['total_centavos']}
+
+    def _save(self, data: Dict[str, Any]):
+        self._state[self._key] = data
+
+    @staticmethod
+    def _price_cents(product: Dict[str, Any]) -> int:
+        return round((product.get('Precio Final U$D') or 0) * 100)
 
     def add_item(self, product: Dict[str, Any], quantity: int):
-        """Añade un producto al presupuesto."""
-        # Verificar si el producto ya está en el presupuesto para actualizar la cantidad
-        for item in self.items:
-            if item['product']['Codigo'] == product['Codigo']:
-                item['quantity'] += quantity
-                return
+        """Añade un producto al presupuesto (si ya estaba, suma la cantidad)."""
+        self.add_items([(product, quantity)])
 
-        self.items.append({'product': product, 'quantity': quantity})
+    def add_items(self, entries: Iterable[Tuple[Dict[str, Any], int]]):
+        """Añade varios (producto, cantidad) leyendo y guardando el presupuesto una sola vez."""
+        data = self._load()
+        for product, quantity in entries:
+            code = product['Codigo']
+            item = data['items'].get(code)
+            if item is None:
+                item = {'product': product, 'quantity': quantity}
+            else:
+                item = {'product': item['product'], 'quantity': item['quantity'] + quantity}
+            data['items'][code] = item
+            data['total_centavos'] += self._price_cents(item['product']) * quantity
+        self._save(data)
 
     def remove_item(self, product_code: str):
         """Elimina un producto del presupuesto por su código."""
-        self.items = [item for item in self.items if item['product']['Codigo'] != product_code]
+        data = self._load()
+        item = data['items'].pop(product_code, None)
+        if item is None:
+            return
+        data['total_centavos'] -= self._price_cents(item['product']) * item['quantity']
+        self._save(data)
 
     def get_quote(self) -> Dict[str, Any]:
         """Devuelve el presupuesto actual con un resumen y el total."""
-        if not self.items:
+        data = self._load()
+        if not data['items']:
             return {'items': [], 'total': 0.0, 'message': "El presupuesto está vacío."}
 
-        total_price = sum(item['product']['Precio Final U$D'] * item['quantity'] for item in self.items)
-
         return {
-            'items': self.items,
-            'total': round(total_price, 2)
+            'items': list(data['items'].values()),
+            'total': round(data['total_centavos'] / 100, 2)
         }
 
     def clear_quote(self):
         """Limpia el presupuesto."""
-        self.items = []
+        self._save({'items': {}, 'total_centavos': 0})
@@ -0,0 +1,120 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Thread-safe in-process LRU cache with per-entry TTL."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class LRUTTLCache:
+    """A bounded LRU cache whose entries also expire after `ttl` seconds.
+
+    Args:
+      max_size: Maximum number of entries. The least recently used entry is
+        evicted when a new key would exceed it.
+      ttl: Seconds an entry stays valid after it was stored. `None` disables
+        expiration.
+      clock: Monotonic clock, injectable for tests.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def generation(self) -> int:
+        """Incremented by `clear()`; see `set()`."""
+        return self._generation
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(
+        self, key: Hashable, value: Any, generation: Optional[int] = None
+    ) -> bool:
+        """Stores `value` under `key`.
+
+        If `generation` is given and the cache was cleared since it was read,
+        the value is dropped: it may have been loaded before the invalidation.
+
+        Returns:
+          True if the value was stored.
+        """
+        expires_at = (
+            self._clock() + self.ttl if self.ttl is not None else float("inf")
+        )
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def pop(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[1] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "generation": self._generation,
+        }
@@ -15,30 +15,62 @@
 """Callback functions for FOMC Research Agent."""
 
 import logging
-import time
 
 from google.adk.agents.callback_context import CallbackContext
-from google.adk.models import LlmRequest
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
 from typing import Any, Dict, Optional, Tuple
 from google.adk.tools import BaseTool
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.sessions.state import State
 from google.adk.tools.tool_context import ToolContext
 from jsonschema import ValidationError
+from customer_service.config import Config
+from customer_service.conversation_log import get_conversation_logger
 from customer_service.entities.customer import Customer
+from customer_service.tracing import set_trace_id
+from .rate_limiter import RateLimitExceeded, acquire_all, get_token_bucket
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+configs = Config()
+
 RATE_LIMIT_SECS = 60
-RPM_QUOTA = 10
+RATE_LIMITED_MESSAGE = (
+    "Estoy atendiendo muchas consultas en este momento. "
+    "Por favor, intentá de nuevo en unos segundos."
+)
+
+
+def _rate_limit_buckets(model: Optional[str]):
+    """Buckets compartidos por todas las sesiones: uno por modelo y uno por proyecto."""
+    model_rpm = configs.LLM_RPM_PER_MODEL
+    project_rpm = configs.LLM_RPM_PER_PROJECT
+    return (
+        get_token_bucket(
+            f"model:{model or configs.agent_settings.model}",
+            rate=model_rpm / RATE_LIMIT_SECS,
+            capacity=model_rpm,
+        ),
+        get_token_bucket(
+            f"project:{configs.CLOUD_PROJECT}",
+            rate=project_rpm / RATE_LIMIT_SECS,
+            capacity=project_rpm,
+        ),
+    )
 
 
-def rate_limit_callback(
+async def rate_limit_callback(
     callback_context: CallbackContext, llm_request: LlmRequest
-) -> None:
+) -> Optional[LlmResponse]:
     """Callback function that implements a query rate limit.
 
+    The quota is shared by every session in the process: the callback waits
+    (without blocking the event loop) for a token of the model and project
+    buckets, and answers with a "busy" message instead of calling the model
+    if the wait would exceed `LLM_RATE_LIMIT_MAX_WAIT_SECS`.
+
     Args:
       callback_context: A CallbackContext obj representing the active callback
         context.
@@ -49,42 +81,66 @@ def rate_limit_callback(
             if part.text=="":
                 part.text=" "
 
-    
-    
+    try:
+        waited = await acquire_all(
+            _rate_limit_buckets(llm_request.model),
+            max_wait=configs.LLM_RATE_LIMIT_MAX_WAIT_SECS,
+        )
+    except RateLimitExceeded as e:
+        logger.warning("rate_limit_callback: %s", e)
+        return LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=RATE_LIMITED_MESSAGE)])
+        )
+    if waited > 0:
+        logger.debug("rate_limit_callback waited %.2f seconds", waited)
+    return None
 
-    now = time.time()
-    if "timer_start" not in callback_context.state:
+def _content_text(content: Optional[types.Content]) -> str:
+    if content is None or not content.parts:
+        return ""
+    return "".join(part.text for part in content.parts if part.text and not part.thought)
 
-        callback_context.state["timer_start"] = now
-        callback_context.state["request_count"] = 1
-        logger.debug(
-            "rate_limit_callback [timestamp: %i, "
-            "req_count: 1, elapsed_secs: 0]",
-            now,
-        )
-        return
-
-    request_count = callback_context.state["request_count"] + 1
-    elapsed_secs = now - callback_context.state["timer_start"]
-    logger.debug(
-        "rate_limit_callback [timestamp: %i, request_count: %i,"
-        " elapsed_secs: %i]",
-        now,
-        request_count,
-        elapsed_secs,
-    )
 
-    if request_count > RPM_QUOTA:
-        delay = RATE_LIMIT_SECS - elapsed_secs + 1
-        if delay > 0:
-            logger.debug("Sleeping for %i seconds", delay)
-            time.sleep(delay)
-        callback_context.state["timer_start"] = now
-        callback_context.state["request_count"] = 1
-    else:
-        callback_context.state["request_count"] = request_count
+def _usuario_id(callback_context: CallbackContext) -> Optional[int]:
+    """`usuarios.id` of the session: the `usuario_id` state key or a numeric user id."""
+    usuario_id = callback_context.state.get("usuario_id")
+    if usuario_id is None and callback_context.user_id.isdigit():
+        usuario_id = callback_context.user_id
+    try:
+        return int(usuario_id) if usuario_id is not None else None
+    except (TypeError, ValueError):
+        return None
 
-    return
+
+def log_conversation_callback(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    """Callback that stores each final answer in `historial_conversaciones`.
+
+    Only final text answers are recorded (not tool calls or streaming chunks),
+    together with the user message that started the turn. The turn is queued
+    in memory and written in batches by a background thread, so the response
+    is never delayed by the database. Sessions without a `usuarios` row (no
+    `usuario_id` in the state and a non-numeric user id) are not recorded.
+
+    Args:
+      callback_context: A CallbackContext obj representing the active callback
+        context.
+      llm_response: A LlmResponse obj with the model answer.
+    """
+    if not configs.CONVERSATION_LOG_ENABLED or llm_response.partial:
+        return None
+    content = llm_response.content
+    if content is None or any(part.function_call for part in content.parts or []):
+        return None
+    respuesta = _content_text(content)
+    usuario_id = _usuario_id(callback_context)
+    if not respuesta.strip() or usuario_id is None:
+        return None
+    get_conversation_logger().record(
+        usuario_id, _content_text(callback_context.user_content), respuesta
+    )
+    return None
 
 def validate_customer_id(customer_id: str, session_state: State) -> Tuple[bool, str]:
     """
@@ -181,6 +237,9 @@ def after_tool(
 
 # checking that the customer profile is loaded as state.
 def before_agent(callback_context: InvocationContext):
+    # The spans of this turn (tools, SQL) belong to the session's trace.
+    set_trace_id(callback_context._invocation_context.session.id)
+
     # In a production agent, this is set as part of the
     # session creation for the agent. 
     if "customer_profile" not in callback_context.state:
@@ -0,0 +1,214 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Token-bucket rate limiting for asyncio code.
+
+Buckets are plain counters guarded by a `threading.Lock` that is never held
+across an `await`, so a single bucket can be shared by every session (and
+every event loop) in the process. Callers reserve their tokens on arrival and
+then sleep until the reservation is due, which serves them in arrival order
+without blocking the event loop.
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a caller would have to wait longer than it allowed."""
+
+    def __init__(self, key: str, retry_after: float):
+        super().__init__(f"rate limit for {key!r} exceeded, retry after {retry_after:.1f}s")
+        self.key = key
+        self.retry_after = retry_after
+
+
+@dataclass
+class RateLimiterMetrics:
+    acquired: int = 0
+    rejected: int = 0
+    delayed: int = 0
+    waiting: int = 0
+    total_wait_secs: float = 0.0
+    max_wait_secs: float = 0.0
+
+
+class AsyncTokenBucket:
+    """Token bucket that paces callers instead of rejecting them.
+
+    Tokens refill continuously at `rate` per second up to `capacity`, so a
+    quota such as "90 searches per hour" is expressed as
+    `AsyncTokenBucket(rate=90 / 3600, capacity=90)`: bursts are allowed up to
+    the quota and callers are then spread out evenly, rather than pausing for
+    the whole window once the quota is spent.
+
+    Waiters are served in arrival order. A caller that passes `max_wait` is
+    rejected with `RateLimitExceeded` (and takes no tokens) if its turn would
+    come later than that.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        key: str = "",
+    ):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self.key = key
+        self.metrics = RateLimiterMetrics()
+        self._clock = clock
+        self._sleep = sleep
+        # May go negative: the deficit is owed to callers already queued.
+        self._tokens = capacity
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate
+        )
+        self._updated_at = now
+
+    def _reserve(self, tokens: float, max_wait: Optional[float]) -> float:
+        """Takes `tokens` (possibly on credit); returns when they are due."""
+        if tokens > self.capacity:
+            raise ValueError("cannot acquire more tokens than the bucket capacity")
+        with self._lock:
+            self._refill()
+            delay = max(0.0, (tokens - self._tokens) / self.rate)
+            if max_wait is not None and delay > max_wait:
+                self.metrics.rejected += 1
+                raise RateLimitExceeded(self.key, delay)
+            self._tokens -= tokens
+            self.metrics.acquired += 1
+            if delay > 0:
+                self.metrics.delayed += 1
+                self.metrics.total_wait_secs += delay
+                self.metrics.max_wait_secs = max(self.metrics.max_wait_secs, delay)
+            return self._updated_at + delay
+
+    def _refund(self, tokens: float):
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    async def _wait_until(self, ready_at: float):
+        remaining = ready_at - self._clock()
+        if remaining <= 0:
+            return
+        self.metrics.waiting += 1
+        try:
+            while remaining > 0:
+                await self._sleep(remaining)
+                remaining = ready_at - self._clock()
+        finally:
+            self.metrics.waiting -= 1
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Takes `tokens` if they are available right now, without waiting."""
+        try:
+            self._reserve(tokens, max_wait=0.0)
+        except RateLimitExceeded:
+            return False
+        return True
+
+    async def acquire(self, tokens: float = 1.0, max_wait: Optional[float] = None) -> float:
+        """Waits until `tokens` are available and takes them.
+
+        Returns:
+          The number of seconds spent waiting.
+
+        Raises:
+          RateLimitExceeded: The wait would be longer than `max_wait`.
+        """
+        start = self._clock()
+        ready_at = self._reserve(tokens, max_wait)
+        try:
+            await self._wait_until(ready_at)
+        except asyncio.CancelledError:
+            # The caller gave up: its place in the queue goes to the next one.
+            self._refund(tokens)
+            raise
+        return ready_at - start
+
+    def stats(self) -> Dict[str, float]:
+        return {**asdict(self.metrics), "tokens": self.tokens}
+
+
+async def acquire_all(
+    buckets: Iterable[AsyncTokenBucket], tokens: float = 1.0, max_wait: Optional[float] = None
+) -> float:
+    """Takes `tokens` from every bucket, waiting until all of them are due.
+
+    Either all buckets are charged or none is: if one of them would exceed
+    `max_wait`, the tokens already reserved in the others are given back.
+
+    Returns:
+      The number of seconds spent waiting.
+    """
+    reserved: List[Tuple[AsyncTokenBucket, float]] = []
+    try:
+        for bucket in buckets:
+            reserved.append((bucket, bucket._reserve(tokens, max_wait)))
+    except RateLimitExceeded:
+        for bucket, _ in reserved:
+            bucket._refund(tokens)
+        raise
+
+    waited = 0.0
+    try:
+        for bucket, ready_at in reserved:
+            start = bucket._clock()
+            await bucket._wait_until(ready_at)
+            waited += max(0.0, bucket._clock() - start)
+    except asyncio.CancelledError:
+        for bucket, _ in reserved:
+            bucket._refund(tokens)
+        raise
+    return waited
+
+
+_buckets: Dict[str, AsyncTokenBucket] = {}
+_buckets_lock = threading.Lock()
+
+
+def get_token_bucket(key: str, rate: float, capacity: float) -> AsyncTokenBucket:
+    """Returns the process-wide bucket for `key`, creating it on first use."""
+    with _buckets_lock:
+        bucket = _buckets.get(key)
+        if bucket is None:
+            bucket = _buckets[key] = AsyncTokenBucket(rate, capacity, key=key)
+        return bucket
+
+
+def get_rate_limiter_metrics() -> Dict[str, Dict[str, float]]:
+    """Wait time, rejections and available tokens of every shared bucket."""
+    with _buckets_lock:
+        buckets = list(_buckets.values())
+    return {bucket.key: bucket.stats() for bucket in buckets}
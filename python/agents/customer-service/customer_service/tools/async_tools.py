@@ -0,0 +1,205 @@
+"""
+Versiones asíncronas de las herramientas que consultan la base de datos.
+
+Tienen el mismo nombre, parámetros y docstring que las de `tools.py` (el modelo
+las ve igual), pero usan `async_data_manager` para no bloquear el event loop del
+runner mientras esperan a PostgreSQL o al RAG de datasheets. Las herramientas
+del presupuesto que no consultan la base se reutilizan tal cual.
+"""
+import asyncio
+import logging
+from typing import List, Dict, Any, Optional
+from customer_service.async_data_manager import (
+    search_products_with_fallback_async,
+    get_product_by_code_async,
+    get_products_by_codes_async,
+)
+from customer_service.datasheet_rag import get_datasheet_retriever
+from customer_service.tracing import traced_tool
+from google.adk.tools import ToolContext
+from customer_service.tools.tools import (
+    DEFAULT_SPEC_QUERY,
+    _add_found_items,
+    _attach_specs,
+    _format_rag_snippets,
+    _format_search_results,
+    _parse_quote_items,
+    _quote_manager,
+    _spec_part_numbers,
+    configs,
+    view_quote,
+    remove_item_from_quote,
+    clear_quote,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@traced_tool
+async def search_products(
+    categoria: Optional[str] = None,
+    fabricante: Optional[str] = None,
+    producto: Optional[str] = None,
+    precio_max_usd: Optional[float] = None,
+    precio_min_usd: Optional[float] = None,
+    codigo: Optional[str] = None,
+    nro_de_parte: Optional[str] = None,
+    socket_type: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Busca productos en la base de datos basándose en los criterios proporcionados.
+
+    Esta función delega la búsqueda a la base de datos, utilizando los parámetros
+    para construir una consulta SQL.
+
+    Args:
+        categoria (Optional[str]): La categoría del producto a buscar.
+        fabricante (Optional[str]): El fabricante del producto a buscar.
+        producto (Optional[str]): Un término de búsqueda para encontrar en el nombre del producto.
+                                  Permite búsquedas parciales.
+        precio_max_usd (Optional[float]): El precio máximo permitido para el producto en USD.
+        precio_min_usd (Optional[float]): El precio mínimo permitido para el producto en USD.
+        codigo (Optional[str]): El código de producto a buscar.
+
+    Returns:
+        List[Dict[str, Any]]: Una lista de diccionarios, donde cada diccionario representa
+                              un producto que coincide con los criterios de búsqueda.
+                              Retorna un mensaje si no se encuentran productos.
+    """
+    products, is_fallback = await search_products_with_fallback_async(
+        categoria=categoria,
+        fabricante=fabricante,
+        producto=producto,
+        precio_max_usd=precio_max_usd,
+        precio_min_usd=precio_min_usd,
+        codigo=codigo,
+        nro_de_parte=nro_de_parte,
+        socket_type=socket_type,
+    )
+
+    return _format_search_results(products, is_fallback, categoria)
+
+
+@traced_tool
+async def add_item_to_quote(product_code: str, quantity: int = 1, *, tool_context: ToolContext) -> Dict[str, Any]:
+    """Añade un producto al presupuesto por su código y la cantidad deseada. Devuelve el presupuesto actualizado."""
+    product = await get_product_by_code_async(product_code)
+    if not product:
+        return {"error": f"Producto con código {product_code} no encontrado."}
+
+    quote_manager = _quote_manager(tool_context)
+    quote_manager.add_item(product, quantity)
+    return quote_manager.get_quote()
+
+
+
+@traced_tool
+async def add_items_to_quote(items: List[Dict[str, Any]], *, tool_context: ToolContext) -> Dict[str, Any]:
+    """
+    Añade varios productos al presupuesto en una sola llamada (por ejemplo, todos
+    los componentes confirmados de una PC armada).
+
+    Args:
+        items (List[Dict[str, Any]]): Los productos a agregar, cada uno con
+            `product_code` (str) y opcionalmente `quantity` (int, por defecto 1).
+
+    Returns:
+        Dict[str, Any]: El presupuesto actualizado. Si algún ítem no se pudo agregar
+                        (código inexistente o cantidad inválida), se detalla en `errores`
+                        y el resto se agrega igual.
+    """
+    requested, errors = _parse_quote_items(items)
+    products = await get_products_by_codes_async([code for code, _ in requested]) if requested else {}
+    return _add_found_items(tool_context, requested, products, errors)
+
+
+@traced_tool
+async def query_datasheet_rag(query: str) -> List[str]:
+    """
+    Consulta el Datastore de Vertex AI Search (RAG) para obtener información
+    relevante de los datasheets indexados.
+
+    Args:
+        query (str): La pregunta o término de búsqueda para el RAG.
+
+    Returns:
+        List[str]: Una lista de fragmentos de texto relevantes encontrados en los datasheets.
+                   Retorna un mensaje si no se encuentra información.
+    """
+    try:
+        return _format_rag_snippets(await get_datasheet_retriever().search_async(query))
+    except Exception as e:
+        logger.error(f"Error al consultar el RAG: {e}")
+        return [f"Error al consultar la base de datos de datasheets: {e}"]
+
+
+async def _fetch_specs(part_numbers: List[str], spec_query: str) -> Dict[str, Optional[List[str]]]:
+    """Versión async de `tools._fetch_specs`."""
+    retriever = get_datasheet_retriever()
+    results = await asyncio.gather(
+        *(
+            retriever.search_part_async(part_number, spec_query, configs.DATASHEET_SPECS_PER_PRODUCT)
+            for part_number in part_numbers
+        ),
+        return_exceptions=True,
+    )
+    specs = {}
+    for part_number, result in zip(part_numbers, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error al consultar el datasheet de {part_number}: {result}")
+            result = None
+        specs[part_number] = result
+    return specs
+
+
+@traced_tool
+async def search_products_with_specs(
+    categoria: Optional[str] = None,
+    fabricante: Optional[str] = None,
+    producto: Optional[str] = None,
+    precio_max_usd: Optional[float] = None,
+    precio_min_usd: Optional[float] = None,
+    codigo: Optional[str] = None,
+    nro_de_parte: Optional[str] = None,
+    socket_type: Optional[str] = None,
+    spec_query: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Busca productos como `search_products` y agrega a cada uno de los primeros
+    resultados las especificaciones técnicas de su datasheet, en una sola llamada.
+
+    Úsala cuando el usuario pregunte por características técnicas (consumo, socket,
+    dimensiones, compatibilidad, etc.) de los productos que está buscando, en lugar
+    de buscar los productos y consultar los datasheets por separado.
+
+    Args:
+        categoria (Optional[str]): La categoría del producto a buscar.
+        fabricante (Optional[str]): El fabricante del producto a buscar.
+        producto (Optional[str]): Un término de búsqueda para encontrar en el nombre del producto.
+        precio_max_usd (Optional[float]): El precio máximo permitido para el producto en USD.
+        precio_min_usd (Optional[float]): El precio mínimo permitido para el producto en USD.
+        codigo (Optional[str]): El código de producto a buscar.
+        nro_de_parte (Optional[str]): El número de parte del producto a buscar.
+        socket_type (Optional[str]): El socket para filtrar procesadores y placas madre.
+        spec_query (Optional[str]): Qué buscar en cada datasheet (ej. "TDP", "dimensiones").
+                                    Si se omite, se traen las especificaciones principales.
+
+    Returns:
+        List[Dict[str, Any]]: Los productos encontrados; los primeros incluyen una lista
+                              "Especificaciones" con fragmentos de su datasheet.
+    """
+    products, is_fallback = await search_products_with_fallback_async(
+        categoria=categoria,
+        fabricante=fabricante,
+        producto=producto,
+        precio_max_usd=precio_max_usd,
+        precio_min_usd=precio_min_usd,
+        codigo=codigo,
+        nro_de_parte=nro_de_parte,
+        socket_type=socket_type,
+    )
+    products = _format_search_results(products, is_fallback, categoria)
+    if is_fallback:
+        return products
+    specs = await _fetch_specs(_spec_part_numbers(products), spec_query or DEFAULT_SPEC_QUERY)
+    return _attach_specs(products, specs)
@@ -1,22 +1,27 @@
+import contextvars
 import logging
-import os
-from typing import List, Dict, Any, Optional
-from customer_service.data_manager import search_products_from_db, get_product_by_code_from_db, _extract_socket_from_product_name
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+from customer_service.config import Config
+from customer_service.data_manager import search_products_with_fallback_from_db, get_product_by_code_from_db, get_products_by_codes_from_db, _extract_socket_from_product_name
+from customer_service.datasheet_rag import get_datasheet_retriever
 from customer_service.quote_manager import QuoteManager
+from customer_service.tracing import traced_tool
+from google.adk.tools import ToolContext
 
 logger = logging.getLogger(__name__)
 
-# Instancia del gestor de presupuestos
-quote_manager = QuoteManager()
+configs = Config()
 
-# Load environment variables for Google Cloud Project and Location
-PROJECT_ID = os.environ.get("GOOGLE_CLOUD_PROJECT")
-LOCATION = os.environ.get("GOOGLE_CLOUD_LOCATION")
-DATA_STORE_ID = "bottech_datasheets_rag" # Your RAG Datastore ID
+# Pregunta por defecto al buscar en el datasheet de cada producto.
+DEFAULT_SPEC_QUERY = "key specifications features"
+NO_DATASHEET_MESSAGE = "No hay datasheet disponible para este producto."
+SPECS_ERROR_MESSAGE = "No se pudieron obtener las especificaciones del datasheet."
 
 def _normalize_stock_status(stock_value: int) -> str:
     """
-    Normaliza el valor numérico del stock a un estado legible.
+    Normaliza el valor numérico del stock (entero, ver `db_migrations.STOCK_UNIDADES`)
+    a un estado legible.
     """
     if stock_value == 0:
         return "Sin stock"
@@ -25,6 +30,36 @@ def _normalize_stock_status(stock_value: int) -> str:
     else:
         return f"En stock ({stock_value} unidades)"
 
+def _format_search_results(
+    products: List[Dict[str, Any]], is_fallback: bool, categoria: Optional[str]
+) -> List[Dict[str, Any]]:
+    """
+    Prepara el resultado de la búsqueda para el modelo: si vino de la búsqueda
+    flexible devuelve la sugerencia más parecida, si no normaliza el stock.
+    """
+    if not products:
+        return []
+
+    if is_fallback:
+        # No hubo coincidencias con la búsqueda inicial; los resultados vienen de la
+        # búsqueda más flexible dentro de la misma categoría.
+        # Tomar el primer producto como la sugerencia más parecida dentro de la categoría
+        suggested_product = products[0]
+        suggested_name = suggested_product.get("Producto", "")
+        suggested_part_number = suggested_product.get("Nro. de Parte", "")
+        return [{
+            "message": f"No encontré una coincidencia exacta con el producto o número de parte que buscas. "
+                       f"Pero el más parecido que encontré en la categoría {categoria} es: {suggested_name} (Nro. de Parte: {suggested_part_number}). "
+                       f"¿Deseas consultar sobre este producto?"
+        }]
+
+    # Copias: los productos también están en el cache, con el stock como entero.
+    return [
+        dict(product, Stock=_normalize_stock_status(product["Stock"])) if "Stock" in product else product
+        for product in products
+    ]
+
+@traced_tool
 def search_products(
     categoria: Optional[str] = None,
     fabricante: Optional[str] = None,
@@ -55,7 +90,7 @@ def search_products(
                               un producto que coincide con los criterios de búsqueda.
                               Retorna un mensaje si no se encuentran productos.
     """
-    products = search_products_from_db(
+    products, is_fallback = search_products_with_fallback_from_db(
         categoria=categoria,
         fabricante=fabricante,
         producto=producto,
@@ -65,35 +100,15 @@ def search_products(
         nro_de_parte=nro_de_parte,
         socket_type=socket_type # Pasar el nuevo parámetro
     )
-    
-    if not products:
-        # Si no se encontraron productos con la búsqueda inicial, intentar una búsqueda más flexible
-        # dentro de la misma categoría.
-        flexible_products = []
-        if producto: # Si se proporcionó un nombre de producto, buscarlo en nro_de_parte dentro de la categoría
-            flexible_products = search_products_from_db(categoria=categoria, nro_de_parte=producto)
-        elif nro_de_parte: # Si se proporcionó un nro_de_parte, buscarlo en producto dentro de la categoría
-            flexible_products = search_products_from_db(categoria=categoria, producto=nro_de_parte)
-
-        if flexible_products:
-            # Tomar el primer producto como la sugerencia más parecida dentro de la categoría
-            suggested_product = flexible_products[0]
-            suggested_name = suggested_product.get("Producto", "")
-            suggested_part_number = suggested_product.get("Nro. de Parte", "")
-            return [{
-                "message": f"No encontré una coincidencia exacta con el producto o número de parte que buscas. "
-                           f"Pero el más parecido que encontré en la categoría {categoria} es: {suggested_name} (Nro. de Parte: {suggested_part_number}). "
-                           f"¿Deseas consultar sobre este producto?"
-            }]
-        else:
-            return []
-    
-    for product in products:
-        if "Stock" in product:
-            product["Stock"] = _normalize_stock_status(product["Stock"])
-    
-    return products
 
+    return _format_search_results(products, is_fallback, categoria)
+
+def _format_rag_snippets(snippets: List[str]) -> List[str]:
+    if snippets:
+        return snippets
+    return ["No se encontró información relevante en los datasheets para su consulta."]
+
+@traced_tool
 def query_datasheet_rag(query: str) -> List[str]:
     """
     Consulta el Datastore de Vertex AI Search (RAG) para obtener información
@@ -106,75 +121,203 @@ def query_datasheet_rag(query: str) -> List[str]:
         List[str]: Una lista de fragmentos de texto relevantes encontrados en los datasheets.
                    Retorna un mensaje si no se encuentra información.
     """
-    if not PROJECT_ID or not LOCATION or not DATA_STORE_ID:
-        logger.error("Google Cloud Project ID, Location, or Data Store ID not set for RAG query.")
-        return ["Error: Configuración de RAG incompleta."]
-
     try:
-        client = discoveryengine.SearchServiceClient()
-        serving_config = client.serving_config_path(
-            project=PROJECT_ID,
-            location=LOCATION,
-            data_store=DATA_STORE_ID,
-            serving_config="default"
-        )
-
-        request = discoveryengine.SearchRequest(
-            serving_config=serving_config,
-            query=query,
-            page_size=5, # Limita el número de resultados para evitar respuestas muy largas
-            query_expansion_spec=discoveryengine.SearchRequest.QueryExpansionSpec(
-                mode=discoveryengine.SearchRequest.QueryExpansionSpec.Mode.AUTO
-            ),
-            content_search_spec=discoveryengine.SearchRequest.ContentSearchSpec(
-                snippet_spec=discoveryengine.SearchRequest.ContentSearchSpec.SnippetSpec(
-                    return_snippets=True
-                )
-            )
-        )
-
-        response = client.search(request)
-        
-        relevant_snippets = []
-        for result in response.results:
-            if result.snippet and result.snippet.snippet: # Asegura que el snippet no esté vacío
-                relevant_snippets.append(result.snippet.snippet)
-            elif result.document and result.document.derived_struct_data and 'extractive_answers' in result.document.derived_struct_data:
-                # Fallback for extractive answers if direct snippets are not ideal
-                for answer in result.document.derived_struct_data['extractive_answers']:
-                    if 'content' in answer:
-                        relevant_snippets.append(answer['content'])
-
-        if relevant_snippets:
-            return relevant_snippets
-        else:
-            return ["No se encontró información relevante en los datasheets para su consulta."]
-
+        return _format_rag_snippets(get_datasheet_retriever().search(query))
     except Exception as e:
         logger.error(f"Error al consultar el RAG: {e}")
         return [f"Error al consultar la base de datos de datasheets: {e}"]
 
+def _spec_part_numbers(products: List[Dict[str, Any]]) -> List[str]:
+    """Nros. de parte (sin repetir) de los primeros productos, que son los que se enriquecen."""
+    part_numbers = []
+    for product in products[:configs.DATASHEET_SPECS_MAX_PRODUCTS]:
+        part_number = (product.get("Nro. de Parte") or "").strip()
+        if part_number and part_number not in part_numbers:
+            part_numbers.append(part_number)
+    return part_numbers
+
+def _attach_specs(
+    products: List[Dict[str, Any]], specs: Dict[str, Optional[List[str]]]
+) -> List[Dict[str, Any]]:
+    """
+    Agrega "Especificaciones" a los productos con datasheet consultado. Devuelve
+    copias: los productos pueden venir del cache y no deben quedar modificados.
+    """
+    enriched = []
+    for product in products:
+        part_number = (product.get("Nro. de Parte") or "").strip()
+        if part_number in specs:
+            snippets = specs[part_number]
+            if snippets is None:
+                snippets = [SPECS_ERROR_MESSAGE]
+            product = {**product, "Especificaciones": snippets or [NO_DATASHEET_MESSAGE]}
+        enriched.append(product)
+    return enriched
+
+def _fetch_specs(part_numbers: List[str], spec_query: str) -> Dict[str, Optional[List[str]]]:
+    """Busca en paralelo en el datasheet de cada nro. de parte (None si falló)."""
+    retriever = get_datasheet_retriever()
+
+    def fetch(part_number: str) -> Optional[List[str]]:
+        try:
+            return retriever.search_part(part_number, spec_query, configs.DATASHEET_SPECS_PER_PRODUCT)
+        except Exception as e:
+            logger.error(f"Error al consultar el datasheet de {part_number}: {e}")
+            return None
+
+    if not part_numbers:
+        return {}
+    with ThreadPoolExecutor(max_workers=len(part_numbers)) as pool:
+        # Cada hilo corre en una copia del contexto para que sus spans cuelguen de la herramienta.
+        futures = [
+            pool.submit(contextvars.copy_context().run, fetch, part_number)
+            for part_number in part_numbers
+        ]
+        return {part_number: future.result() for part_number, future in zip(part_numbers, futures)}
+
+@traced_tool
+def search_products_with_specs(
+    categoria: Optional[str] = None,
+    fabricante: Optional[str] = None,
+    producto: Optional[str] = None,
+    precio_max_usd: Optional[float] = None,
+    precio_min_usd: Optional[float] = None,
+    codigo: Optional[str] = None,
+    nro_de_parte: Optional[str] = None,
+    socket_type: Optional[str] = None,
+    spec_query: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Busca productos como `search_products` y agrega a cada uno de los primeros
+    resultados las especificaciones técnicas de su datasheet, en una sola llamada.
+
+    Úsala cuando el usuario pregunte por características técnicas (consumo, socket,
+    dimensiones, compatibilidad, etc.) de los productos que está buscando, en lugar
+    de buscar los productos y consultar los datasheets por separado.
+
+    Args:
+        categoria (Optional[str]): La categoría del producto a buscar.
+        fabricante (Optional[str]): El fabricante del producto a buscar.
+        producto (Optional[str]): Un término de búsqueda para encontrar en el nombre del producto.
+        precio_max_usd (Optional[float]): El precio máximo permitido para el producto en USD.
+        precio_min_usd (Optional[float]): El precio mínimo permitido para el producto en USD.
+        codigo (Optional[str]): El código de producto a buscar.
+        nro_de_parte (Optional[str]): El número de parte del producto a buscar.
+        socket_type (Optional[str]): El socket para filtrar procesadores y placas madre.
+        spec_query (Optional[str]): Qué buscar en cada datasheet (ej. "TDP", "dimensiones").
+                                    Si se omite, se traen las especificaciones principales.
+
+    Returns:
+        List[Dict[str, Any]]: Los productos encontrados; los primeros incluyen una lista
+                              "Especificaciones" con fragmentos de su datasheet.
+    """
+    products, is_fallback = search_products_with_fallback_from_db(
+        categoria=categoria,
+        fabricante=fabricante,
+        producto=producto,
+        precio_max_usd=precio_max_usd,
+        precio_min_usd=precio_min_usd,
+        codigo=codigo,
+        nro_de_parte=nro_de_parte,
+        socket_type=socket_type,
+    )
+    products = _format_search_results(products, is_fallback, categoria)
+    if is_fallback:
+        return products
+    specs = _fetch_specs(_spec_part_numbers(products), spec_query or DEFAULT_SPEC_QUERY)
+    return _attach_specs(products, specs)
+
 # --- Herramientas para la Gestión de Presupuestos ---
 
-def add_item_to_quote(product_code: str, quantity: int = 1) -> Dict[str, Any]:
+def _quote_manager(tool_context: ToolContext) -> QuoteManager:
+    """Gestor del presupuesto de la sesión actual (guardado en su `state`)."""
+    return QuoteManager(tool_context.state)
+
+@traced_tool
+def add_item_to_quote(product_code: str, quantity: int = 1, *, tool_context: ToolContext) -> Dict[str, Any]:
     """Añade un producto al presupuesto por su código y la cantidad deseada. Devuelve el presupuesto actualizado."""
     product = get_product_by_code_from_db(product_code)
     if not product:
         return {"error": f"Producto con código {product_code} no encontrado."}
     
+    quote_manager = _quote_manager(tool_context)
     quote_manager.add_item(product, quantity)
     return quote_manager.get_quote()
 
-def view_quote() -> Dict[str, Any]:
+def _parse_quote_items(items: List[Dict[str, Any]]) -> Tuple[List[Tuple[str, int]], List[str]]:
+    """Valida los ítems pedidos: devuelve los (código, cantidad) válidos y los errores."""
+    requested, errors = [], []
+    for item in items or []:
+        code = str(item.get("product_code") or "").strip() if isinstance(item, dict) else ""
+        if not code:
+            errors.append(f"Ítem sin código de producto: {item}.")
+            continue
+        quantity = item.get("quantity", 1)
+        if isinstance(quantity, float) and quantity.is_integer():
+            quantity = int(quantity)
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 1:
+            errors.append(f"Cantidad inválida para el producto {code}: {quantity}.")
+            continue
+        requested.append((code, quantity))
+    return requested, errors
+
+def _add_found_items(
+    tool_context: ToolContext,
+    requested: List[Tuple[str, int]],
+    products: Dict[str, Dict[str, Any]],
+    errors: List[str],
+) -> Dict[str, Any]:
+    """Agrega al presupuesto los productos encontrados y devuelve el presupuesto con los errores."""
+    entries = []
+    for code, quantity in requested:
+        product = products.get(code)
+        if product is None:
+            errors.append(f"Producto con código {code} no encontrado.")
+        else:
+            entries.append((product, quantity))
+
+    quote_manager = _quote_manager(tool_context)
+    if entries:
+        quote_manager.add_items(entries)
+    quote = quote_manager.get_quote()
+    if errors:
+        quote["errores"] = errors
+    return quote
+
+@traced_tool
+def add_items_to_quote(items: List[Dict[str, Any]], *, tool_context: ToolContext) -> Dict[str, Any]:
+    """
+    Añade varios productos al presupuesto en una sola llamada (por ejemplo, todos
+    los componentes confirmados de una PC armada).
+
+    Args:
+        items (List[Dict[str, Any]]): Los productos a agregar, cada uno con
+            `product_code` (str) y opcionalmente `quantity` (int, por defecto 1).
+
+    Returns:
+        Dict[str, Any]: El presupuesto actualizado. Si algún ítem no se pudo agregar
+                        (código inexistente o cantidad inválida), se detalla en `errores`
+                        y el resto se agrega igual.
+    """
+    requested, errors = _parse_quote_items(items)
+    products = get_products_by_codes_from_db([code for code, _ in requested]) if requested else {}
+    return _add_found_items(tool_context, requested, products, errors)
+
+@traced_tool
+def view_quote(tool_context: ToolContext) -> Dict[str, Any]:
     """Muestra el contenido actual del presupuesto, incluyendo los productos, cantidades y el total."""
-    return quote_manager.get_quote()
+    return _quote_manager(tool_context).get_quote()
 
-def remove_item_from_quote(product_code: str) -> Dict[str, Any]:
+@traced_tool
+def remove_item_from_quote(product_code: str, *, tool_context: ToolContext) -> Dict[str, Any]:
     """Elimina un producto del presupuesto por su código. Devuelve el presupuesto actualizado."""
+    quote_manager = _quote_manager(tool_context)
     quote_manager.remove_item(product_code)
     return quote_manager.get_quote()
 
-def clear_quote() -> Dict[str, Any]:
+@traced_tool
+def clear_quote(tool_context: ToolContext) -> Dict[str, Any]:
     """Vacía completamente el presupuesto actual."""
+    quote_manager = _quote_manager(tool_context)
     quote_manager.clear_quote()
     return quote_manager.get_quote()
@@ -0,0 +1,305 @@
+"""Instrumentación liviana: spans alrededor de herramientas, SQL y checkouts.
+
+`span(nombre, **atributos)` mide un bloque y se anida debajo del span activo en
+el contexto actual (un `ContextVar`, así el anidamiento sigue a las tareas de
+asyncio y a `asyncio.to_thread`). Los spans terminados van a los sinks
+registrados:
+
+- `SpanStats` acumula, por nombre de span, cantidad, errores, latencia y los
+  atributos (filas devueltas, nivel de búsqueda elegido, aciertos de cache).
+- `FoldedStackExporter` escribe un archivo por conversación en formato "folded
+  stacks" (`herramienta;sql.search;db.checkout 1234`, tiempo propio en µs), que
+  flamegraph.pl, inferno o speedscope grafican directamente.
+
+Cualquier objeto con un método `on_end(span)` sirve como sink. Sin sinks
+registrados (lo normal) `span` devuelve un objeto compartido que no hace nada:
+el costo es una llamada a función y la lectura de una variable global.
+"""
+
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Protocol, Tuple
+
+logger = logging.getLogger(__name__)
+
+NO_TRACE_ID = "sin-conversacion"
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "trace_id", default=None
+)
+_sinks: Tuple["SpanSink", ...] = ()
+_stats: Optional["SpanStats"] = None
+_sinks_lock = threading.Lock()
+
+
+class SpanSink(Protocol):
+    """Recibe cada span al terminar (desde el hilo o la tarea que lo cerró)."""
+
+    def on_end(self, span: "Span") -> None:
+        ...
+
+
+class _NoopSpan:
+    """Lo que devuelve `span` con la instrumentación apagada."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """Un bloque medido.
+
+    Attributes:
+        name: Nombre del span (un "frame" del flamegraph).
+        trace_id: Conversación a la que pertenece (ver `set_trace_id`).
+        stack: Nombres desde la raíz, separados por ";".
+        attributes: Atributos agregados con `set` o `annotate`.
+        error: Nombre de la excepción que cerró el span, si la hubo.
+    """
+
+    __slots__ = (
+        "name", "trace_id", "parent", "root", "stack", "attributes",
+        "start_ns", "end_ns", "child_ns", "error", "_sinks", "_token",
+    )
+
+    def __init__(self, name: str, attributes: Dict[str, Any], sinks: Tuple[SpanSink, ...]):
+        parent = _current_span.get()
+        self.name = name
+        self.parent = parent
+        if parent is None:
+            self.trace_id = _trace_id.get() or NO_TRACE_ID
+            self.root = self
+            self.stack = name
+        else:
+            self.trace_id = parent.trace_id
+            self.root = parent.root
+            self.stack = f"{parent.stack};{name}"
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.child_ns = 0
+        self.error: Optional[str] = None
+        self._sinks = sinks
+        self._token = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ns(self) -> int:
+        return self.end_ns - self.start_ns
+
+    @property
+    def self_ns(self) -> int:
+        """Duración menos la de los hijos (con hijos en paralelo puede ser 0)."""
+        return max(self.duration_ns - self.child_ns, 0)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.perf_counter_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        if self.parent is not None:
+            self.parent.child_ns += self.duration_ns
+        for sink in self._sinks:
+            try:
+                sink.on_end(self)
+            except Exception:
+                logger.exception("Error en el sink de trazas %r", sink)
+        return False
+
+
+def span(name: str, **attributes) -> Any:
+    """Context manager que mide el bloque como un span hijo del activo."""
+    sinks = _sinks
+    if not sinks:
+        return _NOOP_SPAN
+    return Span(name, attributes, sinks)
+
+
+def annotate(**attributes):
+    """Agrega atributos al span activo (no hace nada si no hay uno)."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def enabled() -> bool:
+    """True si hay sinks registrados: para no calcular atributos costosos en vano."""
+    return bool(_sinks)
+
+
+def set_trace_id(trace_id: Optional[str]):
+    """Asocia los spans que se abran en este contexto a una conversación."""
+    _trace_id.set(trace_id)
+
+
+def traced_tool(func: Callable) -> Callable:
+    """Envuelve una herramienta (sincrónica o async) en un span con su nombre.
+
+    Conserva nombre, docstring y firma (ADK la lee para declarar la herramienta
+    y pasar `tool_context`). Si la herramienta devuelve una lista, el span
+    registra cuántos elementos tiene en `results`.
+    """
+    name = func.__name__
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            sinks = _sinks
+            if not sinks:
+                return await func(*args, **kwargs)
+            with Span(name, {}, sinks) as current:
+                result = await func(*args, **kwargs)
+                if isinstance(result, list):
+                    current.set(results=len(result))
+                return result
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        sinks = _sinks
+        if not sinks:
+            return func(*args, **kwargs)
+        with Span(name, {}, sinks) as current:
+            result = func(*args, **kwargs)
+            if isinstance(result, list):
+                current.set(results=len(result))
+            return result
+
+    return wrapper
+
+
+class SpanStats:
+    """Agregados por nombre de span.
+
+    Por cada atributo: los booleanos cuentan cuántas veces fueron verdaderos,
+    los números se suman (por ejemplo, `rows`) y el resto cuenta cada valor por
+    separado (`tier=categoria`, `tier=None`).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def on_end(self, span: Span):
+        duration_ms = span.duration_ns / 1e6
+        with self._lock:
+            entry = self._stats.get(span.name)
+            if entry is None:
+                entry = self._stats[span.name] = {
+                    "count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            if span.error is not None:
+                entry["errors"] += 1
+            for key, value in span.attributes.items():
+                if isinstance(value, bool):
+                    entry[key] = entry.get(key, 0) + int(value)
+                elif isinstance(value, (int, float)):
+                    entry[key] = entry.get(key, 0) + value
+                else:
+                    label = f"{key}={value}"
+                    entry[label] = entry.get(label, 0) + 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            snapshot = {name: dict(entry) for name, entry in self._stats.items()}
+        for entry in snapshot.values():
+            entry["avg_ms"] = entry["total_ms"] / entry["count"]
+        return snapshot
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+class FoldedStackExporter:
+    """Escribe los spans de cada conversación en `<directorio>/<trace_id>.folded`.
+
+    Cada línea es `raíz;hijo;nieto <tiempo propio en µs>`. Las líneas de un
+    árbol se juntan en memoria y se agregan al archivo cuando termina su span
+    raíz (una herramienta), así que cada archivo crece turno a turno; las
+    herramientas de graficado suman las pilas repetidas.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending: Dict[Span, List[str]] = {}
+
+    def path_for(self, trace_id: str) -> str:
+        return os.path.join(self.directory, re.sub(r"[^\w.-]", "_", trace_id) + ".folded")
+
+    def on_end(self, span: Span):
+        line = f"{span.stack} {span.self_ns // 1000}\n"
+        root = span.root
+        with self._lock:
+            if root is not span and not root.end_ns:
+                self._pending.setdefault(root, []).append(line)
+                return
+            lines = self._pending.pop(span, [])
+            lines.append(line)
+            with open(self.path_for(span.trace_id), "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+
+def add_span_sink(sink: SpanSink):
+    """Registra un sink; con el primero se enciende la instrumentación."""
+    global _sinks
+    with _sinks_lock:
+        _sinks = _sinks + (sink,)
+
+
+def enable_tracing(trace_dir: Optional[str] = None) -> SpanStats:
+    """Enciende la instrumentación con un `SpanStats` (y el exportador si hay `trace_dir`)."""
+    global _stats
+    disable_tracing()
+    stats = SpanStats()
+    add_span_sink(stats)
+    if trace_dir:
+        add_span_sink(FoldedStackExporter(trace_dir))
+    _stats = stats
+    return stats
+
+
+def disable_tracing():
+    """Quita todos los sinks: `span` vuelve a no hacer nada."""
+    global _sinks, _stats
+    with _sinks_lock:
+        _sinks = ()
+        _stats = None
+
+
+def get_trace_stats() -> Dict[str, Dict[str, Any]]:
+    """Agregados de `enable_tracing` (vacíos si la instrumentación está apagada)."""
+    return _stats.stats() if _stats is not None else {}
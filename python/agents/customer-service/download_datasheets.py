@@ -1,10 +1,11 @@
+import asyncio
 import os
-import time
 import psycopg2
-import requests
 import logging
 from dotenv import load_dotenv
-from serpapi import GoogleSearch
+from customer_service.config import Config
+from customer_service.datasheet_downloader import DatasheetDownloader, serpapi_search
+from customer_service.shared_libraries.rate_limiter import AsyncTokenBucket
 
 # Configure logging
 logging.basicConfig(filename='download.log', level=logging.INFO, 
@@ -32,54 +33,29 @@ def get_unique_part_numbers():
     conn.close()
     return part_numbers
 
-def download_datasheet(part_number, api_key, download_folder="customer_service/data/datasheets/"):
+async def download_all(part_numbers, api_key, download_folder=None):
     """
-    Searches for a PDF datasheet using SerpApi and downloads it.
+    Searches for and downloads the PDF datasheets of all part numbers, resuming
+    from the progress journal kept in the download folder.
     """
-    params = {
-        "api_key": api_key,
-        "engine": "google",
-        "q": f'{part_number} datasheet filetype:pdf',
-        "hl": "en",
-    }
-
-    logging.info(f"Searching for: {params['q']}")
-
+    configs = Config()
+    downloader = DatasheetDownloader(
+        serpapi_search(api_key),
+        download_folder or configs.DATASHEET_DIR,
+        search_concurrency=configs.DATASHEET_SEARCH_CONCURRENCY,
+        # SerpApi quota: bursts up to the hourly quota, then evenly spaced
+        # searches instead of pausing for a full hour.
+        search_bucket=AsyncTokenBucket(
+            rate=configs.DATASHEET_SEARCHES_PER_HOUR / 3600,
+            capacity=configs.DATASHEET_SEARCHES_PER_HOUR,
+        ),
+        download_concurrency=configs.DATASHEET_DOWNLOAD_CONCURRENCY,
+        per_host_concurrency=configs.DATASHEET_PER_HOST_CONCURRENCY,
+    )
     try:
-        search = GoogleSearch(params)
-        results = search.get_dict()
-        
-        pdf_url_found = None
-        if 'organic_results' in results:
-            for result in results['organic_results']:
-                if 'link' in result and result['link'].lower().endswith('.pdf'):
-                    pdf_url_found = result['link']
-                    break
-
-        if pdf_url_found:
-            logging.info(f"Found PDF datasheet for {part_number} at: {pdf_url_found}")
-            
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            
-            pdf_response = requests.get(pdf_url_found, headers=headers, timeout=60)
-            pdf_response.raise_for_status()
-
-            sanitized_filename = "".join(c for c in part_number if c.isalnum() or c in ('-', '_')).rstrip()
-            file_path = os.path.join(download_folder, f"{sanitized_filename}.pdf")
-
-            with open(file_path, 'wb') as f:
-                f.write(pdf_response.content)
-            logging.info(f"Successfully downloaded and saved to {file_path}")
-            return True
-        else:
-            logging.warning(f"No direct PDF link found for {part_number} in the search results.")
-            return False
-
-    except Exception as e:
-        logging.error(f"An error occurred while processing {part_number}: {e}")
-        return False
+        return await downloader.run(part_numbers)
+    finally:
+        downloader.journal.close()
 
 if __name__ == "__main__":
     load_dotenv()
@@ -92,29 +68,8 @@ if __name__ == "__main__":
         
         if part_numbers:
             logging.info(f"Found {len(part_numbers)} unique part numbers to process.")
-            download_folder = "customer_service/data/datasheets/"
-            os.makedirs(download_folder, exist_ok=True)
-            
-            processed_count = 0
-            for i, pn in enumerate(part_numbers):
-                if processed_count >= 90:
-                    logging.info("Reached 90 requests, pausing for an hour.")
-                    print("Reached 90 requests, pausing for an hour.")
-                    time.sleep(3600)
-                    processed_count = 0
-
-                sanitized_filename = "".join(c for c in pn if c.isalnum() or c in ('-', '_')).rstrip()
-                file_path = os.path.join(download_folder, f"{sanitized_filename}.pdf")
-
-                if os.path.exists(file_path):
-                    logging.info(f"Datasheet for {pn} already exists. Skipping.")
-                    continue
-                
-                logging.info(f"--- Processing part number {i+1}/{len(part_numbers)}: {pn} ---")
-                if download_datasheet(pn, serpapi_key, download_folder):
-                    processed_count += 1
-                
-                # Optional: a small delay between requests to be safe
-                time.sleep(2)
+            summary = asyncio.run(download_all(part_numbers, serpapi_key))
+            logging.info(f"Finished: {summary}")
+            print(f"Finished: {summary}")
         else:
-            logging.info("No part numbers found in the database.")
\ No newline at end of file
+            logging.info("No part numbers found in the database.")
@@ -9,6 +9,9 @@ CREATE TABLE usuarios (
     ultima_conexion TIMESTAMP WITH TIME ZONE
 );
 
+-- Extensión para búsquedas por similitud (trigramas)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Tabla para el catálogo de productos
 CREATE TABLE productos (
     id SERIAL PRIMARY KEY,
@@ -25,6 +28,54 @@ CREATE TABLE productos (
     "Stock" VARCHAR(50)
 );
 
+-- Vista de búsqueda `productos_busqueda`: todos los niveles de búsqueda de
+-- data_manager consultan esta vista, con el stock como entero y columnas
+-- precalculadas. No se define aquí: la crea (con sus índices y su versión)
+-- `bootstrap_database` de customer_service/db_migrations.py, que se ejecuta al
+-- abrir el pool de conexiones y en cada importación; catalog_import la refresca
+-- después de cada carga.
+
+-- Versión del catálogo: se incrementa con cada cambio en productos y avisa por
+-- NOTIFY a los agentes para que invaliden su cache de productos.
+CREATE TABLE catalogo_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0,
+    actualizado_en TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+INSERT INTO catalogo_version (id) VALUES (TRUE);
+
+CREATE OR REPLACE FUNCTION notificar_cambio_catalogo() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    nueva_version BIGINT;
+BEGIN
+    UPDATE catalogo_version
+       SET version = version + 1, actualizado_en = CURRENT_TIMESTAMP
+     RETURNING version INTO nueva_version;
+    PERFORM pg_notify('catalogo_actualizado', nueva_version::text);
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER productos_notificar_cambio
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON productos
+FOR EACH STATEMENT EXECUTE FUNCTION notificar_cambio_catalogo();
+
+-- Inventario de datasheets: archivo, hash y estado de subida por número de parte
+-- (ver customer_service/datasheet_inventory.py).
+CREATE TABLE datasheet_manifest (
+    nro_de_parte VARCHAR(255) PRIMARY KEY,
+    archivo VARCHAR(255) NOT NULL,
+    sha256 CHAR(64),
+    tamano_bytes BIGINT,
+    modificado_en DOUBLE PRECISION,
+    estado VARCHAR(10) NOT NULL DEFAULT 'faltante', -- 'faltante', 'local', 'subido'
+    sha256_subido CHAR(64),
+    subido_en TIMESTAMP WITH TIME ZONE,
+    actualizado_en TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX datasheet_manifest_estado_idx ON datasheet_manifest (estado);
+
 -- Tabla para guardar el historial de interacciones
 CREATE TABLE historial_conversaciones (
     id SERIAL PRIMARY KEY,
@@ -0,0 +1,59 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import inspect
+
+import pytest
+
+from customer_service import async_data_manager
+from customer_service.tools import async_tools, tools
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "search_products",
+        "search_products_with_specs",
+        "add_item_to_quote",
+        "add_items_to_quote",
+        "query_datasheet_rag",
+    ],
+)
+def test_async_tools_mirror_sync_tools(name):
+    async_tool = getattr(async_tools, name)
+    sync_tool = getattr(tools, name)
+    assert inspect.iscoroutinefunction(async_tool)
+    assert inspect.signature(async_tool) == inspect.signature(sync_tool)
+    assert async_tool.__doc__ == sync_tool.__doc__
+
+
+@pytest.mark.asyncio
+async def test_fallback_flag_follows_tier_index(monkeypatch):
+    seen = []
+
+    async def fake_run(tiers):
+        seen.append(tiers)
+        return len(tiers) - 1, [{"Codigo": "100"}]
+
+    monkeypatch.setattr(async_data_manager, "_run_search_tiers_async", fake_run)
+    products, is_fallback = await async_data_manager.search_products_with_fallback_async(
+        categoria="Mothers", producto="A520M K"
+    )
+    assert products == [{"Codigo": "100"}]
+    assert is_fallback
+    assert len(seen[0]) > 1
+
+    products, is_fallback = await async_data_manager.search_products_with_fallback_async(
+        codigo="100"
+    )
+    assert not is_fallback
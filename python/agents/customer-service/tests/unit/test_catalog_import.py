@@ -0,0 +1,147 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import csv
+import io
+
+import pytest
+
+from customer_service.catalog_import import (
+    _CsvStream,
+    dedupe_by_code,
+    import_catalog,
+    read_catalog_rows,
+)
+
+HEADER = "Codigo ;Categoria;Producto;Fabricante;Nro. de Parte;Moneda;Precio sin IVA;%IVA;Imp. Int.;Precio Final U$D;Stock\n"
+
+
+def _row(codigo, producto, stock):
+    return [codigo, "Mothers", producto, "MSI", "P1", "USD", "10,50", "21", "0", "12,71", stock]
+
+
+def test_read_catalog_rows_validates_header_and_pads():
+    rows = list(read_catalog_rows(io.StringIO(HEADER + " A1 ;Mothers;Mother X\n\n")))
+    assert rows == [["A1", "Mothers", "Mother X"] + [""] * 8]
+    with pytest.raises(ValueError):
+        list(read_catalog_rows(io.StringIO("Producto;Precio\nx;1\n")))
+
+
+def test_dedupe_prefers_first_row_with_stock():
+    rows = [
+        _row("A1", "sin stock", "0"),
+        _row("B2", "b", ""),
+        _row("A1", "primera con stock", "5"),
+        _row("A1", "segunda con stock", "7"),
+        _row("B2", "b otra vez", "nan"),
+    ]
+    unique, duplicates = dedupe_by_code(rows)
+    assert duplicates == 3
+    # Se conserva el orden del archivo según la posición de la fila elegida.
+    assert [row[2] for row in unique] == ["b", "primera con stock"]
+
+
+def test_csv_stream_serializes_rows_in_chunks():
+    rows = [_row(f"C{i}", 'con "comillas"; y separador', str(i)) for i in range(50)]
+    stream = _CsvStream(rows)
+    chunks = []
+    while True:
+        chunk = stream.read(64)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    assert all(len(chunk) <= 64 for chunk in chunks)
+    assert list(csv.reader(io.StringIO("".join(chunks)))) == rows
+
+
+def test_empty_list_does_not_touch_the_catalog():
+    class NoConnection:
+        def cursor(self):
+            raise AssertionError("no debería conectarse")
+
+    with pytest.raises(ValueError):
+        import_catalog(NoConnection(), [])
+
+
+class ImportConnection:
+    """Conexión falsa: lee el COPY de a bloques y responde los conteos."""
+
+    def __init__(self, unique, inserted, updated):
+        self.unique = unique
+        self.inserted = inserted
+        self.updated = updated
+        self.executed = []
+        self.copied_rows = []
+        self.first_chunk_consumed = None
+        self.rowcount = 0
+        self.commits = 0
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.executed.append(sql)
+        self.rowcount = self.unique if "DISTINCT ON" in sql else 0
+
+    def fetchone(self):
+        if "count(*) FROM productos_staging_filas" in self.executed[-1]:
+            return (len(self.copied_rows),)
+        return (self.inserted, self.updated)
+
+    def copy_expert(self, sql, stream):
+        self.executed.append(sql)
+        text = ""
+        while True:
+            chunk = stream.read(256)
+            if not chunk:
+                break
+            if self.first_chunk_consumed is None:
+                self.first_chunk_consumed = self.consumed()
+            text += chunk
+        self.copied_rows = list(csv.reader(io.StringIO(text)))
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        raise AssertionError("no debería fallar")
+
+
+def test_import_streams_raw_rows_and_dedupes_in_sql():
+    rows = [_row(f"C{i % 300}", f"producto {i}", str(i % 2)) for i in range(1000)]
+    consumed = 0
+
+    def source():
+        nonlocal consumed
+        for row in rows:
+            consumed += 1
+            yield row
+
+    conn = ImportConnection(unique=300, inserted=200, updated=40)
+    conn.consumed = lambda: consumed
+    report = import_catalog(conn, source())
+
+    # COPY empieza antes de terminar de leer el archivo: no se junta en memoria.
+    assert conn.first_chunk_consumed < 50
+    assert conn.copied_rows == [[str(i)] + row for i, row in enumerate(rows)]
+    dedupe = next(sql for sql in conn.executed if "DISTINCT ON" in sql)
+    assert 'ORDER BY r."Codigo", ' in dedupe and dedupe.rstrip().endswith("r.posicion;")
+    assert (report.rows_read, report.duplicates) == (1000, 700)
+    assert (report.inserted, report.updated, report.unchanged) == (200, 40, 60)
+    assert conn.commits == 1
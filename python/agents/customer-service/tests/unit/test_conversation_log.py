@@ -0,0 +1,156 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import contextlib
+import threading
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from customer_service import conversation_log
+from customer_service.conversation_log import ConversationLogger, Turn
+from customer_service.shared_libraries import callbacks
+
+
+class RecordingWriter:
+    def __init__(self, fail_times=0):
+        self.batches = []
+        self.fail_times = fail_times
+        self.written = threading.Event()
+
+    def __call__(self, batch):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("base caída")
+        self.batches.append([turn.mensaje_usuario for turn in batch])
+        self.written.set()
+
+
+def test_flushes_in_batches_when_the_size_threshold_is_reached():
+    writer = RecordingWriter()
+    conversation_logger = ConversationLogger(writer, batch_size=3, flush_interval_secs=60)
+    for i in range(3):
+        assert conversation_logger.record(1, f"m{i}", "r")
+    assert writer.written.wait(5)
+    conversation_logger.close()
+    assert writer.batches == [["m0", "m1", "m2"]]
+    assert conversation_logger.stats()["written"] == 3
+
+
+def test_close_drains_pending_turns_in_order():
+    writer = RecordingWriter()
+    conversation_logger = ConversationLogger(writer, batch_size=2, flush_interval_secs=60)
+    conversation_logger.record(1, "a", "r")
+    conversation_logger.close()
+    assert writer.batches == [["a"]]
+    # Cerrado: los turnos nuevos se descartan.
+    assert not conversation_logger.record(1, "b", "r")
+    assert conversation_logger.stats()["dropped"] == 1
+
+
+def test_queue_is_bounded_and_failed_batches_are_retried():
+    writer = RecordingWriter(fail_times=1)
+    conversation_logger = ConversationLogger(
+        writer, batch_size=10, flush_interval_secs=0.01, max_pending=2
+    )
+    assert conversation_logger.record(1, "a", "r")
+    assert conversation_logger.record(1, "b", "r")
+    assert writer.written.wait(5)
+    conversation_logger.close()
+    assert writer.batches == [["a", "b"]]
+    stats = conversation_logger.stats()
+    assert stats["failures"] == 1
+    assert stats["pending"] == 0
+
+
+def test_full_queue_drops_new_turns():
+    conversation_logger = ConversationLogger(RecordingWriter(), batch_size=10, max_pending=1)
+    conversation_logger._thread = object()  # Sin hilo: la cola no se vacía.
+    assert conversation_logger.record(1, "a", "r")
+    assert not conversation_logger.record(1, "b", "r")
+    assert conversation_logger.stats() == {
+        "pending": 1, "recorded": 1, "written": 0, "dropped": 1, "batches": 0, "failures": 0,
+    }
+
+
+class CopyConnection:
+    def __init__(self):
+        self.copied = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def copy_expert(self, sql, buffer):
+        self.copied.append(buffer.read())
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_copy_keeps_empty_messages_as_empty_strings(monkeypatch):
+    conn = CopyConnection()
+    monkeypatch.setattr(
+        conversation_log, "get_pool",
+        lambda: SimpleNamespace(connection=lambda: contextlib.nullcontext(conn)),
+    )
+    fecha = datetime(2025, 5, 1, 12, 0, tzinfo=timezone.utc)
+    conversation_log.copy_turns([
+        Turn(7, "", "¿Qué producto buscás?", fecha),
+        Turn(7, "a,b\x00", "ok", fecha),
+    ])
+    # Sin comillas, COPY (FORMAT csv) leería el mensaje vacío como NULL.
+    assert conn.copied == [
+        '"7","","¿Qué producto buscás?","2025-05-01T12:00:00+00:00"\r\n'
+        '"7","a,b","ok","2025-05-01T12:00:00+00:00"\r\n'
+    ]
+    assert (conn.commits, conn.rollbacks) == (1, 0)
+
+
+def _text(role, text):
+    return types.Content(role=role, parts=[types.Part(text=text)])
+
+
+def test_callback_records_final_answers_only(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(callbacks.configs, "CONVERSATION_LOG_ENABLED", True)
+    monkeypatch.setattr(
+        callbacks, "get_conversation_logger",
+        lambda: SimpleNamespace(record=lambda *turn: recorded.append(turn)),
+    )
+    context = SimpleNamespace(state={}, user_id="42", user_content=_text("user", "Hola"))
+    tool_call = LlmResponse(content=types.Content(
+        role="model", parts=[types.Part(function_call=types.FunctionCall(name="search_products"))]
+    ))
+
+    assert callbacks.log_conversation_callback(context, tool_call) is None
+    assert callbacks.log_conversation_callback(
+        context, LlmResponse(content=_text("model", "Hol"), partial=True)
+    ) is None
+    callbacks.log_conversation_callback(context, LlmResponse(content=_text("model", "¡Hola!")))
+    anonymous = SimpleNamespace(state={}, user_id="user", user_content=_text("user", "Hola"))
+    callbacks.log_conversation_callback(anonymous, LlmResponse(content=_text("model", "¡Hola!")))
+
+    assert recorded == [(42, "Hola", "¡Hola!")]
@@ -0,0 +1,62 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from customer_service.data_manager import (
+    PRODUCT_SELECT,
+    _build_search_tiers,
+    _combined_tiers_query,
+    _tier_query,
+)
+from customer_service.db_migrations import SEARCH_VIEW
+
+
+def test_tiers_follow_search_priority():
+    tiers = _build_search_tiers(categoria="Mothers", producto="A520M", nro_de_parte="A520M K")
+    assert len(tiers) == 3
+    assert tiers[0].limit is None
+    assert [tier.limit for tier in tiers[1:]] == [10, 10]
+
+
+def test_series_abbreviation_uses_precomputed_series():
+    tier = _build_search_tiers(categoria="Microprocesadores", producto="R5")[0]
+    assert "(serie = %s" in " ".join(tier.where)
+    assert "r5" in tier.where_params
+
+
+def test_queries_read_the_search_view_with_integer_stock():
+    tier = _build_search_tiers(categoria="Mothers", producto="A520M")[0]
+    query, _ = _tier_query(tier)
+    assert f"FROM {SEARCH_VIEW} p" in query
+    assert "producto_lower <-> %s" in tier.order_by
+    assert tier.order_by[-2:] == ['"Stock" DESC', "id ASC"]
+    # El "%" de "%IVA" va escapado; el stock de `productos` se convierte a entero.
+    assert '"%%IVA"' in PRODUCT_SELECT
+    assert PRODUCT_SELECT.endswith('::integer, 0) AS "Stock"')
+
+
+def test_sequential_query_params_match_placeholders():
+    tier = _build_search_tiers(categoria="Mothers", fabricante="msi", precio_max_usd=100)[0]
+    query, params = _tier_query(tier)
+    assert query.count("%s") == len(params)
+    # Los parámetros del ORDER BY van después de los del WHERE.
+    assert params == ["Mothers", "Mothers", "%msi%", 100, "Mothers"]
+
+
+def test_combined_query_runs_every_tier_in_one_statement():
+    tiers = _build_search_tiers(categoria="Mothers", producto="A520M", codigo="102")
+    query, params = _combined_tiers_query(tiers)
+    assert query.count("%s") == len(params)
+    assert query.count("UNION ALL") == len(tiers) - 1
+    assert "NOT EXISTS (SELECT 1 FROM nivel_0)" in query
+    assert query.rstrip().endswith("ORDER BY search_tier, search_rank")
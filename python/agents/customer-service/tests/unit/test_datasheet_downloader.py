@@ -0,0 +1,166 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from customer_service.datasheet_downloader import (
+    DOWNLOADED,
+    DUPLICATE,
+    FAILED,
+    NOT_FOUND,
+    DatasheetDownloader,
+    ProgressJournal,
+)
+
+PDFS = {
+    "/a.pdf": b"%PDF-1.4 datasheet A" * 1000,
+    "/b.pdf": b"%PDF-1.4 datasheet B",
+    "/a-copy.pdf": b"%PDF-1.4 datasheet A" * 1000,
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits = {}
+
+    def do_GET(self):
+        self.hits[self.path] = self.hits.get(self.path, 0) + 1
+        if self.path == "/flaky.pdf" and self.hits[self.path] == 1:
+            self.send_error(503)
+            return
+        body = PDFS.get(self.path, b"%PDF-1.4 flaky" if self.path == "/flaky.pdf" else None)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.hits = {}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _search_for(base_url, links):
+    calls = []
+
+    async def search(part_number):
+        calls.append(part_number)
+        path = links.get(part_number)
+        return f"{base_url}{path}" if path else None
+
+    return search, calls
+
+
+@pytest.mark.asyncio
+async def test_downloads_dedupes_and_resumes(server, tmp_path):
+    links = {"PN-A": "/a.pdf", "PN B": "/b.pdf", "PN-A2": "/a-copy.pdf", "PN-404": "/missing.pdf"}
+    search, calls = _search_for(server, links)
+    part_numbers = ["PN-A", "PN B", "PN-A2", "PN-404", "PN-NONE", "PN-A"]
+
+    downloader = DatasheetDownloader(search, str(tmp_path), max_attempts=1)
+    summary = await downloader.run(part_numbers)
+    downloader.journal.close()
+
+    assert summary.counts == {DOWNLOADED: 2, DUPLICATE: 1, FAILED: 1, NOT_FOUND: 1}
+    assert (tmp_path / "PNB.pdf").read_bytes() == PDFS["/b.pdf"]
+    assert os.path.samefile(tmp_path / "PN-A.pdf", tmp_path / "PN-A2.pdf")
+    assert not list(tmp_path.glob("*.part"))
+
+    # Second run: only the failed part is retried.
+    PDFS["/missing.pdf"] = b"%PDF-1.4 now available"
+    try:
+        journal = ProgressJournal(str(tmp_path / ".journal.jsonl"))
+        calls.clear()
+        summary = await DatasheetDownloader(search, str(tmp_path), journal=journal).run(part_numbers)
+        journal.close()
+    finally:
+        del PDFS["/missing.pdf"]
+    assert calls == ["PN-404"]
+    assert summary.counts == {DOWNLOADED: 1}
+    assert summary.skipped == 4
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried(server, tmp_path, monkeypatch):
+    async def no_sleep(_):
+        pass
+
+    monkeypatch.setattr("customer_service.datasheet_downloader.asyncio.sleep", no_sleep)
+    search, _ = _search_for(server, {"PN-F": "/flaky.pdf"})
+    downloader = DatasheetDownloader(search, str(tmp_path))
+    summary = await downloader.run(["PN-F"])
+    downloader.journal.close()
+    assert summary.counts == {DOWNLOADED: 1}
+    assert _Handler.hits["/flaky.pdf"] == 2
+
+
+
+@pytest.mark.asyncio
+async def test_busy_host_does_not_hold_global_slots(tmp_path):
+    links = {f"SLOW-{i}": f"http://slow.example/{i}.pdf" for i in range(3)}
+    links["FAST"] = "http://fast.example/fast.pdf"
+
+    async def search(part_number):
+        return links[part_number]
+
+    slow_host_open = asyncio.Event()
+    fast_done = asyncio.Event()
+
+    class Downloader(DatasheetDownloader):
+        async def _download(self, client, url, target):
+            if "slow" in url:
+                await slow_host_open.wait()
+            else:
+                fast_done.set()
+            return DOWNLOADED, url, None
+
+    downloader = Downloader(
+        search, str(tmp_path), download_concurrency=2, per_host_concurrency=1
+    )
+    run = asyncio.ensure_future(downloader.run(list(links)))
+    # The fast host gets a global slot while two slow downloads wait for theirs.
+    await asyncio.wait_for(fast_done.wait(), timeout=5)
+    slow_host_open.set()
+    summary = await run
+    downloader.journal.close()
+    assert summary.counts == {DOWNLOADED: 4}
+
+
+def test_journal_ignores_truncated_lines(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text(
+        json.dumps({"part_number": "X", "status": NOT_FOUND}) + "\n" + '{"part_number": "Y", "sta'
+    )
+    journal = ProgressJournal(str(path))
+    assert journal.is_done("X")
+    assert not journal.is_done("X", retry_not_found=True)
+    assert not journal.is_done("Y")
+    journal.close()
@@ -0,0 +1,159 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import hashlib
+
+import numpy as np
+import pytest
+
+from customer_service.datasheet_index import (
+    DatasheetIndex,
+    LocalSearchBackend,
+    build_index,
+    build_index_from_folder,
+    chunk_text,
+)
+
+DATASHEETS = {
+    "R5-5600": "AMD Ryzen 5 5600 processor. Default TDP 65 W. Socket AM4. 6 cores 12 threads. "
+    "Max boost clock 4.4 GHz. L3 cache 32 MB.",
+    "R5-7600": "AMD Ryzen 5 7600 processor. Default TDP 65 W. Socket AM5. 6 cores 12 threads. "
+    "Max boost clock 5.1 GHz. Integrated Radeon graphics.",
+    "A520MK": "MSI A520M-K motherboard. Socket AM4. Two DDR4 DIMM slots up to 64 GB. "
+    "One M.2 slot. Micro ATX form factor.",
+}
+
+
+def _embed(texts):
+    """Deterministic toy embedder: hashed bag of words."""
+    matrix = np.zeros((len(texts), 64), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            matrix[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % 64] += 1
+    return matrix
+
+
+def _pdf(text):
+    """Minimal single-page PDF with one line of text."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return out
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    out = tmp_path / "index"
+    stats = build_index(DATASHEETS.items(), str(out), embedder=_embed, chunk_words=8, chunk_overlap=2)
+    assert (stats.documents, stats.embedding_dim) == (3, 64)
+    return str(out)
+
+
+def test_chunk_text_overlaps_and_covers_the_text():
+    words = [f"w{i}" for i in range(25)]
+    chunks = chunk_text(" ".join(words), words=10, overlap=3)
+    assert [chunk.split()[0] for chunk in chunks] == ["w0", "w7", "w14", "w21"]
+    assert chunks[-1].split()[-1] == "w24"
+    assert chunk_text("   ") == []
+
+
+def test_bm25_search_ranks_the_matching_datasheet_first(index_dir):
+    index = DatasheetIndex(index_dir)
+    hits = index.search("integrated radeon graphics", k=3)
+    assert hits[0].part_number == "R5-7600"
+    assert "Radeon" in hits[0].text
+    assert index.search("zzz nothing", k=3) == []
+
+
+def test_part_numbers_in_the_query_filter_the_search(index_dir):
+    index = DatasheetIndex(index_dir)
+    assert index.detect_part_numbers("¿Qué TDP tiene el r5 5600?") == ["R5-5600"]
+    assert index.detect_part_numbers("socket de la A520M K") == ["A520MK"]
+
+    hits = index.search("socket R5-5600", k=5)
+    assert {hit.part_number for hit in hits} == {"R5-5600"}
+    assert any("AM4" in hit.text for hit in hits)
+    assert {hit.part_number for hit in index.search("socket", k=10, part_numbers=["A520MK"])} == {"A520MK"}
+
+
+def test_hybrid_search_uses_the_memory_mapped_embeddings(index_dir):
+    index = DatasheetIndex(index_dir)
+    assert isinstance(index.embeddings, np.memmap)
+    query = "boost clock 5.1 ghz"
+    hits = index.search(query, k=2, query_embedding=_embed([query])[0])
+    assert hits[0].part_number == "R5-7600"
+
+    backend = LocalSearchBackend(index, embedder=_embed)
+    snippets = backend.search("DDR4 DIMM slots", page_size=2)
+    assert snippets[0].startswith("[A520MK] ")
+
+
+def test_build_from_pdf_folder_skips_broken_files(tmp_path):
+    folder = tmp_path / "datasheets"
+    folder.mkdir()
+    (folder / "R5-5600.pdf").write_bytes(_pdf("Ryzen 5 5600 TDP 65 W socket AM4"))
+    (folder / "A520MK.pdf").write_bytes(_pdf("A520M K motherboard DDR4 slots"))
+    (folder / "broken.pdf").write_bytes(b"not a pdf")
+
+    out = tmp_path / "index"
+    stats = build_index_from_folder(str(folder), str(out), workers=1)
+    assert (stats.documents, stats.failed) == (2, 1)
+    index = DatasheetIndex(str(out))
+    assert index.search("DDR4", k=1)[0].part_number == "A520MK"
+
+    # Rebuilding replaces the index in place.
+    (folder / "A520MK.pdf").unlink()
+    build_index_from_folder(str(folder), str(out), workers=1)
+    assert set(DatasheetIndex(str(out)).parts) == {"R5-5600"}
+
+
+def test_rag_backend_switch_loads_the_local_index(index_dir):
+    from types import SimpleNamespace
+
+    from customer_service import datasheet_rag
+
+    configs = SimpleNamespace(
+        DATASHEET_RAG_BACKEND="local",
+        DATASHEET_INDEX_DIR=index_dir,
+        DATASHEET_INDEX_HYBRID=False,
+    )
+    backend = datasheet_rag._configured_backend(configs)
+    assert isinstance(backend, LocalSearchBackend)
+    assert backend.search("TDP del R5-7600", page_size=1)[0].startswith("[R5-7600] ")
+
+    with pytest.raises(ValueError):
+        datasheet_rag._configured_backend(SimpleNamespace(DATASHEET_RAG_BACKEND="otro"))
+
+
+def test_local_backend_searches_a_single_datasheet(index_dir):
+    backend = LocalSearchBackend(DatasheetIndex(index_dir))
+    # Catalog part numbers are matched to the indexed file names.
+    snippets = backend.search_part("A520M-K", "DDR4 slots", page_size=1)
+    assert "DDR4" in snippets[0]
+    # Nothing matches the question: the start of the datasheet is returned.
+    assert backend.search_part("R5-5600", "zzz", page_size=1)[0].startswith("AMD Ryzen 5 5600")
+    assert backend.search_part("NO-EXISTE", "TDP", page_size=1) == []
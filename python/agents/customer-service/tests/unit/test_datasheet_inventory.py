@@ -0,0 +1,99 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from customer_service.datasheet_inventory import (
+    LOCAL,
+    MISSING,
+    UPLOADED,
+    mark_uploaded,
+    reconcile_entries,
+    scan_folder,
+)
+
+
+def _reconcile(part_numbers, manifest, folder, legacy=frozenset()):
+    changed, removed, hashed = reconcile_entries(
+        part_numbers, manifest, scan_folder(str(folder)), str(folder), legacy
+    )
+    manifest = dict(manifest)
+    manifest.update((entry.nro_de_parte, entry) for entry in changed)
+    for part_number in removed:
+        del manifest[part_number]
+    return manifest, changed, removed, hashed
+
+
+def test_reconcile_tracks_state_and_skips_unchanged_files(tmp_path):
+    (tmp_path / "PN-1.pdf").write_bytes(b"uno")
+    (tmp_path / "PN2.pdf").write_bytes(b"dos")
+    (tmp_path / "notas.txt").write_text("no es un pdf")
+
+    manifest, changed, _, hashed = _reconcile(["PN-1", "PN 2", "PN-3", "PN-1"], {}, tmp_path, {"PN-1"})
+    assert hashed == 2
+    assert {p: e.estado for p, e in manifest.items()} == {"PN-1": UPLOADED, "PN 2": LOCAL, "PN-3": MISSING}
+    assert manifest["PN 2"].archivo == "PN2.pdf"
+
+    # Sin cambios en disco: no se vuelve a hashear ni a escribir nada.
+    _, changed, removed, hashed = _reconcile(["PN-1", "PN 2", "PN-3"], manifest, tmp_path)
+    assert (changed, removed, hashed) == ([], [], 0)
+
+
+def test_modified_file_needs_a_new_upload(tmp_path):
+    pdf = tmp_path / "PN-1.pdf"
+    pdf.write_bytes(b"v1")
+    manifest, _, _, _ = _reconcile(["PN-1", "PN-2"], {}, tmp_path, {"PN-1"})
+    assert manifest["PN-1"].estado == UPLOADED
+
+    pdf.write_bytes(b"version 2")
+    manifest, changed, removed, hashed = _reconcile(["PN-1"], manifest, tmp_path)
+    assert hashed == 1
+    assert manifest["PN-1"].estado == LOCAL
+    assert removed == ["PN-2"]
+
+    # Si el PDF se borra localmente, la versión anterior sigue en el bucket.
+    pdf.unlink()
+    manifest, _, _, _ = _reconcile(["PN-1"], manifest, tmp_path)
+    assert manifest["PN-1"].estado == UPLOADED
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+        self.rowcount = 0
+        self.commits = 0
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        self.statements.append((sql, params))
+        self.rowcount = len(params[0])
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_mark_uploaded_counts_every_pair_in_one_statement():
+    conn = RecordingConnection()
+    uploads = [(f"PN-{i}", f"{i:064x}") for i in range(1200)]
+    assert mark_uploaded(conn, iter(uploads)) == 1200
+    assert len(conn.statements) == 1 and conn.commits == 1
+    sql, (part_numbers, hashes) = conn.statements[0]
+    assert "unnest(%s::text[], %s::text[])" in sql
+    assert list(zip(part_numbers, hashes)) == uploads
+    assert mark_uploaded(conn, []) == 0 and len(conn.statements) == 1
@@ -0,0 +1,268 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from customer_service import datasheet_rag
+from customer_service.datasheet_rag import (
+    DatasheetRetriever,
+    DiscoveryEngineBackend,
+    FakeSearchBackend,
+    mentions_part_number,
+    normalize_query,
+)
+from customer_service.shared_libraries.cache import LRUTTLCache
+from customer_service.tools import async_tools, tools
+
+DOCUMENTS = {
+    "5600": "Ryzen 5 5600: TDP 65 W, socket AM4, 6 núcleos.",
+    "7600": "Ryzen 5 7600: TDP 65 W, socket AM5, 6 núcleos.",
+    "12400": "Core i5-12400: TDP 65 W, socket LGA1700.",
+}
+
+
+class BlockingBackend:
+    """Backend whose searches wait until the test releases them."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+
+    def search(self, query, page_size):
+        self.calls += 1
+        assert self.release.wait(5)
+        return [f"resultado para {query}"]
+
+
+def _retriever(backend, **kwargs):
+    return DatasheetRetriever(backend, LRUTTLCache(max_size=100, ttl=60), **kwargs)
+
+
+def test_normalize_query_folds_case_accents_and_punctuation():
+    assert normalize_query("¿Cuál es el TDP del  Ryzen 5 5600?") == "cual es el tdp del ryzen 5 5600"
+    assert normalize_query("tdp del ryzen 5 5600") == normalize_query("TDP del Ryzen 5 5600 ")
+
+
+def test_fake_backend_ranks_by_shared_words():
+    backend = FakeSearchBackend(DOCUMENTS)
+    assert backend.search("TDP del Ryzen 5 5600", page_size=2)[0] == DOCUMENTS["5600"]
+    assert backend.search("LGA1700", page_size=5) == [DOCUMENTS["12400"]]
+    assert backend.search("nada que ver", page_size=5) == []
+
+
+def test_equivalent_queries_share_a_cache_entry():
+    backend = FakeSearchBackend(DOCUMENTS)
+    retriever = _retriever(backend)
+    first = retriever.search("TDP del Ryzen 5 5600")
+    assert retriever.search("¿tdp del ryzen 5 5600?") == first
+    assert retriever.search("nada que ver") == []
+    assert retriever.search("Nada que ver") == []
+    assert backend.calls == 2
+
+
+def test_concurrent_identical_queries_are_coalesced():
+    backend = BlockingBackend()
+    retriever = _retriever(backend)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(retriever.search, "TDP Ryzen") for _ in range(4)]
+        while retriever.coalesced < 3:
+            time.sleep(0.01)
+        backend.release.set()
+        results = [future.result() for future in futures]
+    assert backend.calls == 1
+    assert results == [["resultado para TDP Ryzen"]] * 4
+
+
+@pytest.mark.asyncio
+async def test_async_search_coalesces_and_caches():
+    backend = BlockingBackend()
+    retriever = _retriever(backend)
+    tasks = [asyncio.ensure_future(retriever.search_async("TDP Ryzen")) for _ in range(5)]
+    await asyncio.sleep(0.05)
+    backend.release.set()
+    assert await asyncio.gather(*tasks) == [["resultado para TDP Ryzen"]] * 5
+    assert await retriever.search_async("tdp ryzen") == ["resultado para TDP Ryzen"]
+    assert (backend.calls, retriever.coalesced) == (1, 4)
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter_and_are_not_cached():
+    class FailingBackend:
+        calls = 0
+
+        def search(self, query, page_size):
+            self.calls += 1
+            time.sleep(0.05)
+            raise RuntimeError("sin conexión")
+
+    backend = FailingBackend()
+    retriever = _retriever(backend)
+    results = await asyncio.gather(
+        *(retriever.search_async("TDP") for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+    with pytest.raises(RuntimeError):
+        retriever.search("TDP")
+    assert backend.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_rag_tools_use_the_shared_retriever(monkeypatch):
+    monkeypatch.setattr(datasheet_rag, "_retriever", _retriever(FakeSearchBackend(DOCUMENTS)))
+    assert tools.query_datasheet_rag("socket del Ryzen 5 7600")[0] == DOCUMENTS["7600"]
+    assert await async_tools.query_datasheet_rag("socket del Ryzen 5 7600") == tools.query_datasheet_rag(
+        "socket del ryzen 5 7600"
+    )
+    assert tools.query_datasheet_rag("xyz") == [
+        "No se encontró información relevante en los datasheets para su consulta."
+    ]
+
+
+class PartBackend:
+    """Backend with a part-number filter; fails for part numbers starting with "X"."""
+
+    def __init__(self):
+        self.calls = []
+
+    def search(self, query, page_size):
+        raise AssertionError("search_part should be used")
+
+    def search_part(self, part_number, query, page_size):
+        self.calls.append((part_number, query, page_size))
+        if part_number.startswith("X"):
+            raise RuntimeError("datasheet ilegible")
+        return [f"{part_number}: {query}"][:page_size] if part_number != "SIN-PDF" else []
+
+
+def test_search_part_is_cached_per_part_and_question():
+    backend = FakeSearchBackend(DOCUMENTS)
+    retriever = _retriever(backend)
+    # Without `search_part` the part number goes into the query.
+    assert retriever.search_part("5600", "TDP", page_size=1) == [DOCUMENTS["5600"]]
+    assert retriever.search_part("5600", "tdp?", page_size=1) == [DOCUMENTS["5600"]]
+    retriever.search_part("7600", "TDP")
+    assert backend.calls == 2
+
+
+def test_search_part_without_part_filter_keeps_snippets_of_that_part():
+    retriever = _retriever(FakeSearchBackend(DOCUMENTS), page_size=3)
+    # "socket AM4" ranks the 5600 datasheet first: it is not the 7600's.
+    assert retriever.search_part("7600", "socket AM4") == [DOCUMENTS["7600"]]
+    assert retriever.search_part("1240", "TDP") == []
+    assert mentions_part_number("Core i5-12400: TDP 65 W", "I5-12400")
+    assert not mentions_part_number("Core i5-12400: TDP 65 W", "1240")
+
+
+def _discovery_result(link, snippet=None, answers=()):
+    return SimpleNamespace(
+        snippet=SimpleNamespace(snippet=snippet),
+        document=SimpleNamespace(
+            derived_struct_data={"link": link, "extractive_answers": list(answers)}
+        ),
+    )
+
+
+def test_discovery_engine_search_part_keeps_the_part_datasheet(monkeypatch):
+    backend = DiscoveryEngineBackend("proyecto", "global", "datasheets")
+    queries = []
+
+    def fake_search(query, page_size):
+        queries.append((query, page_size))
+        return [
+            _discovery_result("gs://datasheets/pdf/A520M-K.pdf", "A520M-K: 2 slots DDR4"),
+            _discovery_result("gs://datasheets/pdf/B550M-K.pdf", "B550M-K: 4 slots DDR4"),
+            _discovery_result(
+                "gs://datasheets/pdf/a520m-k.pdf", answers=[{"content": "Formato Micro-ATX"}]
+            ),
+        ]
+
+    monkeypatch.setattr(backend, "_search", fake_search)
+    assert backend.search_part("A520M-K", "slots DDR4", page_size=5) == [
+        "A520M-K: 2 slots DDR4",
+        "Formato Micro-ATX",
+    ]
+    assert backend.search_part("X570", "slots DDR4", page_size=5) == []
+    assert queries[0] == ("A520M-K slots DDR4", 20)
+    assert len(backend.search("slots DDR4", page_size=5)) == 3
+
+
+def _catalog_results(**kwargs):
+    products = [
+        {"Codigo": "1", "Nro. de Parte": "100-000000927", "Stock": 5},
+        {"Codigo": "2", "Nro. de Parte": "100-000000927", "Stock": 0},
+        {"Codigo": "3", "Nro. de Parte": "SIN-PDF", "Stock": 2},
+        {"Codigo": "4", "Nro. de Parte": "X-ROTO", "Stock": 9},
+        {"Codigo": "5", "Nro. de Parte": "", "Stock": 1},
+    ]
+    return products, False
+
+
+def test_search_products_with_specs_enriches_copies_in_one_pass(monkeypatch):
+    backend = PartBackend()
+    monkeypatch.setattr(datasheet_rag, "_retriever", _retriever(backend))
+    results = []
+
+    def fake_search(**kwargs):
+        found = _catalog_results()
+        results.append(found[0])
+        return found
+
+    monkeypatch.setattr(tools, "search_products_with_fallback_from_db", fake_search)
+    products = tools.search_products_with_specs(categoria="Microprocesadores", spec_query="TDP")
+    assert sorted(call[0] for call in backend.calls) == ["100-000000927", "SIN-PDF", "X-ROTO"]
+    assert products[0]["Especificaciones"] == ["100-000000927: TDP"]
+    assert products[1]["Especificaciones"] == ["100-000000927: TDP"]
+    assert products[2]["Especificaciones"] == [tools.NO_DATASHEET_MESSAGE]
+    assert products[3]["Especificaciones"] == [tools.SPECS_ERROR_MESSAGE]
+    assert "Especificaciones" not in products[4]
+    # The catalog rows (possibly shared with the product cache) are untouched.
+    assert "Especificaciones" not in results[0][0]
+
+    # Repeat products cost no datasheet lookups (the failed one is retried).
+    backend.calls.clear()
+    tools.search_products_with_specs(categoria="Microprocesadores", spec_query="tdp")
+    assert [call[0] for call in backend.calls] == ["X-ROTO"]
+
+
+@pytest.mark.asyncio
+async def test_async_search_products_with_specs(monkeypatch):
+    backend = PartBackend()
+    monkeypatch.setattr(datasheet_rag, "_retriever", _retriever(backend))
+
+    async def fake_search(**kwargs):
+        return _catalog_results()
+
+    monkeypatch.setattr(async_tools, "search_products_with_fallback_async", fake_search)
+    products = await async_tools.search_products_with_specs(producto="ryzen")
+    assert products[0]["Especificaciones"] == [f"100-000000927: {tools.DEFAULT_SPEC_QUERY}"]
+    assert products[3]["Especificaciones"] == [tools.SPECS_ERROR_MESSAGE]
+    assert len(backend.calls) == 3
+
+
+def test_search_products_with_specs_keeps_the_fallback_suggestion(monkeypatch):
+    backend = PartBackend()
+    monkeypatch.setattr(datasheet_rag, "_retriever", _retriever(backend))
+    monkeypatch.setattr(
+        tools,
+        "search_products_with_fallback_from_db",
+        lambda **kwargs: ([{"Producto": "Ryzen 5 5600", "Nro. de Parte": "100-000000927"}], True),
+    )
+    result = tools.search_products_with_specs(categoria="Microprocesadores", producto="ryzen 5 5601")
+    assert "message" in result[0]
+    assert backend.calls == []
@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+
+import pytest
+
+from customer_service.datasheet_inventory import LOCAL, ManifestEntry
+from customer_service.datasheet_uploader import upload_datasheets, upload_with_retry
+
+
+class FakeBlobStore:
+    """In-memory bucket with optional latency and transient failures."""
+
+    def __init__(self, latency=0.0, failures=None):
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.blobs = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def upload(self, local_path, destination):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            with self._lock:
+                if self.failures.get(destination, 0) > 0:
+                    self.failures[destination] -= 1
+                    raise ConnectionError("connection reset")
+            with open(local_path, "rb") as source:
+                self.blobs[destination] = source.read()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def _entries(folder, count):
+    entries = []
+    for i in range(count):
+        name = f"PN-{i}.pdf"
+        (folder / name).write_bytes(b"%PDF" + bytes([i]))
+        entries.append(ManifestEntry(f"PN-{i}", name, f"{i:064d}", 5, 0.0, LOCAL, None))
+    return entries
+
+
+def test_uploads_in_parallel_and_commits_in_batches(tmp_path):
+    store = FakeBlobStore(latency=0.02, failures={"datasheets/PN-3.pdf": 1})
+    batches = []
+    entries = _entries(tmp_path, 10)
+    entries.append(ManifestEntry("PN-X", "PN-X.pdf", "f" * 64, 1, 0.0, LOCAL, None))
+
+    summary = upload_datasheets(
+        entries, store, str(tmp_path), on_batch=batches.append,
+        workers=4, batch_size=4, backoff_secs=0,
+    )
+
+    assert summary.uploaded == 10
+    assert summary.failed == 1  # PN-X.pdf no existe en disco
+    assert len(store.blobs) == 10
+    assert 1 < store.max_in_flight <= 4
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert sorted(pn for batch in batches for pn, _ in batch) == sorted(f"PN-{i}" for i in range(10))
+
+
+def test_retry_gives_up_after_max_attempts(tmp_path):
+    (tmp_path / "a.pdf").write_bytes(b"%PDF")
+    store = FakeBlobStore(failures={"dest": 5})
+    delays = []
+    with pytest.raises(ConnectionError):
+        upload_with_retry(store, str(tmp_path / "a.pdf"), "dest", max_attempts=3, backoff_secs=1, sleep=delays.append)
+    assert len(delays) == 2
+    assert 1 <= delays[0] < 2 <= delays[1] < 4
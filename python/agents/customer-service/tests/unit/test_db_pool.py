@@ -0,0 +1,136 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+from customer_service.db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+        self.conn.queries.append(query)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.queries = []
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def commit(self):
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections():
+    return []
+
+
+@pytest.fixture
+def make_pool(connections):
+    def factory(**kwargs):
+        def connect():
+            conn = FakeConnection()
+            connections.append(conn)
+            return conn
+
+        return ConnectionPool(connect, **kwargs)
+
+    return factory
+
+
+def test_reuses_connections(make_pool, connections):
+    pool = make_pool(min_size=1, max_size=2)
+    pool.open()
+    for _ in range(5):
+        with pool.connection() as conn:
+            conn.status = extensions.TRANSACTION_STATUS_INTRANS
+    assert len(connections) == 1
+    assert connections[0].status == extensions.TRANSACTION_STATUS_IDLE
+    stats = pool.stats()
+    assert stats["checkouts"] == 5
+    assert stats["connections_created"] == 1
+    assert stats["in_use"] == 0
+
+
+def test_max_size_is_enforced(make_pool):
+    pool = make_pool(min_size=0, max_size=1, checkout_timeout=0.05)
+    held = pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    pool.putconn(held)
+    assert pool.getconn() is held
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_setup_runs_once(connections):
+    calls = []
+
+    def connect():
+        conn = FakeConnection()
+        connections.append(conn)
+        return conn
+
+    pool = ConnectionPool(connect, min_size=2, max_size=3, setup=calls.append)
+    pool.open()
+    a, b, c = pool.getconn(), pool.getconn(), pool.getconn()
+    assert calls == [connections[0]]
+    for conn in (a, b, c):
+        pool.putconn(conn)
+
+
+def test_idle_connections_are_evicted(make_pool, connections):
+    pool = make_pool(min_size=1, max_size=3, idle_timeout=0)
+    conns = [pool.getconn() for _ in range(3)]
+    for conn in conns:
+        pool.putconn(conn)
+    assert pool.evict_idle() == 2
+    assert pool.stats()["size"] == 1
+    assert sum(conn.closed for conn in connections) == 2
+
+
+def test_broken_idle_connection_is_replaced(make_pool, connections):
+    pool = make_pool(min_size=1, max_size=1, health_check_interval=0)
+    pool.open()
+    connections[0].broken = True
+    with pool.connection() as conn:
+        assert conn is connections[1]
+    assert connections[0].closed
+    assert pool.stats()["health_check_failures"] == 1
@@ -0,0 +1,88 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import re
+
+import pytest
+
+from customer_service.data_manager import _build_search_tiers
+from customer_service.db_migrations import SOCKET_WORDS_REGEX, SOCKETS_SQL
+from customer_service.normalization import (
+    expand_manufacturer,
+    expand_series,
+    extract_socket,
+    normalize_socket,
+)
+
+
+@pytest.mark.parametrize(
+    "name, socket",
+    [
+        ("Proces. Intel Core I3-10100 Cometlake S1200", "S1200"),
+        ("Proces. AMD Ryzen 5 5600G AM4", "AM4"),
+        # El patrón "S" tiene prioridad aunque aparezca después del número.
+        ("Mother 9999 Gamer s1151", "S1151"),
+        ("Mother Asus Prime H610M-E LGA1700", "LGA1700"),
+        ("Proces. AMD Threadripper TR4", "TR4"),
+        ("Mouse Logitech", None),
+    ],
+)
+def test_extract_socket_keeps_pattern_priority(name, socket):
+    assert extract_socket(name) == socket
+
+
+def test_series_and_manufacturer_aliases():
+    assert expand_series("R5") == ("ryzen 5", "r5")
+    assert expand_series("a520m") == ("a520m",)
+    assert expand_manufacturer("WD") == ("western digital", "wd")
+    assert expand_manufacturer("msi") == ("msi",)
+
+
+@pytest.mark.parametrize(
+    "socket_type, expected",
+    [("1700", "1700"), ("LGA1700", "1700"), ("s 1200", "1200"), ("am4", "AM4"), ("sTRX4", "sTRX4")],
+)
+def test_normalize_socket(socket_type, expected):
+    assert normalize_socket(socket_type) == expected
+
+
+def test_socket_filter_uses_normalized_sockets():
+    tier = _build_search_tiers(categoria="Mothers", socket_type="LGA1700")[0]
+    assert tier.where_params[-1] == "1700"
+    assert tier.where[-1] == "sockets @> ARRAY[%s]"
+    assert _build_search_tiers(socket_type="strx4")[0].where_params == ["STRX4"]
+
+
+def _view_sockets(name):
+    """Lo que SOCKETS_SQL calcula para `name` (\\m y \\M de Postgres son \\b aquí)."""
+    regex = SOCKET_WORDS_REGEX.replace("\\m", "\\b").replace("\\M", "\\b")
+    return {
+        re.sub(r"^(LGA|S)(\d)", r"\2", match.group(0).upper())
+        for match in re.finditer(regex, name, re.IGNORECASE)
+    }
+
+
+@pytest.mark.parametrize(
+    "name, sockets",
+    [
+        ("Proces. Intel Core I5-12400 Alder Lake", set()),
+        ("Mother Asus Prime A520M-K", set()),
+        ("Cooler DeepCool AG400 AM4/1700", {"AM4", "1700"}),
+        ("Mother Asus Prime H610M-E LGA1700", {"1700"}),
+        ("Proces. Intel Core I3-10100 Cometlake S1200", {"1200"}),
+        ("Mother MSI B650 Gaming Plus AM5", {"AM5"}),
+    ],
+)
+def test_view_sockets_are_whole_words(name, sockets):
+    assert f"'({SOCKET_WORDS_REGEX})'" in SOCKETS_SQL
+    assert _view_sockets(name) == sockets
@@ -0,0 +1,77 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from customer_service.product_cache import ProductCache
+from customer_service.shared_libraries.cache import LRUTTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUTTLCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = LRUTTLCache(max_size=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5.1
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_set_is_dropped_after_clear():
+    cache = LRUTTLCache(max_size=10)
+    generation = cache.generation
+    cache.clear()
+    assert not cache.set("a", 1, generation)
+    assert cache.get("a") is None
+
+
+def test_product_cache_is_bypassed_until_trusted():
+    cache = ProductCache(max_size=10)
+    product = {"Codigo": "0416736", "Precio Final U$D": 10.0}
+    cache.put(product)
+    assert cache.get("0416736") is None
+
+    cache.set_trusted(True)
+    cache.put(product)
+    cached = cache.get("0416736")
+    assert cached == product
+    cached["Precio Final U$D"] = 0
+    assert cache.get("0416736")["Precio Final U$D"] == 10.0
+
+
+def test_invalidation_discards_in_flight_reads():
+    cache = ProductCache(max_size=10)
+    cache.set_trusted(True)
+    generation = cache.generation()
+    cache.invalidate_all()  # llega un NOTIFY mientras se consultaba la base
+    cache.put({"Codigo": "1", "Precio Final U$D": 1.0}, generation)
+    assert cache.get("1") is None
@@ -0,0 +1,96 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import json
+from types import SimpleNamespace
+
+from google.adk.sessions.state import State
+
+from customer_service.quote_manager import QuoteManager
+from customer_service.tools import tools
+
+
+def _product(code, price):
+    return {"Codigo": code, "Producto": f"Producto {code}", "Precio Final U$D": price}
+
+
+def test_items_are_keyed_by_code_with_running_total():
+    manager = QuoteManager()
+    manager.add_item(_product("100", 10.1), 2)
+    manager.add_item(_product("200", 0.3), 3)
+    manager.add_item(_product("100", 10.1), 1)
+    quote = manager.get_quote()
+    assert [(item["product"]["Codigo"], item["quantity"]) for item in quote["items"]] == [("100", 3), ("200", 3)]
+    assert quote["total"] == 31.2
+
+    manager.remove_item("100")
+    manager.remove_item("no-existe")
+    assert manager.get_quote()["total"] == 0.9
+    manager.clear_quote()
+    assert manager.get_quote()["items"] == []
+
+
+def test_quote_lives_in_session_state():
+    session_state, delta = {}, {}
+    manager = QuoteManager(State(session_state, delta))
+    manager.add_item(_product("100", 5.0), 1)
+
+    # El cambio queda registrado en el delta de la sesión y es serializable.
+    assert json.loads(json.dumps(delta[QuoteManager.STATE_KEY]))["total_centavos"] == 500
+
+    # Otra sesión no ve el presupuesto; la misma sesión lo recupera después de
+    # un reinicio a partir del estado persistido.
+    assert QuoteManager({}).get_quote()["items"] == []
+    restored = QuoteManager(json.loads(json.dumps(delta)))
+    assert restored.get_quote()["total"] == 5.0
+
+
+def test_tools_use_the_session_quote(monkeypatch):
+    monkeypatch.setattr(tools, "get_product_by_code_from_db", lambda code: _product(code, 1.5))
+    first = SimpleNamespace(state={})
+    second = SimpleNamespace(state={})
+    tools.add_item_to_quote("100", 2, tool_context=first)
+    tools.add_item_to_quote("200", tool_context=second)
+    assert tools.view_quote(first)["total"] == 3.0
+    assert [item["product"]["Codigo"] for item in tools.view_quote(second)["items"]] == ["200"]
+    assert tools.remove_item_from_quote("100", tool_context=first)["items"] == []
+
+
+def test_add_items_to_quote_uses_one_lookup_and_reports_errors(monkeypatch):
+    lookups = []
+
+    def fake_lookup(codes):
+        lookups.append(codes)
+        return {code: _product(code, 2.5) for code in codes if code != "999"}
+
+    monkeypatch.setattr(tools, "get_products_by_codes_from_db", fake_lookup)
+    context = SimpleNamespace(state={})
+    quote = tools.add_items_to_quote(
+        [
+            {"product_code": "100", "quantity": 2},
+            {"product_code": "200"},
+            {"product_code": "999", "quantity": 1},
+            {"product_code": "300", "quantity": 0},
+            {"quantity": 1},
+        ],
+        tool_context=context,
+    )
+    assert lookups == [["100", "200", "999"]]
+    assert [(item["product"]["Codigo"], item["quantity"]) for item in quote["items"]] == [("100", 2), ("200", 1)]
+    assert quote["total"] == 7.5
+    assert len(quote["errores"]) == 3
+    assert any("999" in error for error in quote["errores"])
+
+    # Sin errores no se agrega la clave.
+    assert "errores" not in tools.add_items_to_quote([{"product_code": "100"}], tool_context=context)
+    assert tools.view_quote(context)["total"] == 10.0
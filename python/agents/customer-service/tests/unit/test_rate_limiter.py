@@ -0,0 +1,121 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from customer_service.shared_libraries import callbacks
+from customer_service.shared_libraries.rate_limiter import (
+    AsyncTokenBucket,
+    RateLimitExceeded,
+    acquire_all,
+    get_rate_limiter_metrics,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.now += delay
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_bucket_allows_burst_then_paces():
+    clock = FakeClock()
+    bucket = AsyncTokenBucket(rate=2, capacity=3, clock=clock, sleep=clock.sleep)
+    waits = [await bucket.acquire() for _ in range(5)]
+    assert waits[:3] == [0, 0, 0]
+    assert waits[3:] == pytest.approx([0.5, 0.5])
+    assert clock.now == pytest.approx(1.0)
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_order():
+    clock = FakeClock()
+    bucket = AsyncTokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+    order = []
+
+    async def take(name):
+        await bucket.acquire()
+        order.append(name)
+
+    await asyncio.gather(*(take(name) for name in "abcd"))
+    assert order == list("abcd")
+    assert not bucket.try_acquire()
+
+
+@pytest.mark.asyncio
+async def test_max_wait_rejects_without_taking_tokens():
+    clock = FakeClock()
+    bucket = AsyncTokenBucket(rate=1, capacity=2, clock=clock, sleep=clock.sleep, key="model:x")
+    await bucket.acquire()
+    await bucket.acquire()
+    with pytest.raises(RateLimitExceeded) as error:
+        await bucket.acquire(max_wait=0.5)
+    assert error.value.retry_after == pytest.approx(1.0)
+    assert await bucket.acquire(max_wait=1.0) == pytest.approx(1.0)
+    stats = bucket.stats()
+    assert (stats["acquired"], stats["rejected"], stats["delayed"]) == (3, 1, 1)
+    assert stats["max_wait_secs"] == pytest.approx(1.0)
+
+
+@pytest.mark.asyncio
+async def test_acquire_all_charges_every_bucket_or_none():
+    clock = FakeClock()
+    model = AsyncTokenBucket(rate=1, capacity=5, clock=clock, sleep=clock.sleep)
+    project = AsyncTokenBucket(rate=1, capacity=1, clock=clock, sleep=clock.sleep)
+    assert await acquire_all([model, project]) == 0
+    with pytest.raises(RateLimitExceeded):
+        await acquire_all([model, project], max_wait=0.1)
+    assert model.tokens == pytest.approx(4)
+    assert await acquire_all([model, project]) == pytest.approx(1.0)
+    assert model.tokens == pytest.approx(4)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_its_turn_back():
+    bucket = AsyncTokenBucket(rate=10, capacity=1)
+    await bucket.acquire()
+    waiter = asyncio.ensure_future(bucket.acquire())
+    await asyncio.sleep(0)
+    assert bucket.stats()["waiting"] == 1
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert bucket.stats()["waiting"] == 0
+    assert bucket.tokens >= 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_callback_shares_the_quota_across_sessions(monkeypatch):
+    monkeypatch.setattr(callbacks.configs, "LLM_RPM_PER_MODEL", 2)
+    monkeypatch.setattr(callbacks.configs, "LLM_RATE_LIMIT_MAX_WAIT_SECS", 0.0)
+    monkeypatch.setattr(callbacks.configs, "CLOUD_PROJECT", "test-shared-quota")
+    request = LlmRequest(model="test-model", contents=[types.Content(role="user", parts=[types.Part(text="")])])
+
+    sessions = [SimpleNamespace(state={}) for _ in range(3)]
+    responses = [await callbacks.rate_limit_callback(session, request) for session in sessions]
+    assert responses[:2] == [None, None]
+    assert responses[2].content.parts[0].text == callbacks.RATE_LIMITED_MESSAGE
+    assert request.contents[0].parts[0].text == " "
+    assert get_rate_limiter_metrics()["model:test-model"]["rejected"] == 1
@@ -0,0 +1,110 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import inspect
+
+import pytest
+
+from customer_service import tracing
+from customer_service.tracing import (
+    FoldedStackExporter,
+    annotate,
+    disable_tracing,
+    enable_tracing,
+    get_trace_stats,
+    set_trace_id,
+    span,
+    traced_tool,
+)
+
+
+@pytest.fixture(autouse=True)
+def _tracing_off():
+    disable_tracing()
+    yield
+    disable_tracing()
+
+
+@traced_tool
+def buscar(producto: str, *, tool_context=None):
+    """Busca productos."""
+    with span("sql.search") as current:
+        current.set(tier="categoria", rows=2)
+    annotate(fallback=False)
+    return [producto, producto]
+
+
+def test_disabled_tracing_is_a_no_op():
+    assert span("sql.search") is span("db.checkout")
+    with span("sql.search") as current:
+        current.set(rows=1)
+        annotate(cache_hit=True)
+    assert buscar("a520m") == ["a520m", "a520m"]
+    assert get_trace_stats() == {}
+
+
+def test_traced_tool_keeps_the_tool_signature():
+    assert buscar.__name__ == "buscar"
+    assert buscar.__doc__ == "Busca productos."
+    assert "tool_context" in inspect.signature(buscar).parameters
+
+
+def test_stats_aggregate_attributes_per_span():
+    enable_tracing()
+    buscar("a520m")
+    buscar("b550")
+    with pytest.raises(ValueError):
+        with span("sql.search"):
+            raise ValueError("sin conexión")
+
+    stats = get_trace_stats()
+    assert stats["buscar"]["count"] == 2
+    assert stats["buscar"]["results"] == 4
+    assert stats["buscar"]["fallback"] == 0
+    assert stats["sql.search"]["count"] == 3
+    assert stats["sql.search"]["errors"] == 1
+    assert stats["sql.search"]["rows"] == 4
+    assert stats["sql.search"]["tier=categoria"] == 2
+
+
+def test_exporter_writes_folded_stacks_per_conversation(tmp_path):
+    enable_tracing(str(tmp_path))
+
+    @traced_tool
+    async def buscar_async(producto: str):
+        async def consulta(tier):
+            with span("sql.tier", tier=tier):
+                await asyncio.sleep(0.001)
+
+        await asyncio.gather(consulta("codigo"), consulta("amplia"))
+        return []
+
+    async def conversacion(session_id):
+        set_trace_id(session_id)
+        await buscar_async("r5")
+
+    async def main():
+        await asyncio.gather(conversacion("sesion-1"), conversacion("sesion/2"))
+
+    asyncio.run(main())
+    buscar("sin sesión")
+
+    exporter = next(sink for sink in tracing._sinks if isinstance(sink, FoldedStackExporter))
+    for session_id in ("sesion-1", "sesion/2"):
+        with open(exporter.path_for(session_id), encoding="utf-8") as f:
+            stacks = [line.rsplit(" ", 1)[0] for line in f]
+        assert stacks == ["buscar_async;sql.tier", "buscar_async;sql.tier", "buscar_async"]
+    with open(exporter.path_for(tracing.NO_TRACE_ID), encoding="utf-8") as f:
+        assert [line.rsplit(" ", 1)[0] for line in f] == ["buscar;sql.search", "buscar"]
@@ -15,60 +15,72 @@
 """Callback functions for FOMC Research Agent."""
 
 import logging
-import time
+import os
+from typing import Optional
 
 from google.adk.agents.callback_context import CallbackContext
-from google.adk.models import LlmRequest
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from .rate_limiter import RateLimitExceeded, acquire_all, get_token_bucket
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 # Adjust these values to limit the rate at which the agent
-# queries the LLM API.
+# queries the LLM API. The quotas are shared by every session in the process.
 RATE_LIMIT_SECS = 60
 RPM_QUOTA = 1000
+PROJECT_RPM_QUOTA = 1000
+MAX_WAIT_SECS = RATE_LIMIT_SECS
+RATE_LIMITED_MESSAGE = (
+    "The model quota is exhausted at the moment. Please try again shortly."
+)
+
 
+def _rate_limit_buckets(model: Optional[str]):
+    """Process-wide buckets: one per model and one per project."""
+    project = os.getenv("GOOGLE_CLOUD_PROJECT", "default")
+    return (
+        get_token_bucket(
+            f"model:{model}",
+            rate=RPM_QUOTA / RATE_LIMIT_SECS,
+            capacity=RPM_QUOTA,
+        ),
+        get_token_bucket(
+            f"project:{project}",
+            rate=PROJECT_RPM_QUOTA / RATE_LIMIT_SECS,
+            capacity=PROJECT_RPM_QUOTA,
+        ),
+    )
 
-def rate_limit_callback(
+
+async def rate_limit_callback(
     callback_context: CallbackContext, llm_request: LlmRequest
-) -> None:
+) -> Optional[LlmResponse]:
     # pylint: disable=unused-argument
     """Callback function that implements a query rate limit.
 
+    Waits, without blocking the event loop, for a token of the model and
+    project buckets. If the wait would exceed MAX_WAIT_SECS the model is not
+    called and a short "quota exhausted" response is returned instead.
+
     Args:
       callback_context: A CallbackContext object representing the active
               callback context.
       llm_request: A LlmRequest object representing the active LLM request.
     """
-    now = time.time()
-    if "timer_start" not in callback_context.state:
-        callback_context.state["timer_start"] = now
-        callback_context.state["request_count"] = 1
-        logger.debug(
-            "rate_limit_callback [timestamp: %i, req_count: 1, "
-            "elapsed_secs: 0]",
-            now,
+    try:
+        waited = await acquire_all(
+            _rate_limit_buckets(llm_request.model), max_wait=MAX_WAIT_SECS
         )
-        return
-
-    request_count = callback_context.state["request_count"] + 1
-    elapsed_secs = now - callback_context.state["timer_start"]
-    logger.debug(
-        "rate_limit_callback [timestamp: %i, request_count: %i,"
-        " elapsed_secs: %i]",
-        now,
-        request_count,
-        elapsed_secs,
-    )
-
-    if request_count > RPM_QUOTA:
-        delay = RATE_LIMIT_SECS - elapsed_secs + 1
-        if delay > 0:
-            logger.debug("Sleeping for %i seconds", delay)
-            time.sleep(delay)
-        callback_context.state["timer_start"] = now
-        callback_context.state["request_count"] = 1
-    else:
-        callback_context.state["request_count"] = request_count
-
-    return
+    except RateLimitExceeded as e:
+        logger.warning("rate_limit_callback: %s", e)
+        return LlmResponse(
+            content=types.Content(
+                role="model", parts=[types.Part(text=RATE_LIMITED_MESSAGE)]
+            )
+        )
+    if waited > 0:
+        logger.debug("rate_limit_callback waited %.2f seconds", waited)
+    return None
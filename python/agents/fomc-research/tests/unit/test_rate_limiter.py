@@ -0,0 +1,135 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Rate limiter and its wiring into the FOMC agents.
+
+The limiter is a copy of customer-service's (the agents are packaged
+separately); these tests cover what this agent relies on.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models import LlmRequest
+from google.adk.tools.agent_tool import AgentTool
+from google.genai import types
+
+from fomc_research import agent
+from fomc_research.shared_libraries import callbacks
+from fomc_research.shared_libraries.rate_limiter import (
+    AsyncTokenBucket,
+    RateLimitExceeded,
+    get_rate_limiter_metrics,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.now += delay
+        await asyncio.sleep(0)
+
+
+def _request(model):
+    return LlmRequest(
+        model=model,
+        contents=[types.Content(role="user", parts=[types.Part(text="FOMC")])],
+    )
+
+
+def _all_agents(root):
+    yield root
+    for sub_agent in root.sub_agents:
+        yield from _all_agents(sub_agent)
+    for tool in getattr(root, "tools", []):
+        if isinstance(tool, AgentTool):
+            yield from _all_agents(tool.agent)
+
+
+def test_every_agent_is_rate_limited():
+    agents = list(_all_agents(agent.root_agent))
+    assert len(agents) > 1
+    for each in agents:
+        assert each.before_model_callback is callbacks.rate_limit_callback, each.name
+
+
+@pytest.mark.asyncio
+async def test_bucket_serves_waiters_in_order_and_honours_max_wait():
+    clock = FakeClock()
+    bucket = AsyncTokenBucket(
+        rate=1, capacity=1, clock=clock, sleep=clock.sleep, key="model:x"
+    )
+    order = []
+
+    async def take(name):
+        await bucket.acquire()
+        order.append(name)
+
+    await asyncio.gather(*(take(name) for name in "abc"))
+    assert order == list("abc")
+    with pytest.raises(RateLimitExceeded):
+        await bucket.acquire(max_wait=0.5)
+    assert bucket.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_callback_shares_the_quota_across_sessions(monkeypatch):
+    monkeypatch.setattr(callbacks, "RPM_QUOTA", 2)
+    monkeypatch.setattr(callbacks, "MAX_WAIT_SECS", 0.0)
+    monkeypatch.setenv("GOOGLE_CLOUD_PROJECT", "test-fomc-shared-quota")
+    request = _request("test-fomc-shared-model")
+
+    sessions = [SimpleNamespace(state={}) for _ in range(3)]
+    responses = [
+        await callbacks.rate_limit_callback(session, request) for session in sessions
+    ]
+    assert responses[:2] == [None, None]
+    assert responses[2].content.parts[0].text == callbacks.RATE_LIMITED_MESSAGE
+    assert get_rate_limiter_metrics()["model:test-fomc-shared-model"]["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_callback_waits_without_blocking_the_event_loop(monkeypatch):
+    # One request per 0.2 seconds.
+    monkeypatch.setattr(callbacks, "RATE_LIMIT_SECS", 0.2)
+    monkeypatch.setattr(callbacks, "RPM_QUOTA", 1)
+    monkeypatch.setattr(callbacks, "MAX_WAIT_SECS", 5)
+    monkeypatch.setenv("GOOGLE_CLOUD_PROJECT", "test-fomc-wait")
+    request = _request("test-fomc-wait-model")
+    assert await callbacks.rate_limit_callback(SimpleNamespace(state={}), request) is None
+
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticking = asyncio.ensure_future(ticker())
+    try:
+        response = await callbacks.rate_limit_callback(
+            SimpleNamespace(state={}), request
+        )
+    finally:
+        ticking.cancel()
+    assert response is None
+    assert ticks >= 5
+    assert get_rate_limiter_metrics()["model:test-fomc-wait-model"]["delayed"] == 1
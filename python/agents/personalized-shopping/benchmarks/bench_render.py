@@ -0,0 +1,227 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Per-step page rendering cost of the web environment, before and after
+precompiling the templates.
+
+Replays shopping episodes (start page, two result pages, an item page, a sub
+page, back to the results, buy) over products from the catalog, rendering
+each page two ways:
+
+- flask: what SimServer did before, i.e. a fresh Flask request context per
+  step, the template read from disk and compiled by `render_template_string`.
+- renderer: `HtmlRenderer`, with templates compiled once and result pages
+  cached by (keywords, page).
+
+Run from the agent directory after downloading the data (and, optionally,
+building the product store):
+
+    python benchmarks/bench_render.py --episodes 200
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "personalized_shopping", "shared_libraries"))
+
+from flask import render_template_string
+
+from web_agent_site.engine.engine import (
+    END_BUTTON,
+    PRODUCT_WINDOW,
+    TEMPLATE_DIR,
+    HtmlRenderer,
+    load_products,
+)
+from web_agent_site.engine.product_store import open_product_store
+from web_agent_site.envs.web_agent_text_env import app
+from web_agent_site.utils import DEFAULT_FILE_PATH
+
+
+class FlaskRenderer(HtmlRenderer):
+    """Rendering as SimServer did it before `HtmlRenderer`."""
+
+    def render(self, template_name, **context):
+        with app.app_context(), app.test_request_context():
+            with open(os.path.join(TEMPLATE_DIR, template_name)) as f:
+                return render_template_string(f.read(), **context)
+
+
+def load_catalog(num_products):
+    store = open_product_store(DEFAULT_FILE_PATH, num_products)
+    if store is not None:
+        return [store.get_product_at(i) for i in range(len(store))]
+    return load_products(DEFAULT_FILE_PATH, num_products=num_products)[0]
+
+
+def episodes(products, num_episodes, num_queries, seed):
+    """Step sequences: (page label, action, render context) per step."""
+    rng = random.Random(seed)
+    queries = [
+        " ".join(rng.choice(products)["Title"].lower().split()[:2])
+        for _ in range(num_queries)
+    ]
+    # A fixed result list per query, as the search engine would return.
+    results = {q: rng.sample(products, 2 * PRODUCT_WINDOW) for q in queries}
+    for n in range(num_episodes):
+        session_id = f"bench{n}"
+        query = rng.choice(queries)
+        keywords = query.split()
+        instruction_text = f"Find me {query}."
+        product = rng.choice(results[query])
+        options = {}
+        common = dict(session_id=session_id, keywords=keywords, page=1)
+        item = dict(
+            common,
+            product_info=product,
+            asin=product["asin"],
+            options=options,
+            instruction_text=instruction_text,
+        )
+        yield [
+            (
+                "start",
+                "start",
+                dict(session_id=session_id, instruction_text=instruction_text),
+            ),
+            (
+                "results",
+                "search",
+                dict(
+                    common,
+                    instruction_text=instruction_text,
+                    query=query,
+                    results=results[query],
+                ),
+            ),
+            (
+                "results",
+                "search",
+                dict(
+                    common,
+                    page=2,
+                    instruction_text=instruction_text,
+                    query=query,
+                    results=results[query],
+                ),
+            ),
+            ("item", "click", dict(item, show_attrs=False)),
+            ("sub_page", "click[Description]", item),
+            (
+                "results",
+                "search",
+                dict(
+                    common,
+                    instruction_text=instruction_text,
+                    query=query,
+                    results=results[query],
+                ),
+            ),
+            (
+                "done",
+                f"click[{END_BUTTON}]",
+                dict(
+                    session_id=session_id,
+                    reward=1.0,
+                    asin=product["asin"],
+                    options=options,
+                ),
+            ),
+        ]
+
+
+def results_context(context):
+    page = context["page"]
+    results = context["results"]
+    products = results[(page - 1) * PRODUCT_WINDOW : page * PRODUCT_WINDOW]
+    return products, len(results)
+
+
+def run(name, steps, render_step):
+    timings = defaultdict(list)
+    start = time.perf_counter()
+    for label, action, context in steps:
+        step_start = time.perf_counter()
+        render_step(action, context)
+        timings[label].append(time.perf_counter() - step_start)
+    elapsed = time.perf_counter() - start
+    print(f"\n{name}: {len(steps)} steps, {elapsed / len(steps) * 1e3:.3f} ms/step")
+    for label, values in timings.items():
+        print(
+            f"  {label:<9} n={len(values):<5} mean {statistics.mean(values) * 1e3:.3f} ms"
+            f"  p95 {sorted(values)[int(len(values) * 0.95)] * 1e3:.3f} ms"
+        )
+    return elapsed / len(steps)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num-products", type=int, default=1000)
+    parser.add_argument("--episodes", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    products = load_catalog(args.num_products)
+    steps = [
+        step
+        for episode in episodes(products, args.episodes, args.queries, args.seed)
+        for step in episode
+    ]
+
+    def make_step(renderer, cache_results):
+        def step(action, context):
+            if action != "search":
+                renderer.map_action_to_html(action, **context)
+            elif cache_results:
+                renderer.render_results_page(
+                    context["session_id"],
+                    context["keywords"],
+                    context["page"],
+                    context["instruction_text"],
+                    lambda: results_context(context),
+                )
+            else:
+                products, total = results_context(context)
+                renderer.map_action_to_html(
+                    action,
+                    session_id=context["session_id"],
+                    products=products,
+                    keywords=context["keywords"],
+                    page=context["page"],
+                    total=total,
+                    instruction_text=context["instruction_text"],
+                )
+
+        return step
+
+    renderer = HtmlRenderer(app.url_map)
+    before = run("flask", steps, make_step(FlaskRenderer(app.url_map), False))
+    run("renderer, no cache", steps, make_step(HtmlRenderer(app.url_map), False))
+    after = run("renderer", steps, make_step(renderer, True))
+    print(
+        f"\nresults cache: {renderer.results_cache_hits} hits, "
+        f"{renderer.results_cache_misses} misses"
+    )
+    print(f"speedup: {before / after:.1f}x per step")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,5 +17,5 @@ import torch
 # Workaround to Resolve the PyTorch-Streamlit Incompatibility Issue
 torch.classes.__path__ = []
 
-from .shared_libraries.init_env import init_env, webshop_env
+from .shared_libraries.init_env import init_env, webshop_env, webshop_sessions
 from . import agent
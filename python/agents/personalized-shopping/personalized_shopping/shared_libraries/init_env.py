@@ -14,6 +14,8 @@
 
 import gym
 
+from .session_pool import WebShopSessionPool
+
 gym.envs.registration.register(
     id="WebAgentTextEnv-v0",
     entry_point=(
@@ -35,3 +37,6 @@ num_product_items = 50000
 webshop_env = init_env(num_product_items)
 webshop_env.reset()
 print(f"Finished initializing WebshopEnv with {num_product_items} items.")
+
+# The tools use one environment per ADK session on top of the shared server.
+webshop_sessions = WebShopSessionPool(webshop_env.server)
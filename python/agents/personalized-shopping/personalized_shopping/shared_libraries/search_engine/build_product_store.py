@@ -0,0 +1,46 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Preprocess the product catalog once so the web environment starts quickly.
+
+Run from this directory after downloading the data:
+
+    python build_product_store.py --num-products 50000
+"""
+
+import argparse
+import sys
+import time
+
+sys.path.insert(0, "../")
+
+from web_agent_site.engine.product_store import build_product_store, product_store_path
+from web_agent_site.utils import DEFAULT_FILE_PATH
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument("--num-products", type=int, default=50000)
+parser.add_argument("--human-goals", action="store_true")
+parser.add_argument("--input", default=DEFAULT_FILE_PATH)
+parser.add_argument("--output", default=None)
+args = parser.parse_args()
+
+output = args.output or product_store_path(args.num_products, args.human_goals)
+start = time.time()
+num_products, num_goals = build_product_store(
+    args.input, output, num_products=args.num_products, human_goals=args.human_goals
+)
+print(
+    f"Wrote {num_products} products and {num_goals} goals to {output} "
+    f"in {time.time() - start:.1f}s."
+)
@@ -0,0 +1,99 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""One WebShop environment per ADK session, all sharing a single SimServer.
+
+The SimServer (catalog, goals and search engine) is read-only and loaded once
+per process. Each ADK session gets its own lightweight `WebAgentTextEnv`
+(browser, current page, instruction text) on first use. Sessions idle for
+longer than `idle_timeout_secs`, and the least recently used ones beyond
+`max_sessions`, are dropped together with their server-side state.
+"""
+
+from collections import OrderedDict
+import threading
+import time
+
+from .web_agent_site.envs.web_agent_text_env import WebAgentTextEnv
+
+
+def _session_id(tool_context):
+    """ADK session id of the call `tool_context` belongs to."""
+    session = getattr(tool_context, "session", None)
+    if session is None:
+        # `ToolContext.session` is not public in every google-adk 1.x release
+        # this package allows; those only reach it through the invocation.
+        session = tool_context._invocation_context.session
+    return session.id
+
+
+class WebShopSessionPool:
+    """Per-session `WebAgentTextEnv`s on top of a shared `SimServer`."""
+
+    def __init__(self, server, max_sessions=512, idle_timeout_secs=30 * 60):
+        self.server = server
+        self.max_sessions = max_sessions
+        self.idle_timeout_secs = idle_timeout_secs
+        self.evicted = 0
+        # session id -> (env, last use), least recently used first.
+        self._envs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """Returns the environment of `session_id`, creating it if needed."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._envs.get(session_id)
+            if entry is not None:
+                self._envs[session_id] = (entry[0], now)
+                self._envs.move_to_end(session_id)
+                return entry[0]
+
+        # Outside the lock: creating an env renders its start page.
+        env = WebAgentTextEnv(observation_mode="text", server=self.server)
+        with self._lock:
+            entry = self._envs.get(session_id)
+            if entry is not None:
+                # Another request for the same session got there first.
+                self.server.end_session(env.session)
+                return entry[0]
+            self._envs[session_id] = (env, now)
+            self._evict(now)
+        return env
+
+    def for_tool_context(self, tool_context):
+        """Returns the environment of the ADK session `tool_context` belongs to."""
+        return self.get(_session_id(tool_context))
+
+    def end(self, session_id):
+        """Drops the environment of `session_id`, if any."""
+        with self._lock:
+            entry = self._envs.pop(session_id, None)
+        if entry is not None:
+            self.server.end_session(entry[0].session)
+
+    def _evict(self, now):
+        while self._envs:
+            session_id, (env, last_used) = next(iter(self._envs.items()))
+            if (
+                len(self._envs) <= self.max_sessions
+                and now - last_used < self.idle_timeout_secs
+            ):
+                break
+            del self._envs[session_id]
+            self.server.end_session(env.session)
+            self.evicted += 1
+
+    def __len__(self):
+        return len(self._envs)
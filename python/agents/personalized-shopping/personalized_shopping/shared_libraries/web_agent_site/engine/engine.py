@@ -15,14 +15,17 @@
 """ """
 
 from ast import literal_eval
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from decimal import Decimal
 import json
 import os
 import random
 import re
+import threading
+import uuid
 
-from flask import render_template_string
+from jinja2 import Environment, FileSystemLoader
+from markupsafe import escape
 from pyserini.search.lucene import LuceneSearcher
 from rich import print
 from tqdm import tqdm
@@ -38,6 +41,8 @@ TEMPLATE_DIR = os.path.join(BASE_DIR, "templates")
 SEARCH_RETURN_N = 50
 PRODUCT_WINDOW = 10
 TOP_K_ATTR = 10
+RESULTS_CACHE_SIZE = 512
+QUERY_CACHE_SIZE = 4096
 
 END_BUTTON = "Buy Now"
 NEXT_PAGE = "Next >"
@@ -52,19 +57,102 @@ ACTION_TO_TEMPLATE = {
 }
 
 
-def map_action_to_html(action, **kwargs):
+class HtmlRenderer:
+    """Renders the WebShop pages without a Flask request context.
+
+    Every template in `template_dir` is compiled once into a Jinja
+    `Environment`; `url_for` builds the same relative URLs Flask would from
+    `url_map` (the routes of the WebShop app). Search result pages are
+    cached by (keywords, page) and shared across sessions: the session id
+    and instruction text are filled into the cached page at render time.
+    """
+
+    def __init__(
+        self,
+        url_map,
+        template_dir=TEMPLATE_DIR,
+        results_cache_size=RESULTS_CACHE_SIZE,
+    ):
+        self._url_adapter = url_map.bind("localhost")
+        self.env = Environment(
+            loader=FileSystemLoader(template_dir),
+            autoescape=True,
+            auto_reload=False,
+        )
+        self.env.globals["url_for"] = self.url_for
+        self.templates = {
+            name: self.env.get_template(name)
+            for name in self.env.list_templates(extensions=["html"])
+        }
+        self.results_cache_size = results_cache_size
+        self.results_cache_hits = 0
+        self.results_cache_misses = 0
+        self._results_cache = OrderedDict()
+        self._results_cache_lock = threading.Lock()
+        # Stand-ins for the per-session values in cached result pages.
+        self._session_placeholder = f"session{uuid.uuid4().hex}"
+        self._instruction_placeholder = f"instruction{uuid.uuid4().hex}"
+
+    def url_for(self, endpoint, **values):
+        return self._url_adapter.build(endpoint, values)
+
+    def render(self, template_name, **context):
+        return self.templates[template_name].render(**context)
+
+    def map_action_to_html(self, action, **kwargs):
+        template_name, context = page_context(action, **kwargs)
+        return self.render(template_name, **context)
+
+    def render_results_page(
+        self, session_id, keywords, page, instruction_text, get_products
+    ):
+        """Search results page, rendered at most once per (keywords, page)
+
+        `get_products` is only called on a cache miss and returns the page's
+        products and the total number of results.
+        """
+        key = (tuple(keywords), page)
+        with self._results_cache_lock:
+            html = self._results_cache.get(key)
+            if html is not None:
+                self._results_cache.move_to_end(key)
+                self.results_cache_hits += 1
+        if html is None:
+            products, total = get_products()
+            html = self.map_action_to_html(
+                "search",
+                session_id=self._session_placeholder,
+                products=products,
+                keywords=keywords,
+                page=page,
+                total=total,
+                instruction_text=self._instruction_placeholder,
+            )
+            with self._results_cache_lock:
+                self.results_cache_misses += 1
+                self._results_cache[key] = html
+                while len(self._results_cache) > self.results_cache_size:
+                    self._results_cache.popitem(last=False)
+        # The session id only appears inside URLs; encode it the way they are.
+        session_url = self.url_for("index", session_id=session_id)
+        session_value = str(escape(session_url.split("session_id=", 1)[1]))
+        return html.replace(self._session_placeholder, session_value).replace(
+            self._instruction_placeholder, str(escape(instruction_text))
+        )
+
+
+def page_context(action, **kwargs):
+    """Template and render context of the page `action` leads to"""
     action_name, action_arg = parse_action(action)
     if action_name == "start":
-        path = os.path.join(TEMPLATE_DIR, "search_page.html")
-        html = render_template_string(
-            read_html_template(path=path),
+        template_name = "search_page.html"
+        context = dict(
             session_id=kwargs["session_id"],
             instruction_text=kwargs["instruction_text"],
         )
     elif action_name == "search":
-        path = os.path.join(TEMPLATE_DIR, "results_page.html")
-        html = render_template_string(
-            read_html_template(path=path),
+        template_name = "results_page.html"
+        context = dict(
             session_id=kwargs["session_id"],
             products=kwargs["products"],
             keywords=kwargs["keywords"],
@@ -73,9 +161,8 @@ def map_action_to_html(action, **kwargs):
             instruction_text=kwargs["instruction_text"],
         )
     elif action_name == "click" and action_arg == END_BUTTON:
-        path = os.path.join(TEMPLATE_DIR, "done_page.html")
-        html = render_template_string(
-            read_html_template(path),
+        template_name = "done_page.html"
+        context = dict(
             session_id=kwargs["session_id"],
             reward=kwargs["reward"],
             asin=kwargs["asin"],
@@ -90,9 +177,8 @@ def map_action_to_html(action, **kwargs):
             product_category=kwargs.get("product_category"),
         )
     elif action_name == "click" and action_arg in ACTION_TO_TEMPLATE:
-        path = os.path.join(TEMPLATE_DIR, ACTION_TO_TEMPLATE[action_arg])
-        html = render_template_string(
-            read_html_template(path),
+        template_name = ACTION_TO_TEMPLATE[action_arg]
+        context = dict(
             session_id=kwargs["session_id"],
             product_info=kwargs["product_info"],
             keywords=kwargs["keywords"],
@@ -102,9 +188,8 @@ def map_action_to_html(action, **kwargs):
             instruction_text=kwargs.get("instruction_text"),
         )
     elif action_name == "click":
-        path = os.path.join(TEMPLATE_DIR, "item_page.html")
-        html = render_template_string(
-            read_html_template(path),
+        template_name = "item_page.html"
+        context = dict(
             session_id=kwargs["session_id"],
             product_info=kwargs["product_info"],
             keywords=kwargs["keywords"],
@@ -116,13 +201,7 @@ def map_action_to_html(action, **kwargs):
         )
     else:
         raise ValueError("Action name not recognized.")
-    return html
-
-
-def read_html_template(path):
-    with open(path) as f:
-        template = f.read()
-    return template
+    return template_name, context
 
 
 def parse_action(action):
@@ -175,9 +254,7 @@ def get_top_n_product_from_keywords(
         top_n_products = [p for p in all_products if p["query"] == query]
     else:
         keywords = " ".join(keywords)
-        hits = search_engine.search(keywords, k=SEARCH_RETURN_N)
-        docs = [search_engine.doc(hit.docid) for hit in hits]
-        top_n_asins = [json.loads(doc.raw())["id"] for doc in docs]
+        top_n_asins = search_engine.search_asins(keywords, k=SEARCH_RETURN_N)
         top_n_products = [
             product_item_dict[asin] for asin in top_n_asins if asin in product_item_dict
         ]
@@ -203,6 +280,48 @@ def generate_product_prices(all_products):
     return product_prices
 
 
+class ProductSearchEngine:
+    """Ranked ASINs for keyword queries over the Lucene product index.
+
+    The index is built from `documents.jsonl` with the product ASIN as the
+    document id, so a hit's `docid` already is the ASIN: no `doc()` lookup
+    (a JVM call plus a JSON decode of the stored raw document) per hit.
+    Ranked lists are cached per (query, k), so paging through the results
+    of a search doesn't run it again.
+    """
+
+    def __init__(self, searcher, cache_size=QUERY_CACHE_SIZE):
+        self.searcher = searcher
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, key):
+        with self._lock:
+            asins = self._cache.get(key)
+            if asins is not None:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+            return asins
+
+    def _store(self, key, asins):
+        with self._lock:
+            self.cache_misses += 1
+            self._cache[key] = asins
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def search_asins(self, query, k=SEARCH_RETURN_N):
+        """ASINs of the top `k` products for `query`, best first"""
+        asins = self._cached((query, k))
+        if asins is None:
+            asins = tuple(hit.docid for hit in self.searcher.search(query, k=k))
+            self._store((query, k), asins)
+        return asins
+
+
 def init_search_engine(num_products=None):
     if num_products == 100:
         indexes = "indexes_100"
@@ -221,7 +340,7 @@ def init_search_engine(num_products=None):
     search_engine = LuceneSearcher(
         os.path.join(BASE_DIR, f"../search_engine/{indexes}")
     )
-    return search_engine
+    return ProductSearchEngine(search_engine)
 
 
 def clean_product_keys(products):
@@ -245,7 +364,8 @@ def clean_product_keys(products):
 
 
 def load_products(filepath, num_products=None, human_goals=True):
-    # TODO: move to preprocessing step -> enforce single source of truth
+    # Run once offline by `product_store.build_product_store`; `SimServer` only
+    # calls this when there is no up-to-date product store.
     with open(filepath) as f:
         products = json.load(f)
     print("Products loaded.")
@@ -264,8 +384,6 @@ def load_products(filepath, num_products=None, human_goals=True):
             human_attributes = json.load(f)
     with open(DEFAULT_ATTR_PATH) as f:
         attributes = json.load(f)
-    with open(HUMAN_ATTR_PATH) as f:
-        human_attributes = json.load(f)
     print("Attributes loaded.")
 
     asins = set()
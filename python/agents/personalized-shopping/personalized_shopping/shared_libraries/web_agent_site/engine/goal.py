@@ -15,14 +15,20 @@
 """Functions for specifying goals and reward calculations."""
 
 from collections import defaultdict
+import functools
 import itertools
 import random
 from rich import print
-import spacy
 from thefuzz import fuzz
 from .normalize import normalize_color
 
-nlp = spacy.load("en_core_web_sm")
+
+@functools.lru_cache(maxsize=None)
+def get_nlp():
+    """spaCy pipeline, loaded on first use: only the reward computation needs it."""
+    import spacy
+
+    return spacy.load("en_core_web_sm")
 
 PRICE_RANGE = [10.0 * i for i in range(1, 100)]
 
@@ -161,6 +167,7 @@ def get_type_reward(purchased_product, goal):
     purchased_type = purchased_product["name"]
     desired_type = goal["name"]
 
+    nlp = get_nlp()
     purchased_type_parse = nlp(purchased_type)
     desired_type_parse = nlp(desired_type)
 
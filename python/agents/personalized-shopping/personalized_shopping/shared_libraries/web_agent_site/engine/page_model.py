@@ -0,0 +1,313 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Structured model of the pages in `templates/`.
+
+The text environment used to render every page to HTML and then parse it
+back with BeautifulSoup (several times per step) to find the clickable
+elements, the visible text and the instruction. `build_page_model` builds
+that information directly from the values a template is rendered with: the
+visible text nodes in document order, exactly as BeautifulSoup's
+html.parser would report them, and the clickables with the attributes the
+server reads. The HTML itself is rendered only if `PageModel.html` is read.
+
+Any change to the markup of a template must be mirrored here;
+`tests/unit/test_page_model.py` checks every template against its model.
+"""
+
+import json
+from pprint import pformat
+
+from jinja2.utils import htmlsafe_json_dumps
+
+# Whitespace BeautifulSoup collapses in text nodes outside <pre>.
+_ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+BUTTON = "button"
+LABEL = "label"
+PRODUCT_LINK = "product-link"
+
+
+class PageModel:
+    """What a WebShop page shows, without its HTML.
+
+    Attributes:
+
+    texts (`list`) -- Visible text nodes as (text, kind) pairs, in document
+      order; kind is `BUTTON`, `LABEL`, `PRODUCT_LINK` or None
+    clickables (`dict`) -- Name used by `click[...]` -> attributes of the
+      clickable element (`class` for buttons and product links, `name` and
+      `value` for buying options)
+    has_search_bar (`bool`) -- Whether the page has the search input
+    instruction_text (`str`) -- Text of the instruction header, if any
+    image_url (`str`) -- Product image of an item page, if any
+    """
+
+    __slots__ = (
+        "texts",
+        "clickables",
+        "has_search_bar",
+        "instruction_text",
+        "image_url",
+        "_render",
+        "_html",
+    )
+
+    def __init__(
+        self,
+        texts,
+        clickables,
+        render,
+        has_search_bar=False,
+        instruction_text=None,
+        image_url=None,
+    ):
+        self.texts = texts
+        self.clickables = clickables
+        self.has_search_bar = has_search_bar
+        self.instruction_text = instruction_text
+        self.image_url = image_url
+        self._render = render
+        self._html = None
+
+    @property
+    def html(self):
+        """The page's HTML, rendered on first access"""
+        if self._html is None:
+            self._html = self._render()
+        return self._html
+
+
+def _attr(obj, name):
+    """`obj.name` as Jinja resolves it: attribute, then item, else undefined."""
+    try:
+        return getattr(obj, name)
+    except AttributeError:
+        pass
+    try:
+        return obj[name]
+    except (TypeError, LookupError):
+        return ""
+
+
+def _text(*parts, pre=False):
+    """The text node BeautifulSoup reads for `parts` rendered side by side.
+
+    Returns None when the node would be empty. Outside <pre>, a node made
+    only of whitespace is collapsed to a newline or a single space.
+    """
+    text = "".join(str(part) for part in parts)
+    if not text:
+        return None
+    if not pre and not text.strip(_ASCII_SPACES):
+        return "\n" if "\n" in text else " "
+    return text
+
+
+class _Builder:
+    """Collects the text nodes and clickables of a page in document order."""
+
+    def __init__(self):
+        self.texts = []
+        self.buttons = []
+        self.product_links = []
+        self.options = []
+
+    def text(self, *parts, kind=None, pre=False):
+        text = _text(*parts, pre=pre)
+        if text is not None:
+            self.texts.append((text, kind))
+        return text or ""
+
+    def button(self, label, classes):
+        self.text(label, kind=BUTTON)
+        self.buttons.append((label, {"class": classes}))
+
+    def product_link(self, asin):
+        text = self.text(asin, kind=PRODUCT_LINK)
+        self.product_links.append((text, {"class": [PRODUCT_LINK]}))
+
+    def option(self, name, value):
+        self.text(value, kind=LABEL)
+        value = str(value)
+        self.options.append(
+            (value, {"type": "radio", "name": str(name), "value": value})
+        )
+
+    def instruction(self, prefix, instruction_text):
+        return prefix + self.text(instruction_text)
+
+    def build(self, render, **kwargs):
+        # Same precedence as the text environment's HTML scraping: buttons,
+        # then product links (both by lowercased text), then buying options.
+        clickables = {}
+        for text, attrs in self.buttons + self.product_links:
+            clickables[text.lower()] = attrs
+        for value, attrs in self.options:
+            clickables[value] = attrs
+        return PageModel(self.texts, clickables, render, **kwargs)
+
+
+def _page_header(page, context):
+    page.text("Instruction:")
+    instruction_text = page.instruction("Instruction:", context["instruction_text"])
+    page.button("Back to Search", ["btn", "btn-success"])
+    return instruction_text
+
+
+def _search_page(page, context):
+    page.text("WebShop")
+    page.text("Instruction: ")
+    instruction_text = page.instruction("Instruction: ", context["instruction_text"])
+    page.button("Search", ["btn", "btn-success"])
+    return dict(has_search_bar=True, instruction_text=instruction_text)
+
+
+def _results_page(page, context):
+    instruction_text = _page_header(page, context)
+    page.text(f"Page {context['page']} (Total results: {context['total']})")
+    if context["page"] > 1:
+        page.button("< Prev", ["btn", "btn-primary"])
+    page.button("Next >", ["btn", "btn-primary"])
+    for item in context["products"]:
+        page.product_link(_attr(item, "asin"))
+        page.text(_attr(item, "Title"))
+        page.text(_attr(item, "Price"))
+    return dict(instruction_text=instruction_text)
+
+
+def _item_page(page, context):
+    product_info = context["product_info"]
+    instruction_text = _page_header(page, context)
+    page.button("< Prev", ["btn", "btn-primary"])
+    for option_name, option_contents in _attr(product_info, "options").items():
+        page.text(option_name)
+        for option_content in option_contents:
+            page.option(option_name, option_content)
+    page.text(_attr(product_info, "Title"))
+    page.text("Price: ", _attr(product_info, "Price"))
+    page.text("Rating: ", _attr(product_info, "Rating"))
+    sub_pages = ["Description", "Features", "Reviews"]
+    if context["show_attrs"]:
+        sub_pages.append("Attributes")
+    for sub_page in sub_pages:
+        page.button(sub_page, ["btn", "btn-primary"])
+    page.button("Buy Now", ["btn", "btn-lg", "purchase"])
+    return dict(
+        instruction_text=instruction_text,
+        image_url=str(_attr(product_info, "MainImage")),
+    )
+
+
+def _sub_page(write_body):
+    def build(page, context):
+        instruction_text = _page_header(page, context)
+        page.button("< Prev", ["btn", "btn-primary"])
+        write_body(page, context["product_info"])
+        return dict(instruction_text=instruction_text)
+
+    return build
+
+
+def _description(page, product_info):
+    page.text(_attr(product_info, "Description"))
+
+
+def _features(page, product_info):
+    for bulletpoint in _attr(product_info, "BulletPoints") or ():
+        page.text(" ", bulletpoint)
+
+
+def _reviews(page, product_info):
+    for review in _attr(product_info, "Reviews") or ():
+        page.text('"', _attr(review, "title"), '"')
+        page.text(_attr(review, "score"))
+        page.text(_attr(review, "body"))
+
+
+def _attributes(page, product_info):
+    for attribute in _attr(product_info, "Attributes") or ():
+        page.text(" ", attribute)
+    page.text(_attr(product_info, "category"))
+    page.text(_attr(product_info, "query"))
+    page.text(_attr(product_info, "product_category"))
+
+
+def _done_page(page, context):
+    goal = context["goal"]
+    page.text("Thank you for shopping with us!")
+    page.text("Your code: ")
+    page.text(context["mturk_code"], pre=True)
+    page.text(" (Paste it in your MTurk interface.)")
+    page.text("Purchased")
+    for label, value in (
+        ("asin", context["asin"]),
+        (
+            "options",
+            htmlsafe_json_dumps(context["options"], json.dumps, sort_keys=True),
+        ),
+        ("attrs", context["purchased_attrs"]),
+        ("category", context["category"]),
+        ("query", context["query"]),
+        ("product category", context["product_category"]),
+    ):
+        page.text(label)
+        page.text(value, pre=True)
+    page.text("Target")
+    for label, name in (
+        ("asin", "asin"),
+        ("options", "goal_options"),
+        ("attrs", "attributes"),
+        ("price upper", "price_upper"),
+        ("instuction text", "instruction_text"),
+        ("category", "category"),
+        ("product category", "product_category"),
+        ("query", "query"),
+    ):
+        page.text(label)
+        page.text(_attr(goal, name), pre=True)
+    page.text("Goal ")
+    page.text(pformat(goal), pre=True)
+    page.text("Reward")
+    page.text("Your score (min 0.0, max 1.0)")
+    page.text(context["reward"], pre=True)
+    page.text("Reward Details ")
+    page.text(pformat(context["reward_info"]), pre=True)
+    return {}
+
+
+_PAGE_BUILDERS = {
+    "search_page.html": _search_page,
+    "results_page.html": _results_page,
+    "item_page.html": _item_page,
+    "description_page.html": _sub_page(_description),
+    "features_page.html": _sub_page(_features),
+    "review_page.html": _sub_page(_reviews),
+    "attributes_page.html": _sub_page(_attributes),
+    "done_page.html": _done_page,
+}
+
+
+def build_page_model(template_name, context, render):
+    """Model of `template_name` rendered with `context`
+
+    Arguments:
+
+    template_name (`str`) -- A template of `templates/`
+    context (`dict`) -- What the template is rendered with (see `page_context`)
+    render (`callable`) -- Returns the page's HTML, called on demand
+    """
+    page = _Builder()
+    extra = _PAGE_BUILDERS[template_name](page, context)
+    return page.build(render, **extra)
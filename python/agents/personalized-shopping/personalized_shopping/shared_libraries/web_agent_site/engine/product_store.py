@@ -0,0 +1,341 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Preprocessed product catalog stored in SQLite.
+
+`load_products` parses the raw JSON catalog (prices, options, attributes)
+every time the environment starts. `build_product_store` runs it once, offline,
+and writes the result together with the product prices and the goals to a
+single SQLite file. `ProductStore` opens that file lazily and decodes a product
+only when its ASIN is requested (and a goal only when a session draws it), so
+`SimServer` starts without reading the catalog.
+"""
+
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+import json
+import os
+import sqlite3
+import threading
+
+from ..utils import BASE_DIR, DEFAULT_ATTR_PATH, HUMAN_ATTR_PATH
+
+# Bump when the layout or the preprocessing in `load_products` changes.
+STORE_FORMAT_VERSION = 2
+
+PRODUCT_CACHE_SIZE = 4096
+
+
+def product_store_path(num_products=None, human_goals=False):
+    """Default location of the store built for `num_products` and the goal type."""
+    size = "all" if num_products is None else num_products
+    goals = "human" if human_goals else "synthetic"
+    return os.path.join(BASE_DIR, f"../data/product_store_{size}_{goals}.sqlite")
+
+
+def _source_paths(filepath, human_goals):
+    """Every file `load_products` reads for this configuration."""
+    paths = [filepath, DEFAULT_ATTR_PATH]
+    if human_goals:
+        paths.append(HUMAN_ATTR_PATH)
+    return paths
+
+
+def _source_signature(filepath, human_goals):
+    signature = []
+    for path in _source_paths(filepath, human_goals):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            signature.append(f"{stat.st_size}:{stat.st_mtime_ns}")
+        else:
+            signature.append("missing")
+    return ",".join(signature)
+
+
+def build_product_store(filepath, store_path, num_products=None, human_goals=False):
+    """Preprocess the catalog at `filepath` and write it to `store_path`."""
+    from .engine import load_products
+    from .goal import get_goals
+
+    all_products, _, product_prices, _ = load_products(
+        filepath=filepath, num_products=num_products, human_goals=human_goals
+    )
+    goals = get_goals(all_products, product_prices, human_goals)
+
+    tmp_path = f"{store_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(
+            """
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE products (
+                idx INTEGER PRIMARY KEY,
+                asin TEXT NOT NULL UNIQUE,
+                price REAL NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE goals (
+                idx INTEGER PRIMARY KEY,
+                weight REAL NOT NULL,
+                data TEXT NOT NULL
+            );
+            """
+        )
+        conn.executemany(
+            "INSERT INTO products (idx, asin, price, data) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    idx,
+                    p["asin"],
+                    product_prices[p["asin"]],
+                    json.dumps(p, separators=(",", ":")),
+                )
+                for idx, p in enumerate(all_products)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO goals (idx, weight, data) VALUES (?, ?, ?)",
+            (
+                (idx, goal["weight"], json.dumps(goal, separators=(",", ":")))
+                for idx, goal in enumerate(goals)
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO meta (key, value) VALUES (?, ?)",
+            [
+                ("format_version", str(STORE_FORMAT_VERSION)),
+                ("source_signature", _source_signature(filepath, human_goals)),
+                ("num_products", json.dumps(num_products)),
+                ("human_goals", json.dumps(bool(human_goals))),
+            ],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, store_path)
+    return len(all_products), len(goals)
+
+
+class ProductStore:
+    """Read-only view of a store written by `build_product_store`.
+
+    The file is opened on first use. `products` (ASIN -> product),
+    `prices` (ASIN -> price) and `all_products` (catalog order) have the same
+    contents as the values returned by `load_products`, and `goals` as
+    `get_goals`; decoded products are kept in a bounded LRU cache.
+    """
+
+    def __init__(self, path, cache_size=PRODUCT_CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        self._conn = None
+        self._lock = threading.RLock()
+        self._cache = OrderedDict()
+        self._meta = None
+        self._len = None
+        self.products = _Products(self)
+        self.prices = _Prices(self)
+        self.all_products = _AllProducts(self)
+        self.goals = Goals(self)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            if self._conn is None:
+                self._conn = sqlite3.connect(
+                    f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+                )
+            return self._conn.execute(sql, params).fetchall()
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            self._meta = dict(self._query("SELECT key, value FROM meta"))
+        return self._meta
+
+    @property
+    def format_version(self):
+        return int(self.meta["format_version"])
+
+    def is_stale(self, source_path):
+        """True if the store was built by other code or from different source files
+        (the catalog at `source_path` or the goal attribute files)."""
+        if self.format_version != STORE_FORMAT_VERSION:
+            return True
+        if not os.path.exists(source_path):
+            # Deployments may ship the store without the raw catalog.
+            return False
+        human_goals = json.loads(self.meta["human_goals"])
+        return self.meta["source_signature"] != _source_signature(
+            source_path, human_goals
+        )
+
+    def __len__(self):
+        if self._len is None:
+            self._len = self._query("SELECT count(*) FROM products")[0][0]
+        return self._len
+
+    def _decode(self, asin, data):
+        product = json.loads(data)
+        with self._lock:
+            self._cache[asin] = product
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return product
+
+    def get_product(self, asin):
+        with self._lock:
+            product = self._cache.get(asin)
+            if product is not None:
+                self._cache.move_to_end(asin)
+                return product
+        rows = self._query("SELECT data FROM products WHERE asin = ?", (asin,))
+        if not rows:
+            raise KeyError(asin)
+        return self._decode(asin, rows[0][0])
+
+    def get_product_at(self, idx):
+        rows = self._query("SELECT asin, data FROM products WHERE idx = ?", (idx,))
+        if not rows:
+            raise IndexError(idx)
+        asin, data = rows[0]
+        with self._lock:
+            product = self._cache.get(asin)
+        return product if product is not None else self._decode(asin, data)
+
+    def get_price(self, asin):
+        rows = self._query("SELECT price FROM products WHERE asin = ?", (asin,))
+        if not rows:
+            raise KeyError(asin)
+        return rows[0][0]
+
+    def asins(self):
+        return [asin for (asin,) in self._query("SELECT asin FROM products ORDER BY idx")]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class _Products(Mapping):
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, asin):
+        return self._store.get_product(asin)
+
+    def __contains__(self, asin):
+        try:
+            self._store.get_product(asin)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self._store.asins())
+
+    def __len__(self):
+        return len(self._store)
+
+
+class _Prices(Mapping):
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, asin):
+        return self._store.get_price(asin)
+
+    def __iter__(self):
+        return iter(self._store.asins())
+
+    def __len__(self):
+        return len(self._store)
+
+
+class _AllProducts(Sequence):
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        return self._store.get_product_at(idx)
+
+    def __len__(self):
+        return len(self._store)
+
+
+class Goals(Sequence):
+    """Goals of the store, decoded when first accessed.
+
+    `take(order)` returns the goals reordered (or subset) without decoding
+    them, and `weights` has the goal weights in the same order.
+    """
+
+    def __init__(self, store, order=None):
+        self._store = store
+        self._order = order
+        self._decoded = {}
+        self._weights = None
+
+    @property
+    def order(self):
+        if self._order is None:
+            self._order = list(range(self._store._query("SELECT count(*) FROM goals")[0][0]))
+        return self._order
+
+    @property
+    def weights(self):
+        if self._weights is None:
+            weights = [w for (w,) in self._store._query("SELECT weight FROM goals ORDER BY idx")]
+            self._weights = [weights[idx] for idx in self.order]
+        return self._weights
+
+    def take(self, indices):
+        goals = Goals(self._store, [self.order[i] for i in indices])
+        # Share decoded goals: sessions may update the goal they drew.
+        goals._decoded = self._decoded
+        return goals
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        idx = self.order[i]
+        goal = self._decoded.get(idx)
+        if goal is None:
+            rows = self._store._query("SELECT data FROM goals WHERE idx = ?", (idx,))
+            goal = self._decoded[idx] = json.loads(rows[0][0])
+        return goal
+
+    def __len__(self):
+        return len(self.order)
+
+
+def open_product_store(source_path, num_products=None, human_goals=False, path=None):
+    """Opens the store for this configuration, or returns None if there is no
+    up-to-date one (the caller then falls back to `load_products`)."""
+    path = path or product_store_path(num_products, human_goals)
+    if not os.path.exists(path):
+        return None
+    store = ProductStore(path)
+    if store.is_stale(source_path):
+        print(f"Product store {path} is out of date; rebuild it with build_product_store.py.")
+        store.close()
+        return None
+    return store
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 from collections import defaultdict
+from functools import partial
 import json
 import random
 import string
@@ -30,14 +31,17 @@ from ..engine.engine import (
     END_BUTTON,
     NEXT_PAGE,
     PREV_PAGE,
+    HtmlRenderer,
     get_product_per_page,
     get_top_n_product_from_keywords,
     init_search_engine,
     load_products,
-    map_action_to_html,
+    page_context,
     parse_action,
 )
 from ..engine.goal import get_goals, get_reward
+from ..engine.page_model import BUTTON, LABEL, PRODUCT_LINK, build_page_model
+from ..engine.product_store import Goals, open_product_store
 from ..utils import (
     DEFAULT_FILE_PATH,
     FEAT_CONV,
@@ -45,7 +49,6 @@ from ..utils import (
     random_idx,
 )
 
-
 app = Flask(__name__)
 
 
@@ -72,6 +75,7 @@ class WebAgentTextEnv(gym.Env):
         session
         session_prefix
         show_attrs
+        product_store_path
         """
         super(WebAgentTextEnv, self).__init__()
         self.observation_mode = observation_mode
@@ -89,6 +93,7 @@ class WebAgentTextEnv(gym.Env):
                 self.kwargs.get("num_products"),
                 self.kwargs.get("human_goals"),
                 self.kwargs.get("show_attrs", False),
+                self.kwargs.get("product_store_path"),
             )
             if server is None
             else server
@@ -146,47 +151,33 @@ class WebAgentTextEnv(gym.Env):
                 text_list.append(self.prev_obs[-i])
         state = " [SEP] ".join(text_list[::-1])
         self.prev_obs.append(ob)
+        # Only the last `num_prev_obs`/`num_prev_actions` entries are read back.
+        del self.prev_obs[: max(len(self.prev_obs) - self.num_prev_obs, 0)]
+        del self.prev_actions[: max(len(self.prev_actions) - self.num_prev_actions, 0)]
         return state, status["reward"], status["done"], info
 
     def get_available_actions(self):
         """Returns list of available actions at the current step"""
-        html_obj = self._parse_html()
-
-        # Collect search bar, buttons, links, and options as clickables
-        search_bar = html_obj.find(id="search_input")
-        has_search_bar = True if search_bar is not None else False
-        buttons = html_obj.find_all(class_="btn")
-        product_links = html_obj.find_all(class_="product-link")
-        buying_options = html_obj.select('input[type="radio"]')
-
-        self.text_to_clickable = {
-            f"{b.get_text()}".lower(): b for b in buttons + product_links
-        }
-        for opt in buying_options:
-            opt_value = opt.get("value")
-            self.text_to_clickable[f"{opt_value}"] = opt
+        # Search bar, buttons, links, and options, from the page model
+        page = self.browser.page
+        self.text_to_clickable = page.clickables
         return dict(
-            has_search_bar=has_search_bar,
+            has_search_bar=page.has_search_bar,
             clickables=list(self.text_to_clickable.keys()),
         )
 
     def get_image(self):
-        """Scrape image from page HTML and return as a list of pixel values"""
-        html_obj = self._parse_html(self.browser.page_source)
-        image_url = html_obj.find(id="product-image")
-        if image_url is not None:
-            image_url = image_url["src"]
-            if image_url in self.ids:
-                image_idx = self.ids[image_url]
-                image = self.feats[image_idx]
-                return image
+        """Look up the image of the current product page as a list of pixel values"""
+        image_url = self.browser.page.image_url
+        if image_url is not None and image_url in self.ids:
+            image_idx = self.ids[image_url]
+            image = self.feats[image_idx]
+            return image
         return torch.zeros(512)
 
     def get_instruction_text(self):
         """Get corresponding instruction text for current environment session"""
-        html_obj = self._parse_html(self.browser.page_source)
-        instruction_text = html_obj.find(id="instruction-text").h4.text
-        return instruction_text
+        return self.browser.page.instruction_text
 
     def _parse_html(self, html=None):
         """Returns web request result wrapped in BeautifulSoup object
@@ -204,15 +195,14 @@ class WebAgentTextEnv(gym.Env):
     @property
     def observation(self):
         """Compiles state into either the `html` or `text` observation mode"""
-        html = self.state["html"]
         if self.observation_mode == "html":
-            return html
+            return self.browser.page_source
         elif self.observation_mode == "text":
-            return self.convert_html_to_text(html, simple=True)
+            return self.convert_page_to_text(self.browser.page, simple=True)
         elif self.observation_mode == "text_rich":
-            return self.convert_html_to_text(html, simple=False)
+            return self.convert_page_to_text(self.browser.page, simple=False)
         elif self.observation_mode == "url":
-            return self.state["url"]
+            return self.browser.current_url
         else:
             raise ValueError(f"Observation mode {self.observation_mode} not supported.")
 
@@ -232,25 +222,43 @@ class WebAgentTextEnv(gym.Env):
     def convert_html_to_text(self, html, simple=False):
         """Strip HTML of tags and add separators to convert observation into simple mode"""
         texts = self._parse_html(html).findAll(text=True)
-        visible_texts = filter(tag_visible, texts)
+        visible_texts = []
+        for t in filter(tag_visible, texts):
+            if t.parent.name == "button":
+                kind = BUTTON
+            elif t.parent.name == "label":
+                kind = LABEL
+            elif t.parent.get("class") == ["product-link"]:
+                kind = PRODUCT_LINK
+            else:
+                kind = None
+            visible_texts.append((str(t), kind))
+        return self.convert_texts(visible_texts, simple=simple)
+
+    def convert_page_to_text(self, page, simple=False):
+        """Text observation of a page model, as `convert_html_to_text` makes from its HTML"""
+        return self.convert_texts(page.texts, simple=simple)
+
+    def convert_texts(self, visible_texts, simple=False):
+        """Join the (text, kind) pairs of a page's visible text into an observation"""
         if simple:
             # For `simple` mode, return just [SEP] separators
-            return " [SEP] ".join(t.strip() for t in visible_texts if t != "\n")
+            return " [SEP] ".join(t.strip() for t, _ in visible_texts if t != "\n")
         else:
             # Otherwise, return an observation with tags mapped to specific, unique separators
             observation = ""
-            for t in visible_texts:
+            for t, kind in visible_texts:
                 if t == "\n":
                     continue
-                if t.parent.name == "button":  # button
+                if kind == BUTTON:  # button
                     processed_t = f"[button] {t} [button_]"
-                elif t.parent.name == "label":  # options
-                    if f'"{t}"' in self.state["url"]:
+                elif kind == LABEL:  # options
+                    if f'"{t}"' in self.browser.current_url:
                         processed_t = f"  [clicked button] {t} [clicked button_]"
                         observation = f"You have clicked {t}.\n" + observation
                     else:
                         processed_t = f"  [button] {t} [button_]"
-                elif t.parent.get("class") == ["product-link"]:  # product asins
+                elif kind == PRODUCT_LINK:  # product asins
                     if f"{t}" in self.server.user_sessions[self.session]["asins"]:
                         processed_t = f"\n[clicked button] {t} [clicked button_]"
                     else:
@@ -293,6 +301,13 @@ class WebAgentTextEnv(gym.Env):
         pass
 
 
+def goal_weights(goals):
+    """Weights of `goals`, read without decoding them when they come from a product store."""
+    if isinstance(goals, Goals):
+        return goals.weights
+    return [goal["weight"] for goal in goals]
+
+
 def tag_visible(element):
     ignore = {"style", "script", "head", "title", "meta", "[document]"}
     return element.parent.name not in ignore and not isinstance(element, Comment)
@@ -310,6 +325,7 @@ class SimServer:
         num_products=None,
         human_goals=0,
         show_attrs=False,
+        product_store_path=None,
     ):
         """Constructor for simulated server serving WebShop application
 
@@ -321,23 +337,43 @@ class SimServer:
         num_products (`int`) -- Number of products to search across
         human_goals (`bool`) -- If true, load human goals; otherwise, load synthetic
           goals
+        product_store_path (`str`) -- Preprocessed catalog built by
+          `build_product_store` (default: `product_store_path(num_products, human_goals)`);
+          without an up-to-date one the raw JSON catalog is loaded
         """
         # Load all products, goals, and search engine
         self.base_url = base_url
-        self.all_products, self.product_item_dict, self.product_prices, _ = (
-            load_products(
-                filepath=file_path,
-                num_products=num_products,
-                human_goals=human_goals,
-            )
+        store = open_product_store(
+            file_path, num_products, human_goals, path=product_store_path
         )
+        if store is not None:
+            # Products are decoded on demand by ASIN.
+            self.all_products = store.all_products
+            self.product_item_dict = store.products
+            self.product_prices = store.prices
+            self.goals = store.goals
+        else:
+            self.all_products, self.product_item_dict, self.product_prices, _ = (
+                load_products(
+                    filepath=file_path,
+                    num_products=num_products,
+                    human_goals=human_goals,
+                )
+            )
+            self.goals = get_goals(self.all_products, self.product_prices, human_goals)
         self.search_engine = init_search_engine(num_products=num_products)
-        self.goals = get_goals(self.all_products, self.product_prices, human_goals)
+        self.renderer = HtmlRenderer(app.url_map)
         self.show_attrs = show_attrs
 
         # Fix outcome for random shuffling of goals
         random.seed(233)
-        random.shuffle(self.goals)
+        if store is not None:
+            # Same permutation as shuffling the list, without decoding the goals.
+            order = list(range(len(self.goals)))
+            random.shuffle(order)
+            self.goals = self.goals.take(order)
+        else:
+            random.shuffle(self.goals)
 
         # Apply `filter_goals` parameter if exists to select speific goal(s)
         if filter_goals is not None:
@@ -347,7 +383,7 @@ class SimServer:
 
         # Imposes `limit` on goals via random selection
         if limit_goals != -1 and limit_goals < len(self.goals):
-            self.weights = [goal["weight"] for goal in self.goals]
+            self.weights = goal_weights(self.goals)
             self.cum_weights = [0] + np.cumsum(self.weights).tolist()
             idxs = []
             while len(idxs) < limit_goals:
@@ -358,24 +394,23 @@ class SimServer:
         print(f"Loaded {len(self.goals)} goals.")
 
         # Set extraneous housekeeping variables
-        self.weights = [goal["weight"] for goal in self.goals]
+        self.weights = goal_weights(self.goals)
         self.cum_weights = [0] + np.cumsum(self.weights).tolist()
         self.user_sessions = dict()
         self.search_time = 0
         self.render_time = 0
         self.sample_time = 0
-        self.assigned_instruction_text = None  # TODO: very hacky, should remove
 
     @app.route("/", methods=["GET", "POST"])
     def index(self, session_id, **kwargs):
         """Redirect to the search page with the given session ID"""
-        html = map_action_to_html(
+        page = self.build_page(
             "start",
             session_id=session_id,
             instruction_text=kwargs["instruction_text"],
         )
         url = f"{self.base_url}/{session_id}"
-        return html, url
+        return page, url
 
     @app.route("/", methods=["GET", "POST"])
     def search_results(self, session_id, **kwargs):
@@ -404,6 +439,7 @@ class SimServer:
 
         # Get product list from search result asins and get list of corresponding URLs
         products = get_product_per_page(top_n_products, page)
+        total = len(top_n_products)
 
         keywords_url_string = "+".join(keywords)
         url = (
@@ -411,22 +447,34 @@ class SimServer:
             f"{keywords_url_string}/{page}"
         )
 
-        # Render HTML search page and record amount of time taken
+        # Build search page and record amount of time taken
         old_time = time.time()
-        html = map_action_to_html(
+        # This is used for rendering the page
+        instruction_text = session.get("assigned_instruction_text")
+        template_name, context = page_context(
             "search",
             session_id=session_id,
             products=products,
             keywords=session["keywords"],
             page=page,
-            total=len(top_n_products),
-            # This is used for reward computation
-            # instruction_text=session['goal']['instruction_text'],
-            # This is used for rendering the page
-            instruction_text=self.assigned_instruction_text,
+            total=total,
+            instruction_text=instruction_text,
         )
+        if keywords[0] == "<r>":
+            # Random results can't be reused.
+            render = partial(self.renderer.render, template_name, **context)
+        else:
+            render = partial(
+                self.renderer.render_results_page,
+                session_id,
+                keywords,
+                page,
+                instruction_text,
+                lambda: (products, total),
+            )
+        page_model = build_page_model(template_name, context, render)
         self.render_time += time.time() - old_time
-        return html, url
+        return page_model, url
 
     @app.route("/", methods=["GET", "POST"])
     def item_page(self, session_id, **kwargs):
@@ -460,7 +508,7 @@ class SimServer:
             f'{session["page"]}/{option_string}'
         )
 
-        html = map_action_to_html(
+        page = self.build_page(
             "click",
             session_id=session_id,
             product_info=product_info,
@@ -471,10 +519,10 @@ class SimServer:
             # This is used for reward computation
             # instruction_text=session['goal']['instruction_text'],
             # This is used for rendering the page
-            instruction_text=self.assigned_instruction_text,
+            instruction_text=session.get("assigned_instruction_text"),
             show_attrs=self.show_attrs,
         )
-        return html, url
+        return page, url
 
     @app.route("/", methods=["GET", "POST"])
     def item_sub_page(self, session_id, **kwargs):
@@ -498,7 +546,7 @@ class SimServer:
             f'{session["asin"]}/{keywords_url_string}/{session["page"]}/'
             f'{clickable_name}/{session["options"]}'
         )
-        html = map_action_to_html(
+        page = self.build_page(
             f"click[{clickable_name}]",
             session_id=session_id,
             product_info=product_info,
@@ -509,9 +557,9 @@ class SimServer:
             # This is used for reward computation
             # instruction_text=session['goal']['instruction_text'],
             # This is used for rendering the page
-            instruction_text=self.assigned_instruction_text,
+            instruction_text=session.get("assigned_instruction_text"),
         )
-        return html, url
+        return page, url
 
     @app.route("/", methods=["GET", "POST"])
     def done(self, session_id, **kwargs):
@@ -539,7 +587,7 @@ class SimServer:
             f"{self.base_url}/done/{session_id}/"
             f'{session["asin"]}/{session["options"]}'
         )
-        html = map_action_to_html(
+        page = self.build_page(
             f"click[{END_BUTTON}]",
             session_id=session_id,
             reward=reward,
@@ -548,111 +596,124 @@ class SimServer:
             # This is used for reward computation
             # instruction_text=session['goal']['instruction_text'],
             # This is used for rendering the page
-            instruction_text=self.assigned_instruction_text,
+            instruction_text=session.get("assigned_instruction_text"),
         )
-        return html, url, reward
+        return page, url, reward
 
     def receive(self, session_id, current_url, session_int=None, **kwargs):
         """Map action to the corresponding page"""
         status = dict(reward=0.0, done=False)
 
-        with app.app_context(), app.test_request_context():
-            # Create/determine goal, instruction_text from current session
-            if session_id not in self.user_sessions:
-                idx = (
-                    session_int
-                    if (session_int is not None and isinstance(session_int, int))
-                    else random_idx(self.cum_weights)
+        # Create/determine goal, instruction_text from current session
+        if session_id not in self.user_sessions:
+            idx = (
+                session_int
+                if (session_int is not None and isinstance(session_int, int))
+                else random_idx(self.cum_weights)
+            )
+            goal = self.goals[idx]
+            instruction_text = goal["instruction_text"]
+            self.user_sessions[session_id] = {"goal": goal, "done": False}
+        else:
+            instruction_text = self.user_sessions[session_id]["goal"][
+                "instruction_text"
+            ]
+        session = self.user_sessions[session_id]
+        if session.get("assigned_instruction_text") is not None:
+            instruction_text = session["assigned_instruction_text"]
+            # Goals are shared by all sessions: override on a copy.
+            session["goal"] = {
+                **session["goal"],
+                "instruction_text": instruction_text,
+            }
+
+        if not kwargs:
+            # If no action, reset the session variables
+            kwargs["instruction_text"] = instruction_text
+            page, url = self.index(session_id, **kwargs)
+            self.user_sessions[session_id].update(
+                {
+                    "keywords": None,
+                    "page": None,
+                    "asin": None,
+                    "asins": set(),
+                    "options": dict(),
+                    "actions": defaultdict(int),
+                }
+            )
+        elif "keywords" in kwargs:
+            # If search keywords are available, run a search
+            page, url = self.search_results(session_id, **kwargs)
+        elif "clickable_name" in kwargs:
+            clickable_name = kwargs["clickable_name"].lower()
+            if clickable_name == END_BUTTON.lower():
+                # If "buy now" clicked, calculate reward and flag session as terminated
+                page, url, reward = self.done(session_id, **kwargs)
+                status["reward"] = reward
+                status["done"] = True
+            elif clickable_name == BACK_TO_SEARCH.lower():
+                # If "back to search" clicked, recursively reset the session back to search page
+                page, url, status = self.receive(session_id, current_url)
+            elif (
+                clickable_name == NEXT_PAGE.lower()
+                and self.get_page_name(current_url) == "search_results"
+            ):
+                # If "next page" clicked from search results, re-render with `page` enumerated
+                page, url, status = self.receive(
+                    session_id,
+                    current_url,
+                    keywords=session["keywords"],
+                    page=session["page"] + 1,
                 )
-                goal = self.goals[idx]
-                instruction_text = goal["instruction_text"]
-                self.user_sessions[session_id] = {"goal": goal, "done": False}
-            else:
-                instruction_text = self.user_sessions[session_id]["goal"][
-                    "instruction_text"
-                ]
-            if self.assigned_instruction_text is not None:
-                instruction_text = (
-                    self.assigned_instruction_text
-                )  # TODO: very hacky, should remove
-                self.user_sessions[session_id]["goal"][
-                    "instruction_text"
-                ] = instruction_text
-            session = self.user_sessions[session_id]
-
-            if not kwargs:
-                # If no action, reset the session variables
-                kwargs["instruction_text"] = instruction_text
-                html, url = self.index(session_id, **kwargs)
-                self.user_sessions[session_id].update(
-                    {
-                        "keywords": None,
-                        "page": None,
-                        "asin": None,
-                        "asins": set(),
-                        "options": dict(),
-                        "actions": defaultdict(int),
-                    }
+            elif (
+                clickable_name == PREV_PAGE.lower()
+                and self.get_page_name(current_url) == "search_results"
+            ):
+                # If "prev page" clicked from search results, re-render with `page` denumerated
+                page, url, status = self.receive(
+                    session_id,
+                    current_url,
+                    keywords=session["keywords"],
+                    page=session["page"] - 1,
                 )
-            elif "keywords" in kwargs:
-                # If search keywords are available, run a search
-                html, url = self.search_results(session_id, **kwargs)
-            elif "clickable_name" in kwargs:
-                clickable_name = kwargs["clickable_name"].lower()
-                if clickable_name == END_BUTTON.lower():
-                    # If "buy now" clicked, calculate reward and flag session as terminated
-                    html, url, reward = self.done(session_id, **kwargs)
-                    status["reward"] = reward
-                    status["done"] = True
-                elif clickable_name == BACK_TO_SEARCH.lower():
-                    # If "back to search" clicked, recursively reset the session back to search page
-                    html, url, status = self.receive(session_id, current_url)
-                elif (
-                    clickable_name == NEXT_PAGE.lower()
-                    and self.get_page_name(current_url) == "search_results"
-                ):
-                    # If "next page" clicked from search results, re-render with `page` enumerated
-                    html, url, status = self.receive(
-                        session_id,
-                        current_url,
-                        keywords=session["keywords"],
-                        page=session["page"] + 1,
-                    )
-                elif (
-                    clickable_name == PREV_PAGE.lower()
-                    and self.get_page_name(current_url) == "search_results"
-                ):
-                    # If "prev page" clicked from search results, re-render with `page` denumerated
-                    html, url, status = self.receive(
-                        session_id,
-                        current_url,
-                        keywords=session["keywords"],
-                        page=session["page"] - 1,
-                    )
-                elif (
-                    clickable_name == PREV_PAGE.lower()
-                    and self.get_page_name(current_url) == "item_sub_page"
-                ):
-                    # If "prev page" clicked from sub page, return to corresponding item page
-                    html, url = self.item_page(session_id, **kwargs)
-                elif (
-                    clickable_name == PREV_PAGE.lower()
-                    and self.get_page_name(current_url) == "item_page"
-                ):
-                    # If "prev page" clicked from item page, return to search results page
-                    html, url = self.search_results(
-                        session_id,
-                        keywords=session["keywords"],
-                        page=session["page"],
-                        **kwargs,
-                    )
-                elif clickable_name in [k.lower() for k in ACTION_TO_TEMPLATE]:
-                    # Render item_sub_page if clickable is description, features, or reviews
-                    html, url = self.item_sub_page(session_id, **kwargs)
-                else:
-                    # Otherwise, render current item page
-                    html, url = self.item_page(session_id, **kwargs)
-            return html, url, status
+            elif (
+                clickable_name == PREV_PAGE.lower()
+                and self.get_page_name(current_url) == "item_sub_page"
+            ):
+                # If "prev page" clicked from sub page, return to corresponding item page
+                page, url = self.item_page(session_id, **kwargs)
+            elif (
+                clickable_name == PREV_PAGE.lower()
+                and self.get_page_name(current_url) == "item_page"
+            ):
+                # If "prev page" clicked from item page, return to search results page
+                page, url = self.search_results(
+                    session_id,
+                    keywords=session["keywords"],
+                    page=session["page"],
+                    **kwargs,
+                )
+            elif clickable_name in [k.lower() for k in ACTION_TO_TEMPLATE]:
+                # Render item_sub_page if clickable is description, features, or reviews
+                page, url = self.item_sub_page(session_id, **kwargs)
+            else:
+                # Otherwise, render current item page
+                page, url = self.item_page(session_id, **kwargs)
+        return page, url, status
+
+    def build_page(self, action, **kwargs):
+        """Model of the page `action` leads to; its HTML is rendered on demand"""
+        template_name, context = page_context(action, **kwargs)
+        render = partial(self.renderer.render, template_name, **context)
+        return build_page_model(template_name, context, render)
+
+    def set_instruction_text(self, session_id, instruction_text):
+        """Instruction shown on the pages rendered for `session_id` from now on"""
+        self.user_sessions[session_id]["assigned_instruction_text"] = instruction_text
+
+    def end_session(self, session_id):
+        """Forget the state of `session_id`"""
+        self.user_sessions.pop(session_id, None)
 
     def get_page_name(self, url):
         """Determine which page (i.e.
@@ -674,20 +735,25 @@ class SimBrowser:
     def __init__(self, server):
         self.server = server
         self.current_url = None
-        self.page_source = None
+        self.page = None
         self.session_id = None
 
+    @property
+    def page_source(self):
+        """HTML of the current page, rendered on first access"""
+        return self.page.html if self.page is not None else None
+
     def get(self, url, session_id=None, session_int=None):
         """Set browser variables to corresponding link, page HTML for URL"""
         self.session_id = url.split("/")[-1] if session_id is None else session_id
-        self.page_source, _, _ = self.server.receive(
+        self.page, _, _ = self.server.receive(
             self.session_id, self.current_url, session_int=session_int
         )
         self.current_url = url
 
     def click(self, clickable_name, text_to_clickable):
         """Wrapper for `receive` handler for performing click action on current page"""
-        self.page_source, self.current_url, status = self.server.receive(
+        self.page, self.current_url, status = self.server.receive(
             self.session_id,
             current_url=self.current_url,
             clickable_name=clickable_name,
@@ -699,7 +765,7 @@ class SimBrowser:
         """Wrapper for `receive` handler for performing search action on current page"""
         if isinstance(keywords, str):
             keywords = keywords.split(" ")
-        self.page_source, self.current_url, status = self.server.receive(
+        self.page, self.current_url, status = self.server.receive(
             self.session_id,
             current_url=self.current_url,
             keywords=keywords,
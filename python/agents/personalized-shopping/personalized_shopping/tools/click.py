@@ -15,7 +15,7 @@
 from google.adk.tools import ToolContext
 from google.genai import types
 
-from ..shared_libraries.init_env import webshop_env
+from ..shared_libraries.init_env import webshop_sessions
 
 
 async def click(button_name: str, tool_context: ToolContext) -> str:
@@ -28,6 +28,7 @@ async def click(button_name: str, tool_context: ToolContext) -> str:
     Returns:
       str: The webpage after clicking the button.
     """
+    webshop_env = webshop_sessions.for_tool_context(tool_context)
     status = {"reward": None, "done": False}
     action_string = f"click[{button_name}]"
     _, status["reward"], status["done"], _ = webshop_env.step(action_string)
@@ -44,7 +45,7 @@ async def click(button_name: str, tool_context: ToolContext) -> str:
     print("#" * 50)
 
     if button_name == "Back to Search":
-        webshop_env.server.assigned_instruction_text = "Back to Search"
+        webshop_env.server.set_instruction_text(webshop_env.session, "Back to Search")
 
     # Show artifact in the UI.
     try:
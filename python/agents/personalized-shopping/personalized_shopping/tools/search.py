@@ -15,7 +15,7 @@
 from google.adk.tools import ToolContext
 from google.genai import types
 
-from ..shared_libraries.init_env import webshop_env
+from ..shared_libraries.init_env import webshop_sessions
 
 
 async def search(keywords: str, tool_context: ToolContext) -> str:
@@ -28,9 +28,10 @@ async def search(keywords: str, tool_context: ToolContext) -> str:
     Returns:
       str: The search result displayed in a webpage.
     """
+    webshop_env = webshop_sessions.for_tool_context(tool_context)
     status = {"reward": None, "done": False}
     action_string = f"search[{keywords}]"
-    webshop_env.server.assigned_instruction_text = f"Find me {keywords}."
+    webshop_env.server.set_instruction_text(webshop_env.session, f"Find me {keywords}.")
     print(f"env instruction_text: {webshop_env.instruction_text}")
     _, status["reward"], status["done"], _ = webshop_env.step(action_string)
 
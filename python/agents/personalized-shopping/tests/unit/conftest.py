@@ -0,0 +1,175 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Fixtures for the WebShop unit tests: a small catalog and a stand-in searcher.
+
+The tests import `shared_libraries` directly: importing the
+`personalized_shopping` package loads the full 50k-product environment.
+"""
+
+import json
+import os
+import re
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "..", "personalized_shopping")
+)
+
+from shared_libraries.web_agent_site.engine import engine, product_store
+from shared_libraries.web_agent_site.envs import web_agent_text_env
+
+QUERIES = [
+    ("fashion", "women dress", "Clothing › Women › Dresses"),
+    ("beauty", "shampoo", "Beauty › Hair Care › Shampoo"),
+    ("grocery", "coffee beans", "Grocery › Beverages › Coffee"),
+]
+COLORS = ["red", "navy blue", "black", "floral"]
+
+
+class FakeHit:
+    def __init__(self, docid, score):
+        self.docid = docid
+        self.score = score
+
+
+class FakeDocument:
+    def __init__(self, raw):
+        self._raw = raw
+
+    def raw(self):
+        return self._raw
+
+
+class FakeSearcher:
+    """Stand-in for `LuceneSearcher`: ranks documents by the number of words
+    they share with the query. Like the Lucene index, a hit's `docid` is the
+    product ASIN."""
+
+    def __init__(self, products):
+        self.documents = [
+            (p["asin"], set(re.findall(r"\w+", f"{p['name']} {p['query']}".lower())))
+            for p in products
+        ]
+        self.search_calls = 0
+        self.doc_calls = 0
+
+    def search(self, query, k=10):
+        self.search_calls += 1
+        words = set(re.findall(r"\w+", query.lower()))
+        ranked = sorted(
+            (
+                (len(words & document_words), -i, asin)
+                for i, (asin, document_words) in enumerate(self.documents)
+            ),
+            reverse=True,
+        )
+        return [FakeHit(asin, score) for score, _, asin in ranked[:k] if score]
+
+    def doc(self, docid):
+        self.doc_calls += 1
+        return FakeDocument(json.dumps({"id": docid}))
+
+
+def make_products(num_products):
+    """Raw catalog entries in the format of `items_shuffle.json`."""
+    products = []
+    for i in range(num_products):
+        category, query, product_category = QUERIES[i % len(QUERIES)]
+        color = COLORS[i % len(COLORS)]
+        products.append(
+            {
+                "asin": f"B{i:09d}",
+                "name": f"{color} {query} model {i}",
+                "full_description": f"A {query} & more.\nModel {i}.",
+                "small_description": [f"Feature {j} of model {i}" for j in range(3)],
+                "pricing": f"${10 + i}.99" if i % 3 else f"${10 + i}.00 - ${20 + i}.00",
+                "customization_options": (
+                    {
+                        "Color": [
+                            {"value": c, "image": f"https://img/{i}/{j}.jpg"}
+                            for j, c in enumerate(COLORS[:2])
+                        ],
+                        "Size": [{"value": s} for s in ["Small", "X-Large"]],
+                    }
+                    if i % 2
+                    else None
+                ),
+                "images": [f"https://img/B{i:09d}.jpg"],
+                "category": category,
+                "query": query,
+                "product_category": product_category,
+            }
+        )
+    return products
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    """`items_shuffle.json` and the goal attribute files for 40 products."""
+    products = make_products(40)
+    attributes = {
+        p["asin"]: {
+            "attributes": [f"{p['query']} attribute", "long lasting"],
+            "instruction": f"i need a {p['query']}",
+            "instruction_attributes": ["long lasting"],
+        }
+        for p in products
+    }
+    human_attributes = {
+        p["asin"]: [
+            {
+                "instruction": f"i want a {p['name']}.",
+                "instruction_attributes": ["long lasting"],
+                "instruction_options": {},
+            }
+        ]
+        for p in products[::4]
+    }
+    paths = SimpleNamespace(
+        items=tmp_path / "items_shuffle.json",
+        attributes=tmp_path / "items_ins_v2.json",
+        human_attributes=tmp_path / "items_human_ins.json",
+    )
+    for path, data in [
+        (paths.items, products),
+        (paths.attributes, attributes),
+        (paths.human_attributes, human_attributes),
+    ]:
+        path.write_text(json.dumps(data))
+    for module in (engine, product_store):
+        monkeypatch.setattr(module, "DEFAULT_ATTR_PATH", str(paths.attributes))
+        monkeypatch.setattr(module, "HUMAN_ATTR_PATH", str(paths.human_attributes))
+    return SimpleNamespace(
+        dir=tmp_path, path=str(paths.items), products=products, **vars(paths)
+    )
+
+
+@pytest.fixture
+def server(catalog, monkeypatch):
+    """A `SimServer` over `catalog`, searching it with a `FakeSearcher`."""
+    searcher = FakeSearcher(catalog.products)
+    monkeypatch.setattr(
+        web_agent_text_env,
+        "init_search_engine",
+        lambda num_products=None: engine.ProductSearchEngine(searcher),
+    )
+    return web_agent_text_env.SimServer(
+        "http://127.0.0.1:3000",
+        catalog.path,
+        product_store_path=str(catalog.dir / "no_store.sqlite"),
+    )
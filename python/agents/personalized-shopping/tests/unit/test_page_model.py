@@ -0,0 +1,195 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""`build_page_model` against the HTML of the same template and context.
+
+The page models are written by hand from the templates; these tests render
+each template and check the model against what BeautifulSoup finds in the
+HTML, so a template edit that is not mirrored in `page_model.py` fails here.
+"""
+
+from functools import partial
+import os
+import random
+
+from bs4 import BeautifulSoup
+import pytest
+
+from shared_libraries.web_agent_site.engine.engine import TEMPLATE_DIR, page_context
+from shared_libraries.web_agent_site.engine.page_model import build_page_model
+from shared_libraries.web_agent_site.envs.web_agent_text_env import WebAgentTextEnv
+
+
+def parse_html(html):
+    """Clickables, search bar, instruction and image as the environment used
+    to find them in the HTML, before the page model."""
+    soup = BeautifulSoup(html, "html.parser")
+    clickables = {
+        b.get_text().lower(): b
+        for b in soup.find_all(class_="btn") + soup.find_all(class_="product-link")
+    }
+    for option in soup.select('input[type="radio"]'):
+        clickables[f"{option.get('value')}"] = option
+    instruction = soup.find(id="instruction-text")
+    image = soup.find(id="product-image")
+    return dict(
+        clickables=clickables,
+        has_search_bar=soup.find(id="search_input") is not None,
+        instruction_text=instruction.h4.text if instruction else None,
+        image_url=image["src"] if image else None,
+    )
+
+
+def assert_page_matches_html(env, page, html):
+    for simple in (True, False):
+        assert env.convert_page_to_text(page, simple) == env.convert_html_to_text(
+            html, simple
+        )
+    parsed = parse_html(html)
+    assert list(page.clickables) == list(parsed["clickables"])
+    for text, tag in parsed["clickables"].items():
+        assert page.clickables[text].get("class") == tag.get("class"), text
+        assert page.clickables[text].get("name") == tag.get("name"), text
+    assert page.has_search_bar == parsed["has_search_bar"]
+    assert page.instruction_text == parsed["instruction_text"]
+    assert page.image_url == parsed["image_url"]
+
+
+@pytest.fixture
+def env(server):
+    env = WebAgentTextEnv(observation_mode="text", server=server)
+    env.step("search[women dress]")
+    return env
+
+
+def check_action(env, action, **kwargs):
+    template_name, context = page_context(action, **kwargs)
+    render = partial(env.server.renderer.render, template_name, **context)
+    page = build_page_model(template_name, context, render)
+    html = render()
+    assert_page_matches_html(env, page, html)
+    return template_name
+
+
+EDGE_PRODUCT = dict(
+    asin="B0EDGE",
+    Title="  ",
+    Price="",
+    Rating=None,
+    MainImage="http://img/x.jpg?a=1&b=2",
+    Description="line1\nline2 <b>&amp;",
+    BulletPoints=["", "\n", " spaced ", "a&b"],
+    Reviews=[
+        {"title": "", "score": 3, "body": "\n\n"},
+        {"title": "ok", "score": "4", "body": "fine"},
+    ],
+    Attributes=["x", " "],
+    options={"color": ["red", "Red", " "], "size ": ["S&M", '"q"']},
+    option_to_image={},
+    category="c",
+    query=None,
+)
+
+
+def page_cases(server):
+    """(action, kwargs) pairs covering every template."""
+    with_options = server.product_item_dict["B000000001"]
+    without_options = server.product_item_dict["B000000002"]
+    cases = []
+    for product, instruction in [
+        (with_options, "Find me a red <dress> & 'more'."),
+        (without_options, None),
+        (EDGE_PRODUCT, "\t"),
+    ]:
+        base = dict(
+            session_id="s",
+            product_info=product,
+            keywords=["women", "dress"],
+            page=2,
+            asin=product["asin"],
+            instruction_text=instruction,
+        )
+        options = {name: values[0] for name, values in product["options"].items()}
+        for show_attrs in (False, True):
+            cases.append(("click", dict(base, options=options, show_attrs=show_attrs)))
+        for sub_page in ("Description", "Features", "Reviews", "Attributes"):
+            cases.append((f"click[{sub_page}]", dict(base, options={})))
+    products = [server.product_item_dict[f"B00000000{i}"] for i in range(5)]
+    cases += [
+        ("start", dict(session_id="s", instruction_text="i need a <dress> & more")),
+        ("start", dict(session_id="s", instruction_text=None)),
+        (
+            "search",
+            dict(
+                session_id="s",
+                products=products,
+                keywords=["shampoo"],
+                page=1,
+                total=len(products),
+                instruction_text="x",
+            ),
+        ),
+        (
+            "search",
+            dict(
+                session_id="s",
+                products=[EDGE_PRODUCT, {"asin": "b0low"}],
+                keywords=["a"],
+                page=3,
+                total=0,
+                instruction_text=None,
+            ),
+        ),
+        (
+            "click[Buy Now]",
+            dict(
+                session_id="s",
+                reward=0.5,
+                asin="B0EDGE",
+                options={"a": "<'&>"},
+                goal={"asin": "G", "weight": 1, "instruction_text": "i <x>"},
+                reward_info={"r": [1, 2]},
+            ),
+        ),
+        ("click[Buy Now]", dict(session_id="s", reward=None, asin=None, options={})),
+    ]
+    return cases
+
+
+def test_every_template_matches_its_html(env, server):
+    rendered = {
+        check_action(env, action, **kwargs) for action, kwargs in page_cases(server)
+    }
+    assert rendered == set(os.listdir(TEMPLATE_DIR))
+
+
+def test_episode_pages_match_their_html(server):
+    env = WebAgentTextEnv(observation_mode="text", server=server, show_attrs=True)
+    rng = random.Random(0)
+    names = [p["name"] for p in server.all_products]
+    for _ in range(30):
+        env.reset()
+        if rng.random() < 0.5:
+            server.set_instruction_text(env.session, rng.choice(["  ", "Find <x> & y"]))
+        env.step(f"search[{' '.join(rng.choice(names).split()[:2])}]")
+        for _ in range(8):
+            page = env.browser.page
+            assert_page_matches_html(env, page, page.html)
+            # Buying scores the episode with spaCy; the done page is covered above.
+            actions = [
+                a for a in env.get_available_actions()["clickables"] if a != "buy now"
+            ]
+            if not actions:
+                break
+            env.step(f"click[{rng.choice(actions)}]")
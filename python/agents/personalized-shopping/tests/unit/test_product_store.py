@@ -0,0 +1,84 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import random
+
+import pytest
+
+from shared_libraries.web_agent_site.engine.engine import load_products
+from shared_libraries.web_agent_site.engine.goal import get_goals
+from shared_libraries.web_agent_site.engine.product_store import (
+    build_product_store,
+    open_product_store,
+)
+
+
+def build_and_load(catalog, human_goals):
+    store_path = str(catalog.dir / "store.sqlite")
+    # Prices of products with a price range and goal price limits are random,
+    # and rich's first print draws from `random` too: warm it up, then build
+    # the store and load the catalog from the same seed.
+    load_products(catalog.path, human_goals=human_goals)
+    random.seed(0)
+    build_product_store(catalog.path, store_path, human_goals=human_goals)
+    random.seed(0)
+    all_products, product_item_dict, product_prices, _ = load_products(
+        catalog.path, human_goals=human_goals
+    )
+    goals = get_goals(all_products, product_prices, human_goals)
+    store = open_product_store(catalog.path, human_goals=human_goals, path=store_path)
+    return store, all_products, product_item_dict, product_prices, goals
+
+
+@pytest.mark.parametrize("human_goals", [False, True])
+def test_store_round_trip(catalog, human_goals):
+    store, all_products, product_item_dict, product_prices, goals = build_and_load(
+        catalog, human_goals
+    )
+    assert store is not None
+    assert list(store.all_products) == all_products
+    assert store.all_products[-1] == all_products[-1]
+    assert dict(store.products) == product_item_dict
+    assert dict(store.prices) == product_prices
+    assert "B999999999" not in store.products
+    assert list(store.goals) == goals
+    assert store.goals.weights == [goal["weight"] for goal in goals]
+
+    order = list(reversed(range(len(goals))))[::2]
+    taken = store.goals.take(order)
+    assert list(taken) == [goals[i] for i in order]
+    assert taken.weights == [goals[i]["weight"] for i in order]
+
+
+def test_store_is_stale_when_a_source_file_changes(catalog):
+    store_path = str(catalog.dir / "store.sqlite")
+    build_product_store(catalog.path, store_path, human_goals=True)
+    assert open_product_store(catalog.path, human_goals=True, path=store_path)
+
+    for path in (catalog.items, catalog.attributes, catalog.human_attributes):
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert (
+            open_product_store(catalog.path, human_goals=True, path=store_path) is None
+        )
+        build_product_store(catalog.path, store_path, human_goals=True)
+        assert open_product_store(catalog.path, human_goals=True, path=store_path)
+
+
+def test_store_without_raw_catalog_is_used(catalog):
+    store_path = str(catalog.dir / "store.sqlite")
+    build_product_store(catalog.path, store_path)
+    os.remove(catalog.path)
+    assert open_product_store(catalog.path, path=store_path) is not None
@@ -0,0 +1,64 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+from conftest import FakeSearcher
+from shared_libraries.web_agent_site.engine.engine import ProductSearchEngine
+from shared_libraries.web_agent_site.envs.web_agent_text_env import WebAgentTextEnv
+
+
+def test_hits_resolve_to_asins_without_doc_lookups(catalog):
+    searcher = FakeSearcher(catalog.products)
+    search_engine = ProductSearchEngine(searcher)
+    for query in ["women dress", "navy blue shampoo", "coffee beans model 5"]:
+        hits = searcher.search(query, k=10)
+        # What the lookup through the stored documents used to return.
+        expected = [json.loads(searcher.doc(hit.docid).raw())["id"] for hit in hits]
+        searcher.doc_calls = 0
+        assert list(search_engine.search_asins(query, k=10)) == expected
+        assert searcher.doc_calls == 0
+
+
+def test_ranked_lists_are_cached_per_query_and_k(catalog):
+    searcher = FakeSearcher(catalog.products)
+    search_engine = ProductSearchEngine(searcher, cache_size=2)
+    dresses = search_engine.search_asins("women dress", k=10)
+    assert search_engine.search_asins("women dress", k=10) == dresses
+    assert search_engine.search_asins("women dress", k=3) == dresses[:3]
+    assert searcher.search_calls == 2
+    assert (search_engine.cache_hits, search_engine.cache_misses) == (1, 2)
+
+    # Least recently used first: ("women dress", 10) was used before k=3.
+    search_engine.search_asins("shampoo", k=10)
+    search_engine.search_asins("women dress", k=3)
+    assert searcher.search_calls == 3
+    search_engine.search_asins("women dress", k=10)
+    assert searcher.search_calls == 4
+    search_engine.search_asins("shampoo", k=10)
+    assert searcher.search_calls == 5
+    assert len(search_engine._cache) == 2
+
+
+def test_paging_does_not_search_again(server):
+    searcher = server.search_engine.searcher
+    env = WebAgentTextEnv(observation_mode="text", server=server)
+    env.step("search[women dress]")
+    assert "next >" in env.get_available_actions()["clickables"]
+    env.step("click[next >]")
+    env.step("click[< prev]")
+    env.step("click[back to search]")
+    env.step("search[women dress]")
+    assert searcher.search_calls == 1
+    assert searcher.doc_calls == 0
@@ -0,0 +1,94 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from types import SimpleNamespace
+
+from shared_libraries import session_pool
+from shared_libraries.session_pool import WebShopSessionPool
+
+
+def results(env):
+    return [a for a in env.get_available_actions()["clickables"] if a.startswith("b0")]
+
+
+def test_interleaved_sessions_keep_their_own_state(server):
+    pool = WebShopSessionPool(server)
+    alice, bob = pool.get("alice"), pool.get("bob")
+    assert alice is not bob
+
+    server.set_instruction_text(alice.session, "Find me women dress.")
+    alice.step("search[women dress]")
+    server.set_instruction_text(bob.session, "Find me coffee beans.")
+    bob.step("search[coffee beans]")
+    alice_results, bob_results = results(alice), results(bob)
+    assert alice_results and bob_results
+    assert not set(alice_results) & set(bob_results)
+
+    alice.step(f"click[{alice_results[0]}]")
+    bob.step("click[next >]")
+    assert pool.get("alice") is alice
+    assert alice.get_instruction_text().endswith("Find me women dress.")
+    assert bob.get_instruction_text().endswith("Find me coffee beans.")
+    assert alice.observation.startswith("Instruction: [SEP] Find me women dress.")
+    assert "Back to Search [SEP] < Prev" in alice.observation
+    assert results(bob) and not set(results(bob)) & set(alice_results)
+    assert server.user_sessions[alice.session]["asin"] == alice_results[0].upper()
+
+
+def test_pool_stays_bounded(server):
+    pool = WebShopSessionPool(server, max_sessions=50)
+    for i in range(2000):
+        env = pool.get(f"session-{i}")
+        env.step("search[shampoo]")
+    assert len(pool) == 50
+    assert pool.evicted == 1950
+    assert len(server.user_sessions) == 50
+    # The most recent sessions survive, the oldest were dropped.
+    assert pool.get("session-1999") is env
+    assert len(pool) == 50 and pool.evicted == 1950
+
+
+def test_idle_sessions_are_dropped(server, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_pool.time, "monotonic", lambda: now[0])
+    pool = WebShopSessionPool(server, idle_timeout_secs=60)
+    first = pool.get("idle")
+    now[0] += 30
+    pool.get("active")
+    now[0] += 45
+    pool.get("new")
+    assert len(pool) == 2 and pool.evicted == 1
+    assert first.session not in server.user_sessions
+    assert pool.get("idle") is not first
+
+
+def test_end_forgets_the_session(server):
+    pool = WebShopSessionPool(server)
+    env = pool.get("done")
+    pool.end("done")
+    pool.end("never-started")
+    assert len(pool) == 0
+    assert env.session not in server.user_sessions
+
+
+def test_for_tool_context_uses_the_adk_session(server):
+    pool = WebShopSessionPool(server)
+    session = SimpleNamespace(id="adk-session")
+    env = pool.for_tool_context(SimpleNamespace(session=session))
+    # Contexts that only reach the session through the invocation.
+    legacy_context = SimpleNamespace(
+        _invocation_context=SimpleNamespace(session=session)
+    )
+    assert pool.for_tool_context(legacy_context) is env
+    assert pool.get("adk-session") is env